@@ -0,0 +1,171 @@
+''' Rebuild the Report/ files from a recorded crawl (launch.py --record),
+without the cache server: python analytics.py recorded/
+
+The url rules, trap, canonical and word settings come from the same
+config.ini as the crawl (--config_file). '''
+import multiprocessing
+import os
+import time
+
+from argparse import ArgumentParser
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from configparser import ConfigParser
+
+import cbor
+
+import scraper
+from utils.config import Config
+from utils.response import Response
+from utils.response_store import ResponseStore, read_record
+from utils.simhash import DuplicateIndex
+from utils.word_counter import WordCounter
+
+
+def chunks(store, chunk_size):
+    ''' The latest record of every url as (segment path, [(segment, offset)])
+    work items of at most chunk_size records, in recording order. '''
+    by_segment = dict()
+    for segment, offset in store.locations().values():
+        by_segment.setdefault(segment, list()).append((segment, offset))
+    work = list()
+    for segment in sorted(by_segment):
+        records = sorted(by_segment[segment])
+        for start in range(0, len(records), chunk_size):
+            work.append((store.segment_path(segment), records[start:start + chunk_size]))
+    return work
+
+
+def load_response(url, status, payload):
+    ''' The Response download() would have returned for a recorded answer. '''
+    if status < 400 and payload:
+        try:
+            return Response(cbor.loads(payload))
+        except (EOFError, ValueError):
+            pass
+    return Response({"url": url, "status": status, "error": f"Recorded error <{status}>"})
+
+
+def analyze_chunk(path, records, words_only=False):
+    ''' Map step, run in a worker process. Parses the pages of one chunk
+    with the scraper's own parsing and tokenizing. Returns one
+    (order, url, checksum, simhash, word_count, counted) tuple per html page
+    and a Counter of the words of the pages whose words are counted, i.e.
+    pages with a usable word count. words_only skips the page tuples. '''
+    counter = WordCounter(scraper.stop_words)
+    pages = list()
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        for order in records:
+            url, status, payload = read_record(fd, order[1])
+            resp = load_response(url, status, payload)
+            content = scraper.page_content(url, resp)
+            if content is None:
+                continue
+            analysis = scraper.analyze_html(url, content)
+            counted = bool(analysis.token_counts) and not scraper.word_count_out_of_range(analysis.word_count)
+            if counted:
+                counter.update(analysis.token_counts)
+            if not words_only:
+                has_tokens = bool(analysis.token_counts)
+                pages.append((
+                    order, url, analysis.checksum if has_tokens else None,
+                    analysis.simhash, analysis.word_count, counted))
+    finally:
+        os.close(fd)
+    return pages, counter.counts
+
+
+class CrawlSummary(object):
+    ''' Reduce step: the Q1-Q4 numbers, folded in recording order so
+    duplicates and the longest page come out as in the live crawl. '''
+    def __init__(self):
+        self.unique_pages = 0
+        self.longest_page = ('', 0)
+        self.words = Counter()
+        self.subdomains = dict()
+        self.duplicates = DuplicateIndex()
+        self.retracted = list()     # orders of counted pages found not to count
+
+    def add_pages(self, pages):
+        for order, url, page_checksum, fingerprint, word_count, counted in sorted(pages):
+            if scraper.URL_FILTER.check(url) is not None:
+                # Rejected by the current rules, would not be crawled now.
+                if counted:
+                    self.retracted.append(order)
+                continue
+            if page_checksum is not None and self.duplicates.check_and_add(
+                    url, page_checksum, fingerprint) is not None:
+                if counted:
+                    self.retracted.append(order)
+                continue
+            self.unique_pages += 1
+            host = scraper.subdomain_of(url)
+            if host is not None:
+                self.subdomains[host] = self.subdomains.get(host, 0) + 1
+            if counted and self.longest_page[1] < word_count:
+                self.longest_page = (url, word_count)
+
+    def write(self, report_dir):
+        reports = {
+            "UniquePages.txt": scraper.render_unique_pages(self.unique_pages),
+            "LongestPage.txt": scraper.render_longest_page(self.longest_page),
+            "CommonWords.txt": scraper.render_common_words(self.words.most_common(50)),
+            "subdomains.txt": scraper.render_subdomains(self.subdomains),
+        }
+        os.makedirs(report_dir, exist_ok=True)
+        for name, text in reports.items():
+            scraper.write_report(os.path.join(report_dir, name), text)
+
+
+def run(directory, processes=None, chunk_size=500, report_dir="Report", config=None):
+    ''' config: the Config of the crawl, which scraper is configured with
+    here and in every worker process, as the Crawler does. Without one the
+    scraper's built in defaults are used. '''
+    if config is not None:
+        scraper.configure(config)
+    store = ResponseStore(directory, readonly=True)
+    work = chunks(store, chunk_size)
+    summary = CrawlSummary()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+            max_workers=processes, mp_context=context,
+            initializer=scraper.configure if config is not None else None,
+            initargs=(config,) if config is not None else ()) as executor:
+        for pages, words in executor.map(analyze_chunk, *zip(*work)) if work else ():
+            summary.add_pages(pages)
+            summary.words.update(words)
+        # Pages whose words were counted by their chunk, but which turned out
+        # to be duplicates (or are rejected by the current rules): parse
+        # them again and take their words back out.
+        skipped = dict()
+        for segment, offset in summary.retracted:
+            skipped.setdefault(store.segment_path(segment), list()).append((segment, offset))
+        for _, words in executor.map(
+                analyze_chunk, list(skipped), list(skipped.values()), [True] * len(skipped)):
+            summary.words.subtract(words)
+    summary.words = +summary.words
+    summary.write(report_dir)
+    store.close()
+    return summary
+
+
+def main():
+    parser = ArgumentParser(description="Rebuild the Report/ files from a recorded crawl.")
+    parser.add_argument("directory", help="directory written by launch.py --record")
+    parser.add_argument("--processes", type=int, default=None, help="default: one per core")
+    parser.add_argument("--chunk", type=int, default=500, help="pages per work item")
+    parser.add_argument("--report_dir", type=str, default="Report")
+    parser.add_argument("--config_file", type=str, default="config.ini")
+    args = parser.parse_args()
+    cparser = ConfigParser()
+    cparser.read(args.config_file)
+    config = Config(cparser)
+    started = time.perf_counter()
+    summary = run(args.directory, args.processes, args.chunk, args.report_dir, config)
+    print(f"Analyzed {summary.unique_pages} unique pages in "
+          f"{time.perf_counter() - started:.1f}s, reports written to {args.report_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+''' Offline benchmark harness. A local stand-in for the cache server serves a
+synthetic (or recorded) corpus, so crawls and hot path microbenchmarks can be
+timed without styx.ics.uci.edu. Run it with: python -m bench '''
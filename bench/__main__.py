@@ -0,0 +1,176 @@
+''' Offline benchmarks: python -m bench --help '''
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from argparse import ArgumentParser
+from configparser import ConfigParser
+
+import scraper
+from bench.corpus import FileCorpus, SyntheticCorpus
+from bench.distributed import run_partitions
+from bench.micro import Result, run_micro
+from bench.server import CacheServer
+from crawler import Crawler
+from launch import ENGINES
+from utils.config import Config
+from utils.metrics import METRICS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_config(args):
+    cparser = ConfigParser()
+    cparser.read(args.config_file)
+    config = Config(cparser)
+    config.threads_count = args.threads
+    config.time_delay = args.politeness
+    config.metrics_port = 0
+    if args.save:
+        config.save_file = args.save
+    return config
+
+
+def run_crawl(corpus, config, args):
+    ''' Crawl the corpus end to end through a local cache server. '''
+    server = CacheServer(corpus, args.latency, args.jitter, args.error_rate)
+    config.cache_server = server.start()
+    config.seed_urls = corpus.seed_urls
+    METRICS.reset()
+    try:
+        crawler = Crawler(config, True, worker_factory=ENGINES[args.engine])
+        started = time.perf_counter()
+        crawler.start()
+        elapsed = time.perf_counter() - started
+        crawler.frontier.save.close()
+    finally:
+        server.stop()
+
+    snapshot = METRICS.snapshot()
+    results = [Result("crawl pages", snapshot["counters"].get("pages_downloaded_total", 0),
+                      elapsed, None, None)]
+    for name in ("download_seconds", "parse_seconds", "frontier_persist_seconds"):
+        histogram = snapshot["histograms"].get(name)
+        if histogram:
+            # Percentiles are histogram bucket bounds, see utils.metrics.
+            results.append(Result(
+                "crawl " + name[:-len("_seconds")], histogram["count"], histogram["sum"],
+                histogram["p50"], histogram["p99"]))
+    summary = {
+        "pages downloaded": results[0].calls,
+        "pages visited": len(scraper.VISITED),
+        "duplicates skipped": len(scraper.DUPLICATE_PAGES),
+        "server requests": server.requests,
+        "seconds": round(elapsed, 3),
+        "MB/s": round(snapshot["counters"].get("bytes_downloaded_total", 0) / elapsed / 1e6, 3),
+    }
+    return results, summary
+
+
+def format_results(results):
+    lines = [f"{'benchmark':<24}{'calls':>10}{'per second':>14}{'p50 ms':>12}{'p99 ms':>12}"]
+    for result in results:
+        lines.append(
+            f"{result.name:<24}{result.calls:>10}{result.throughput:>14.1f}"
+            f"{_ms(result.p50):>12}{_ms(result.p99):>12}")
+    return "\n".join(lines)
+
+def _ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.3f}"
+
+
+def compare(results, baseline_file, tolerance):
+    ''' Names of the benchmarks whose throughput fell more than tolerance
+    (a fraction) below the baseline run. '''
+    with open(baseline_file) as baseline:
+        before = {result["name"]: result for result in json.load(baseline)["results"]}
+    regressions = list()
+    for result in results:
+        old = before.get(result.name)
+        if old and old["throughput"] and result.throughput < old["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{result.name}: {result.throughput:.1f}/s, was {old['throughput']:.1f}/s")
+    return regressions
+
+
+def main(argv=None):
+    parser = ArgumentParser(prog="python -m bench", description=(
+        "Crawl a synthetic or recorded corpus through a local cache server "
+        "and microbenchmark the scraper hot path."))
+    parser.add_argument("--config_file", default=os.path.join(ROOT, "config.ini"))
+    parser.add_argument("--corpus", help="JSON lines corpus file instead of the synthetic site")
+    parser.add_argument("--pages", type=int, default=1000, help="pages in the synthetic site")
+    parser.add_argument("--seed", type=int, default=121)
+    parser.add_argument("--trap-ratio", type=float, default=0.05)
+    parser.add_argument("--trap-depth", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per cache server answer")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of HTTP 503 answers")
+    parser.add_argument("--engine", choices=("threaded", "async"), default="threaded")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--politeness", type=float, default=0.0)
+    parser.add_argument("--partitions", type=int, default=1,
+                        help="crawl with this many processes over loopback, each owning some hosts")
+    parser.add_argument("--save", help="save file name, e.g. frontier.log, instead of SAVE")
+    parser.add_argument("--repeat", type=int, default=3, help="microbenchmark repetitions")
+    parser.add_argument("--skip-crawl", action="store_true")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--output", help="also append the results to this text file")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to check against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed throughput drop against --compare, as a fraction")
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        corpus = FileCorpus(args.corpus)
+    else:
+        corpus = SyntheticCorpus(args.pages, args.seed, args.trap_ratio, args.trap_depth)
+    config = load_config(args)
+
+    results = list()
+    summary = dict()
+    # Run in a scratch directory so Report/, Logs/ and the save file of a
+    # real crawl are left alone.
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    cwd = os.getcwd()
+    try:
+        os.chdir(workdir)
+        os.makedirs("Report")
+        config.save_file = os.path.basename(config.save_file)
+        if not args.skip_crawl:
+            crawl = run_partitions if args.partitions > 1 else run_crawl
+            crawl_results, summary = crawl(corpus, config, args)
+            results.extend(crawl_results)
+        if not args.skip_micro and isinstance(corpus, SyntheticCorpus):
+            results.extend(run_micro(corpus, config, repeat=args.repeat))
+    finally:
+        scraper.flush_debug_log()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = [f"bench {time.strftime('%Y-%m-%d %H:%M:%S')} {' '.join(argv or sys.argv[1:])}"]
+    report.extend(f"  {key}: {value}" for key, value in summary.items())
+    report.append(format_results(results))
+    report = "\n".join(report) + "\n"
+    print(report)
+    if args.output:
+        with open(args.output, "a") as output:
+            output.write(report + "\n")
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump({"args": vars(args), "summary": summary,
+                       "results": [result.as_dict() for result in results]}, output, indent=1)
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
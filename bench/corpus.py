@@ -0,0 +1,154 @@
+import json
+import random
+import zlib
+
+from urllib.parse import urlparse
+
+HOSTS = (
+    "www.ics.uci.edu", "vision.ics.uci.edu", "www.cs.uci.edu",
+    "www.informatics.uci.edu", "www.stat.uci.edu")
+
+_SYLLABLES = (
+    "ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "ze", "qu", "ab", "en",
+    "or", "il", "um", "tra", "ple", "gon", "dis", "ver", "cal", "mon", "ter", "bus")
+
+
+class Page(object):
+    ''' What the cache server knows about one url. '''
+    def __init__(self, url, status=200, content_type="text/html; charset=utf-8", content=b""):
+        self.url = url
+        self.status = status
+        self.content_type = content_type
+        self.content = content
+
+
+class SyntheticCorpus(object):
+    ''' A deterministic fake site spread over the allowed domains.
+
+    `pages` regular pages live at https://<host>/page/<n>. Each has its own
+    zipf distributed text (so near-duplicate detection does not merge them)
+    and links to the next page, a few random pages, some off-domain and
+    blocked-extension urls, missing pages and non-html downloads.
+
+    A `trap_ratio` share of the pages also link into traps that the static
+    url rules let through: an endless ?page=N archive of near identical
+    pages, and a path that repeats its own segments, each trap_depth long.
+    Everything is derived from (seed, url), so any page can be served in any
+    order by any process.
+    '''
+    def __init__(self, pages=1000, seed=121, trap_ratio=0.05, trap_depth=50,
+                 vocabulary=5000, words_per_page=(150, 800)):
+        self.pages = pages
+        self.seed = seed
+        self.trap_ratio = trap_ratio
+        self.trap_depth = trap_depth
+        self.words_per_page = words_per_page
+        rng = random.Random(seed)
+        words = set()
+        while len(words) < vocabulary:
+            words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+        self.vocabulary = sorted(words)
+        self.weights = [1 / (rank + 1) for rank in range(len(self.vocabulary))]
+
+    def page_url(self, number):
+        return f"https://{HOSTS[number % len(HOSTS)]}/page/{number}"
+
+    @property
+    def seed_urls(self):
+        return [self.page_url(number) for number in range(len(HOSTS))]
+
+    def _rng(self, url):
+        return random.Random(zlib.crc32(url.encode("utf-8")) ^ self.seed)
+
+    def get(self, url):
+        ''' The Page for url, or None if the site has no such url. '''
+        parsed = urlparse(url)
+        if parsed.netloc not in HOSTS:
+            return None
+        path = parsed.path.rstrip("/")
+        if path.startswith("/page/"):
+            number = _number(path[len("/page/"):])
+            if number is None or number >= self.pages:
+                return None
+            return Page(url, content=self._regular_page(url, number))
+        if path == "/archive":
+            number = _number(parsed.query.partition("page=")[2])
+            if number is None or number >= self.trap_depth:
+                return None
+            return Page(url, content=self._archive_page(parsed.netloc, number))
+        if path.startswith("/docs"):
+            segments = path.split("/")[2:]
+            if len(segments) > self.trap_depth:
+                return None
+            return Page(url, content=self._docs_page(url, segments))
+        if path.startswith("/download/"):
+            return Page(url, content_type="application/pdf", content=b"%PDF-1.4 " * 64)
+        return None
+
+    def _text(self, rng, words):
+        # Every page has its own most frequent words: the zipf ranks start at
+        # a random point of the vocabulary.
+        start = rng.randrange(len(self.vocabulary))
+        ranked = self.vocabulary[start:] + self.vocabulary[:start]
+        return " ".join(rng.choices(ranked, self.weights, k=words))
+
+    def _regular_page(self, url, number):
+        rng = self._rng(url)
+        host = urlparse(url).netloc
+        links = [self.page_url((number + 1) % self.pages)]
+        links += [self.page_url(rng.randrange(self.pages)) for _ in range(rng.randint(3, 10))]
+        links += [f"/page/{number}#section-{i}" for i in range(2)]
+        links += [f"https://www.example.com/ref/{rng.randrange(100)}",
+                  f"/files/report{rng.randrange(100)}.pdf",
+                  f"/download/{number}",
+                  f"/page/{self.pages + rng.randrange(100)}"]
+        if rng.random() < self.trap_ratio:
+            links += [f"https://{host}/archive?page=0", f"https://{host}/docs/a/b"]
+        words = rng.randint(*self.words_per_page)
+        paragraphs = "".join(f"<p>{self._text(rng, words // 4)}</p>" for _ in range(4))
+        return _html(f"Page {number}", paragraphs, links)
+
+    def _archive_page(self, host, number):
+        # Same text on every archive page, only the page number differs.
+        rng = random.Random(self.seed)
+        body = f"<p>Archive page {number}</p><p>{self._text(rng, 200)}</p>"
+        return _html("Archive", body, [f"https://{host}/archive?page={number + 1}"])
+
+    def _docs_page(self, url, segments):
+        rng = self._rng(url)
+        base = url.rstrip("/")
+        body = f"<p>{self._text(rng, 120)}</p>"
+        child = "ab"[len(segments) % 2]
+        return _html("Docs", body, [f"{base}/{child}"] if len(segments) < self.trap_depth else [])
+
+
+class FileCorpus(object):
+    ''' Pages recorded in a JSON lines file, one
+    {"url", "status", "content_type", "html"} object per line. '''
+    def __init__(self, path):
+        self.pages = dict()
+        with open(path, encoding="utf-8") as corpus:
+            for line in corpus:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self.pages[record["url"]] = Page(
+                    record["url"], record.get("status", 200),
+                    record.get("content_type", "text/html; charset=utf-8"),
+                    record.get("html", "").encode("utf-8"))
+        self.seed_urls = list(self.pages)[:1]
+
+    def get(self, url):
+        return self.pages.get(url)
+
+
+def _number(text):
+    return int(text) if text.isdigit() else None
+
+def _html(title, body, links):
+    anchors = "".join(f'<li><a href="{link}">{link}</a></li>' for link in links)
+    return (
+        f"<!DOCTYPE html><html><head><title>{title}</title>"
+        f"<style>body {{ font-family: sans-serif; }}</style>"
+        f"<script>var analytics = {{page: '{title}'}};</script></head>"
+        f"<body><h1>{title}</h1>{body}<ul>{anchors}</ul></body></html>").encode("utf-8")
@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+import secrets
+import socket
+import time
+
+import scraper
+from bench.micro import Result
+from bench.server import CacheServer
+from crawler import Crawler
+from crawler.partition import PartitionedFrontier, partition_save_file
+from launch import ENGINES
+from utils.metrics import METRICS
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _crawl_partition(config, engine, partition, results):
+    ''' One crawler process, in its own directory so Report/ and Logs/ are
+    its own too. '''
+    os.makedirs(f"p{partition}/Report", exist_ok=True)
+    os.chdir(f"p{partition}")
+    config.partition = partition
+    config.save_file = partition_save_file(config.save_file, partition)
+    crawler = Crawler(config, True, frontier_factory=PartitionedFrontier,
+                      worker_factory=ENGINES[engine])
+    crawler.start()
+    crawler.frontier.save.close()
+    counters = METRICS.snapshot()["counters"]
+    results.put((
+        counters.get("pages_downloaded_total", 0), counters.get("bytes_downloaded_total", 0),
+        len(scraper.VISITED), len(scraper.DUPLICATE_PAGES)))
+
+
+def run_partitions(corpus, config, args):
+    ''' Crawl the corpus with args.partitions processes talking over
+    loopback, each owning a share of the hosts. '''
+    server = CacheServer(corpus, args.latency, args.jitter, args.error_rate)
+    config.cache_server = server.start()
+    config.seed_urls = corpus.seed_urls
+    config.nodes = [f"127.0.0.1:{_free_port()}" for _ in range(args.partitions)]
+    config.partition_key = config.partition_key or secrets.token_hex(16)
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [
+        context.Process(target=_crawl_partition, args=(config, args.engine, partition, results))
+        for partition in range(args.partitions)]
+    try:
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        totals = [sum(column) for column in zip(*(results.get() for _ in processes))]
+        elapsed = time.perf_counter() - started
+        for process in processes:
+            process.join()
+    finally:
+        server.stop()
+    pages, downloaded_bytes, visited, duplicates = totals
+    summary = {
+        "partitions": args.partitions,
+        "pages downloaded": pages,
+        "pages visited": visited,
+        "duplicates skipped": duplicates,
+        "server requests": server.requests,
+        "seconds": round(elapsed, 3),
+        "MB/s": round(downloaded_bytes / elapsed / 1e6, 3),
+    }
+    return [Result("crawl pages", pages, elapsed, None, None)], summary
@@ -0,0 +1,89 @@
+import time
+
+import cbor
+
+from bench.server import encode_page
+from utils.response import Response
+
+
+class Result(object):
+    ''' Throughput and latency percentiles of one benchmark. '''
+    def __init__(self, name, calls, seconds, p50, p99):
+        self.name = name
+        self.calls = calls
+        self.seconds = seconds
+        self.p50 = p50
+        self.p99 = p99
+
+    @classmethod
+    def from_latencies(cls, name, latencies):
+        latencies = sorted(latencies)
+        return cls(name, len(latencies), sum(latencies),
+                   percentile(latencies, 0.50), percentile(latencies, 0.99))
+
+    @property
+    def throughput(self):
+        return self.calls / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {"name": self.name, "calls": self.calls, "seconds": self.seconds,
+                "throughput": self.throughput, "p50": self.p50, "p99": self.p99}
+
+
+def percentile(ordered, q):
+    ''' q-th quantile of an already sorted list, nearest rank. '''
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def measure(name, function, inputs, repeat=1):
+    ''' Call function(*args) for every args tuple in inputs, repeat times,
+    timing each call. '''
+    clock = time.perf_counter
+    latencies = list()
+    for _ in range(repeat):
+        for args in inputs:
+            started = clock()
+            function(*args)
+            latencies.append(clock() - started)
+    return Result.from_latencies(name, latencies)
+
+
+def corpus_responses(corpus, urls):
+    ''' (url, Response) pairs decoded from the same cbor payloads the cache
+    server sends, skipping urls the corpus does not have. '''
+    responses = list()
+    for url in urls:
+        page = corpus.get(url)
+        if page is not None:
+            responses.append((url, Response(cbor.loads(encode_page(url, page)))))
+    return responses
+
+
+def run_micro(corpus, config, pages=200, repeat=3):
+    ''' Microbenchmarks of the per page hot path over `pages` corpus pages.
+    Writes a save file, so run it in a scratch directory. '''
+    import scraper
+    from crawler.frontier import Frontier
+
+    urls = [corpus.page_url(number) for number in range(min(pages, corpus.pages))]
+    responses = corpus_responses(corpus, urls)
+    links = list()
+    for url, resp in responses:
+        links.extend(scraper.analyze_page(url, resp).links)
+    token_lists = [scraper.tokenize(resp) for _, resp in responses]
+
+    results = [
+        measure("is_valid", scraper.is_valid, [(link,) for link in links], repeat),
+        measure("extract_next_links", scraper.extract_next_links, responses, repeat),
+        measure("tokenize", scraper.tokenize, [(resp,) for _, resp in responses], repeat),
+        measure("word_freq", scraper.word_freq, [(tokens,) for tokens in token_lists], repeat),
+    ]
+
+    # add_url on a fresh frontier, every link once.
+    frontier = Frontier(config, True)
+    unique_links = list(dict.fromkeys(links))
+    results.append(measure("Frontier.add_url", frontier.add_url, [(link,) for link in unique_links]))
+    frontier.save.close()
+    return results
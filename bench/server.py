@@ -0,0 +1,113 @@
+import multiprocessing
+import pickle
+import random
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import cbor
+import requests
+
+
+def encode_page(url, page):
+    ''' cbor payload the real cache server sends for url, the format
+    utils.download.download expects. page None means the url does not exist. '''
+    if page is None:
+        return cbor.dumps({"url": url, "status": 404, "error": f"{url} not found"})
+    raw = requests.models.Response()
+    raw.status_code = page.status
+    raw.url = url
+    raw._content = page.content
+    raw.headers["Content-Type"] = page.content_type
+    raw.encoding = "utf-8"
+    return cbor.dumps({"url": url, "status": page.status, "response": pickle.dumps(raw)})
+
+
+class CacheServer(object):
+    ''' Local stand-in for the course cache server, serving a corpus.
+
+    The server runs in its own process, so it does not compete with the
+    crawler for the GIL the way a remote server would not either. Every
+    answer waits latency seconds (plus up to jitter more). A share error_rate
+    of the requests is answered with HTTP 503, which download() retries, so
+    failures cost time the way they do against the real server.
+    '''
+    def __init__(self, corpus, latency=0.0, jitter=0.0, error_rate=0.0, seed=121):
+        self.corpus = corpus
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+        context = multiprocessing.get_context("spawn")
+        self.context = context
+        self.counter = context.Value("q", 0)
+        self.process = None
+
+    @property
+    def requests(self):
+        ''' Requests answered so far, errors included. '''
+        return self.counter.value
+
+    def start(self):
+        ''' Serve on a free loopback port and return its (host, port). '''
+        parent, child = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_serve, daemon=True, args=(
+                child, self.corpus, self.latency, self.jitter, self.error_rate,
+                self.seed, self.counter))
+        self.process.start()
+        address = parent.recv()
+        parent.close()
+        return address
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+            self.process = None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in two writes; without this Nagle holds the
+    # body back for a delayed ACK on every request.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        settings = self.server
+        url = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+        with settings.counter.get_lock():
+            settings.counter.value += 1
+            error, delay = settings.rng.random(), settings.rng.random()
+        wait = settings.latency + settings.jitter * delay
+        if wait:
+            time.sleep(wait)
+        if error < settings.error_rate:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = encode_page(url, settings.corpus.get(url))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/cbor")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(connection, corpus, latency, jitter, error_rate, seed, counter):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    httpd.corpus = corpus
+    httpd.latency = latency
+    httpd.jitter = jitter
+    httpd.error_rate = error_rate
+    httpd.rng = random.Random(seed)
+    httpd.counter = counter
+    connection.send(httpd.server_address)
+    connection.close()
+    httpd.serve_forever()
@@ -1,14 +1,29 @@
 from utils import get_logger
+from utils.url_state import url_state_file
+import scraper
 from crawler.frontier import Frontier
 from crawler.worker import Worker
+from crawler.async_worker import AsyncWorker
+from crawler.reports import ReportFlusher
+from crawler.metrics_exporter import MetricsExporter
+from crawler.parse_pool import shutdown_parse_pool
 
 class Crawler(object):
     def __init__(self, config, restart, frontier_factory=Frontier, worker_factory=Worker):
         self.config = config
         self.logger = get_logger("CRAWLER")
+        scraper.configure(config)
+        # Before the frontier, whose resume checks urls against it.
+        scraper.URL_STATE.open(url_state_file(config.save_file), restart)
         self.frontier = frontier_factory(config, restart)
         self.workers = list()
         self.worker_factory = worker_factory
+        self.reports = ReportFlusher(config)
+        self.metrics = MetricsExporter(config)
+        # Optional, frontiers written to the plain interface have no gauges.
+        register_metrics = getattr(self.frontier, "register_metrics", None)
+        if register_metrics is not None:
+            register_metrics(self.metrics.registry)
 
     def start_async(self):
         self.workers = [
@@ -16,6 +31,8 @@ class Crawler(object):
             for worker_id in range(self.config.threads_count)]
         for worker in self.workers:
             worker.start()
+        self.reports.start()
+        self.metrics.start()
 
     def start(self):
         self.start_async()
@@ -24,3 +41,6 @@ class Crawler(object):
     def join(self):
         for worker in self.workers:
             worker.join()
+        shutdown_parse_pool()
+        self.reports.stop()
+        self.metrics.stop()
@@ -0,0 +1,80 @@
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+
+from inspect import getsource
+from utils.download import download_async
+from utils import get_logger
+from crawler.parse_pool import get_parse_pool
+from crawler.robots import get_robots_cache
+import scraper
+
+
+class AsyncWorker(Thread):
+    ''' Worker that runs an event loop instead of one blocking download at a
+    time. ASYNCTASKS fetch tasks share the frontier, so as many downloads are
+    in flight as there are hosts ready to be fetched. Scraping and frontier
+    writes run in a thread pool so the loop never stalls on parsing or disk.
+    '''
+    def __init__(self, worker_id, config, frontier):
+        self.logger = get_logger(f"AsyncWorker-{worker_id}", "Worker")
+        self.config = config
+        self.frontier = frontier
+        parse_pool = get_parse_pool(config)
+        self.analyzer = parse_pool.analyze_html if parse_pool else None
+        self.robots = get_robots_cache(config, frontier)
+        self.work_added = None
+        # basic check for requests in scraper
+        assert {getsource(scraper).find(req) for req in {"from requests import", "import requests"}} == {-1}, "Do not use requests in scraper.py"
+        assert {getsource(scraper).find(req) for req in {"from urllib.request import", "import urllib.request"}} == {-1}, "Do not use urllib.request in scraper.py"
+        super().__init__(daemon=True)
+
+    def run(self):
+        asyncio.run(self._crawl())
+        self.logger.info("Frontier is empty. Stopping Crawler.")
+
+    async def _crawl(self):
+        self.work_added = asyncio.Event()
+        with ThreadPoolExecutor(thread_name_prefix="scraper") as executor:
+            await asyncio.gather(*(
+                self._fetch_loop(executor)
+                for _ in range(self.config.async_tasks)))
+
+    async def _fetch_loop(self, executor):
+        loop = asyncio.get_running_loop()
+        while True:
+            tbd_url, wait = self.frontier.poll_tbd_url()
+            if tbd_url is None:
+                if wait is None:
+                    break
+                # Nothing is polite to fetch yet; wake up early if one of our
+                # own pages adds urls.
+                self.work_added.clear()
+                try:
+                    await asyncio.wait_for(self.work_added.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                if self.robots is not None and not await loop.run_in_executor(
+                        executor, self.robots.allowed, tbd_url):
+                    scraper.log_debug("robots_disallowed", tbd_url)
+                    continue
+                resp = await download_async(
+                    tbd_url, self.config, self.logger, scraper.PAGE_TYPES)
+                self.logger.info(
+                    f"Downloaded {tbd_url}, status <{resp.status}>, "
+                    f"using cache {self.config.cache_server}.")
+                await loop.run_in_executor(executor, self._scrape, tbd_url, resp)
+            except Exception as e:
+                self.logger.error(f"Failed to crawl {tbd_url}: {e}")
+            finally:
+                await loop.run_in_executor(
+                    executor, self.frontier.mark_url_complete, tbd_url)
+                self.work_added.set()
+
+    def _scrape(self, tbd_url, resp):
+        for scraped_url in scraper.scraper(tbd_url, resp, self.analyzer):
+            if self.robots is None or self.robots.allowed(scraped_url, fetch=False):
+                self.frontier.add_url(scraped_url, tbd_url)
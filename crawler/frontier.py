@@ -1,18 +1,52 @@
 import os
-import shelve
+import time
 
-from threading import Thread, RLock
+from heapq import heappush, heappop
+from itertools import count
+from threading import Thread, RLock, Condition
 from queue import Queue, Empty
+from urllib.parse import urlparse
 
-from utils import get_logger, get_urlhash, normalize
-from scraper import is_valid
+from utils import get_logger, get_urlhash, get_fingerprint
+from utils.fingerprints import FingerprintSet
+from utils.metrics import METRICS
+from crawler.persistence import open_save
+from crawler.scoring import get_scorer
+from scraper import is_valid, canonicalize
 
 class Frontier(object):
+    ''' Thread safe frontier with one priority queue per host.
+
+    Hosts that have urls waiting sit in a heap ordered by the time they are
+    next allowed to be fetched. A host is checked out while one of its urls
+    is being downloaded and goes back on the heap, POLITENESS seconds later,
+    once that url is marked complete. So each host sees at most one request
+    every POLITENESS seconds, and workers only wait when no host is ready.
+
+    Within a host, urls come out lowest score first. The score is computed
+    once, when the url is added, by the SCORER function from the url, its
+    depth (links followed from a seed) and the page it was found on; ties go
+    to the url found first. Adding and taking a url is O(log n).
+    '''
+    # How long poll_tbd_url callers wait when only in-progress downloads can
+    # still add work.
+    IDLE_POLL = 1.0
+
     def __init__(self, config, restart):
         self.logger = get_logger("FRONTIER")
         self.config = config
-        self.to_be_downloaded = list()
-        
+        self.lock = RLock()
+        self.has_ready_host = Condition(self.lock)
+        self.host_queues = dict()   # host -> heap of (score, sequence, url, depth)
+        self.ready_hosts = list()   # heap of (next allowed fetch time, host)
+        self.next_fetch = dict()    # host -> earliest next fetch time
+        self.active_hosts = set()   # hosts with a download in progress
+        self.crawl_delays = dict()  # host -> Crawl-delay of its robots.txt
+        self.queued = 0             # urls waiting in host_queues
+        self.depths = dict()        # url being downloaded -> its depth
+        self.sequence = count()
+        self.scorer = get_scorer(config.scorer)
+
         if not os.path.exists(self.config.save_file) and not restart:
             # Save file does not exist, but request to load save.
             self.logger.info(
@@ -24,7 +58,10 @@ class Frontier(object):
                 f"Found save file {self.config.save_file}, deleting it.")
             os.remove(self.config.save_file)
         # Load existing save file, or create one if it does not exist.
-        self.save = shelve.open(self.config.save_file)
+        self.save = open_save(self.config)
+        # Every url ever added, so duplicates are rejected without touching
+        # the save file.
+        self.seen = FingerprintSet(len(self.save))
         if restart:
             for url in self.config.seed_urls:
                 self.add_url(url)
@@ -39,34 +76,190 @@ class Frontier(object):
         ''' This function can be overridden for alternate saving techniques. '''
         total_count = len(self.save)
         tbd_count = 0
+        for fingerprint in self.save.fingerprints():
+            self.seen.add(fingerprint)
         for url, completed in self.save.values():
-            if not completed and is_valid(url):
-                self.to_be_downloaded.append(url)
+            # Saves from before canonical urls may hold other spellings.
+            canonical = canonicalize(url)
+            if canonical != url and not self.seen.add(get_fingerprint(get_urlhash(canonical))):
+                continue
+            if not completed and is_valid(canonical):
+                self._enqueue(canonical)
                 tbd_count += 1
         self.logger.info(
             f"Found {tbd_count} urls to be downloaded from {total_count} "
             f"total urls discovered.")
 
+    def register_metrics(self, registry):
+        ''' Export the frontier's size and queue depths as gauges. '''
+        registry.gauge("frontier_size", lambda: self.queued)
+        registry.gauge("frontier_active_hosts", lambda: len(self.active_hosts))
+        registry.gauge("host_queue_depth", self.queue_depths, "host")
+
+    def queue_depths(self):
+        ''' {host: number of urls waiting}, for the metrics exporter. '''
+        with self.lock:
+            return {host: len(queue) for host, queue in self.host_queues.items()}
+
+    @staticmethod
+    def _host(url):
+        return urlparse(url).netloc.lower()
+
+    def _enqueue(self, url, depth=0, parent=None):
+        ''' Queue url under its host and schedule the host if it is idle.
+        Urls reloaded from the save file have lost their depth and count as
+        seeds. '''
+        host = self._host(url)
+        score = self.scorer(url, depth, parent)
+        with self.lock:
+            queue = self.host_queues.get(host)
+            if queue is None:
+                queue = self.host_queues[host] = list()
+            heappush(queue, (score, next(self.sequence), url, depth))
+            self.queued += 1
+            if len(queue) == 1 and host not in self.active_hosts:
+                heappush(self.ready_hosts, (self.next_fetch.get(host, 0), host))
+                self.has_ready_host.notify()
+
+    def _next_url(self):
+        ''' Pop a url from the first ready host. Returns (url, 0), or
+        (None, seconds until the next host is ready), or (None, None) when
+        nothing is queued. Must be called with the lock held. '''
+        while self.ready_hosts:
+            ready_at, host = self.ready_hosts[0]
+            wait = ready_at - time.monotonic()
+            if wait > 0:
+                return None, wait
+            heappop(self.ready_hosts)
+            # Hosts checked out with check_out_host meanwhile were
+            # rescheduled when they were released.
+            if (host not in self.active_hosts and host in self.host_queues
+                    and ready_at >= self.next_fetch.get(host, 0)):
+                break
+        else:
+            return None, None
+        self.active_hosts.add(host)
+        queue = self.host_queues[host]
+        _, _, url, depth = heappop(queue)
+        self.depths[url] = depth
+        self.queued -= 1
+        if not queue:
+            del self.host_queues[host]
+        return url, 0
+
     def get_tbd_url(self):
-        try:
-            return self.to_be_downloaded.pop()
-        except IndexError:
-            return None
+        ''' Block until some host is allowed to be fetched and return one of
+        its urls. Returns None once nothing is queued and no download is in
+        progress, since then no new urls can show up. '''
+        with self.lock:
+            while True:
+                url, wait = self._next_url()
+                if url is not None:
+                    return url
+                if wait is None and self._finished():
+                    return None
+                # Either a host becomes ready in `wait` seconds, or urls being
+                # downloaded right now can still add work.
+                self.has_ready_host.wait(wait)
 
-    def add_url(self, url):
-        url = normalize(url)
+    def poll_tbd_url(self):
+        ''' Non blocking get_tbd_url for event loop based workers. Returns
+        (url, 0) when a url is ready, (None, seconds) when the caller should
+        try again within that many seconds, and (None, None) once the crawl
+        is over. '''
+        with self.lock:
+            url, wait = self._next_url()
+            if url is None and wait is None and not self._finished():
+                return None, self.IDLE_POLL
+            return url, wait
+
+    def _finished(self):
+        ''' Whether no new urls can show up any more, once nothing is queued:
+        true when no download is in progress. Must be called with the lock
+        held. '''
+        return not self.active_hosts
+
+    def add_url(self, url, parent=None):
+        ''' Queue url unless it was seen before. parent is the url of the page
+        it was found on, which must still be checked out. '''
+        url = canonicalize(url)
+        depth = self.depths.get(parent, -1) + 1 if parent is not None else 0
+        self._add(url, depth, parent)
+
+    def _add(self, url, depth, parent=None):
+        ''' Persist and queue a canonical url unless it was seen before. '''
         urlhash = get_urlhash(url)
-        if urlhash not in self.save:
-            self.save[urlhash] = (url, False)
-            self.save.sync()
-            self.to_be_downloaded.append(url)
-    
+        with self.lock:
+            if self.seen.add(get_fingerprint(urlhash)):
+                with METRICS.timer("frontier_persist_seconds"):
+                    self.save[urlhash] = (url, False)
+                    self.save.commit()
+                self._enqueue(url, depth, parent)
+
     def mark_url_complete(self, url):
         urlhash = get_urlhash(url)
-        if urlhash not in self.save:
-            # This should not happen.
-            self.logger.error(
-                f"Completed url {url}, but have not seen it before.")
+        with self.lock:
+            if get_fingerprint(urlhash) not in self.seen:
+                # This should not happen.
+                self.logger.error(
+                    f"Completed url {url}, but have not seen it before.")
+
+            with METRICS.timer("frontier_persist_seconds"):
+                self.save[urlhash] = (url, True)
+                self.save.commit()
+            self.depths.pop(url, None)
+            self._release_host(self._host(url))
+
+    def set_crawl_delay(self, host, seconds):
+        ''' Wait at least seconds between downloads from host, when that is
+        longer than POLITENESS. '''
+        with self.lock:
+            self.crawl_delays[host.lower()] = seconds
+
+    def _delay(self, host):
+        return max(self.config.time_delay, self.crawl_delays.get(host, 0))
+
+    def wait_for_host(self, host):
+        ''' Sleep until host, which the caller has checked out, may be fetched
+        again and count a fetch from it now. For downloads that do not come
+        from get_tbd_url, like robots.txt and sitemaps. '''
+        host = host.lower()
+        with self.lock:
+            now = time.monotonic()
+            ready_at = max(now, self.next_fetch.get(host, 0))
+            self.next_fetch[host] = ready_at + self._delay(host)
+        time.sleep(ready_at - now)
+
+    def check_out_host(self, host):
+        ''' Check host out as get_tbd_url does, waiting until it may be
+        fetched, for a download of the caller's own. Returns False right away
+        when another worker has it checked out. Give it back with
+        release_host. '''
+        host = host.lower()
+        with self.lock:
+            while host not in self.active_hosts:
+                wait = self.next_fetch.get(host, 0) - time.monotonic()
+                if wait <= 0:
+                    self.active_hosts.add(host)
+                    return True
+                self.has_ready_host.wait(wait)
+            return False
+
+    def release_host(self, host):
+        ''' Give back a host taken with check_out_host. '''
+        self._release_host(host.lower())
 
-        self.save[urlhash] = (url, True)
-        self.save.sync()
+    def _release_host(self, host):
+        ''' Put host back in rotation POLITENESS (or its Crawl-delay) seconds
+        from now. '''
+        with self.lock:
+            if host not in self.active_hosts:
+                return
+            self.active_hosts.discard(host)
+            ready_at = time.monotonic() + self._delay(host)
+            self.next_fetch[host] = ready_at
+            if host in self.host_queues:
+                heappush(self.ready_hosts, (ready_at, host))
+            # Wake everyone: either a host was rescheduled or the crawl may
+            # have just run out of work.
+            self.has_ready_host.notify_all()
@@ -0,0 +1,111 @@
+import os
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Thread
+
+from utils import get_logger
+from utils.metrics import METRICS
+
+# Counters turned into per second rates on every export.
+RATES = {
+    "pages_per_second": "pages_downloaded_total",
+    "bytes_per_second": "bytes_downloaded_total",
+}
+
+
+class MetricsExporter(Thread):
+    ''' Writes the METRICS snapshot to METRICSFILE (JSON) and next to it with
+    a .prom extension (Prometheus text) every METRICSINTERVAL seconds, and
+    serves both on 127.0.0.1:METRICSPORT if the port is not 0.
+
+    Every export also adds the pages/s and bytes/s gauges, measured since the
+    previous export.
+    '''
+    def __init__(self, config, registry=METRICS):
+        self.logger = get_logger("METRICS")
+        self.registry = registry
+        self.path = config.metrics_file
+        self.interval = config.metrics_interval
+        self.port = config.metrics_port
+        self.stopped = Event()
+        self.server = None
+        self.last = None        # (time, {counter: value}) of the last export
+        self.rates = dict()
+        for gauge in RATES:
+            registry.gauge(gauge, lambda gauge=gauge: self.rates.get(gauge, 0.0))
+        super().__init__(daemon=True)
+
+    def run(self):
+        if self.port:
+            self._serve()
+        while not self.stopped.wait(self.interval):
+            self.export()
+
+    def _serve(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = exporter.registry.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = exporter.registry.to_json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        except OSError as e:
+            self.logger.error(f"Could not serve metrics on port {self.port}: {e}")
+            return
+        self.server.daemon_threads = True
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.logger.info(f"Serving metrics on http://127.0.0.1:{self.port}/metrics")
+
+    def _update_rates(self, now):
+        counters = {name: self.registry.counter(name) for name in RATES.values()}
+        if self.last is not None:
+            then, before = self.last
+            elapsed = max(now - then, 1e-9)
+            for gauge, name in RATES.items():
+                self.rates[gauge] = (counters[name] - before[name]) / elapsed
+        self.last = (now, counters)
+
+    def export(self):
+        ''' Write the current snapshot to the metrics files. '''
+        snapshot = self.registry.snapshot()
+        self._update_rates(snapshot["time"])
+        snapshot["gauges"].update(self.rates)
+        if not self.path:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            base, _ = os.path.splitext(self.path)
+            for path, text in ((self.path, self.registry.to_json(snapshot)),
+                               (base + ".prom", self.registry.to_prometheus(snapshot))):
+                with open(path + ".tmp", "w") as metrics_file:
+                    metrics_file.write(text)
+                os.replace(path + ".tmp", path)
+        except OSError as e:
+            self.logger.error(f"Failed to write metrics to {self.path}: {e}")
+
+    def stop(self):
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+        self.export()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
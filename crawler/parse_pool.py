@@ -0,0 +1,63 @@
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from threading import BoundedSemaphore, Lock
+
+import scraper
+
+
+class ParsePool(object):
+    ''' Parses pages in worker processes so html parsing is not serialized
+    by the GIL across fetch threads.
+
+    Workers hand over the page (decoded text or raw bytes) and get back a PageAnalysis (links,
+    token counts, word count); the analytics are merged by scraper.scraper in
+    the parent. At most queue_size pages are queued or parsing at a time,
+    further callers block until a slot frees up. Spawned workers import
+    scraper afresh, so they run scraper.configure with config first.
+    '''
+    def __init__(self, processes, queue_size, config=None):
+        settings = dict(initializer=scraper.configure, initargs=(config,)) if config is not None else dict()
+        self.executor = ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context("spawn"), **settings)
+        self.slots = BoundedSemaphore(queue_size)
+
+    def analyze_html(self, url, content):
+        ''' Drop-in for scraper.analyze_html that parses in a worker process. '''
+        self.slots.acquire()
+        try:
+            # memoryviews don't pickle, str and bytes do
+            if not isinstance(content, (str, bytes)):
+                content = bytes(content)
+            future = self.executor.submit(scraper.analyze_html, url, content)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future.result()
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+
+_pool = None
+_pool_lock = Lock()
+
+def get_parse_pool(config):
+    ''' The parse pool shared by all workers, or None if PARSEPROCESSES is 0
+    and pages are parsed on the worker thread itself. '''
+    global _pool
+    if config.parse_processes <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ParsePool(config.parse_processes, config.parse_queue, config)
+        return _pool
+
+def shutdown_parse_pool():
+    ''' Stop the shared parse pool's processes, if it was started. '''
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
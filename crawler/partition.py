@@ -0,0 +1,189 @@
+import os
+import time
+
+from multiprocessing.connection import Client, Listener
+from threading import Thread, Event, Lock
+
+from utils import get_logger, get_urlhash, get_fingerprint
+from utils.fingerprints import FingerprintSet
+from utils.hash_ring import HashRing
+from utils.metrics import METRICS
+from crawler.frontier import Frontier
+from scraper import canonicalize
+
+
+def parse_address(node):
+    host, _, port = node.rpartition(":")
+    return host, int(port)
+
+
+def partition_save_file(save_file, partition):
+    ''' frontier.shelve -> frontier.p1.shelve. The extension is kept since
+    it picks the save backend. '''
+    root, extension = os.path.splitext(save_file)
+    return f"{root}.p{partition}{extension}"
+
+
+class PartitionedFrontier(Frontier):
+    ''' Frontier of one process of a distributed crawl.
+
+    Every process is started with the same list of nodes (host:port) and
+    its own index in it. Hosts are spread over the nodes with a consistent
+    hash ring, so each host, and with it its politeness, belongs to exactly
+    one process. Urls of hosts owned by other nodes are deduplicated, put in
+    a per node outbox and sent in batches of PARTITIONBATCH urls, or every
+    PARTITIONFLUSHMS milliseconds, over a multiprocessing connection
+    authenticated with PARTITIONKEY. Received urls are saved and queued like
+    local ones, each process keeping its own save file. Connections unpickle
+    what they receive, so without a PARTITIONKEY no node is started.
+
+    The crawl is over once every node is idle and all urls sent were also
+    received. Node 0 asks all nodes for (idle, sent, received) every
+    PROBE_INTERVAL seconds and stops everyone after two rounds in a row
+    found them idle with the same, matching totals.
+    '''
+    PROBE_INTERVAL = 0.5
+    STOP_ATTEMPTS = 10
+
+    def __init__(self, config, restart):
+        if not config.partition_key:
+            raise ValueError("Set PARTITIONKEY (config.ini or environment) to the same secret on every node")
+        self.nodes = list(config.nodes)
+        self.partition = config.partition
+        self.address = self.nodes[self.partition]
+        self.ring = HashRing(self.nodes)
+        self.outbox = {node: list() for node in self.nodes if node != self.address}
+        self.routed = FingerprintSet()  # urls already sent to their owner
+        self.sent = 0
+        self.received = 0
+        self.stopped = False
+        self.authkey = config.partition_key.encode("utf-8")
+        self.peers = dict()             # node -> connection to it
+        self.peer_locks = {node: Lock() for node in self.outbox}
+        self.flush_now = Event()
+        # Bind before the seeds are added, so a port in use fails fast.
+        self.listener = Listener(parse_address(self.address), authkey=self.authkey)
+        super().__init__(config, restart)
+        self.logger = get_logger(f"FRONTIER-{self.partition}", "FRONTIER")
+        Thread(target=self._accept, daemon=True).start()
+        Thread(target=self._send_batches, daemon=True).start()
+        if self.partition == 0:
+            Thread(target=self._coordinate, daemon=True).start()
+
+    def add_url(self, url, parent=None):
+        url = canonicalize(url)
+        depth = self.depths.get(parent, -1) + 1 if parent is not None else 0
+        owner = self.ring.node_for(self._host(url))
+        if owner == self.address:
+            self._add(url, depth, parent)
+            return
+        with self.lock:
+            if not self.routed.add(get_fingerprint(get_urlhash(url))):
+                return
+            batch = self.outbox[owner]
+            batch.append((url, depth))
+            if len(batch) >= self.config.partition_batch:
+                self.flush_now.set()
+
+    def _finished(self):
+        return self.stopped
+
+    def _status(self):
+        with self.lock:
+            idle = not self.queued and not self.active_hosts and not any(self.outbox.values())
+            return idle, self.sent, self.received
+
+    def _stop(self):
+        with self.lock:
+            self.stopped = True
+            self.has_ready_host.notify_all()
+
+    def _send(self, node, message, reply=False):
+        ''' Send message to node over its connection, opened on first use.
+        Returns the node's reply (or True without one), None on failure. '''
+        with self.peer_locks[node]:
+            try:
+                connection = self.peers.get(node)
+                if connection is None:
+                    connection = self.peers[node] = Client(
+                        parse_address(node), authkey=self.authkey)
+                connection.send(message)
+                return connection.recv() if reply else True
+            except (OSError, EOFError):
+                # Not up yet or gone, reconnect on the next message.
+                connection = self.peers.pop(node, None)
+                if connection is not None:
+                    connection.close()
+                return None
+
+    def _send_batches(self):
+        while not self.stopped:
+            self.flush_now.wait(self.config.partition_flush_interval)
+            self.flush_now.clear()
+            for node in self.outbox:
+                with self.lock:
+                    batch = self.outbox[node]
+                    if not batch:
+                        continue
+                    self.outbox[node] = list()
+                    # Counted before it arrives, so a batch in flight keeps
+                    # sent ahead of received and the crawl from stopping.
+                    self.sent += len(batch)
+                if self._send(node, ("urls", batch)):
+                    METRICS.inc("partition_urls_sent_total", len(batch))
+                    continue
+                with self.lock:
+                    self.outbox[node][:0] = batch
+                    self.sent -= len(batch)
+
+    def _accept(self):
+        while True:
+            try:
+                connection = self.listener.accept()
+            except OSError:
+                return
+            except Exception as error:
+                self.logger.error(f"Refused a partition connection: {error}")
+                continue
+            Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection):
+        with connection:
+            while True:
+                try:
+                    kind, *body = connection.recv()
+                except (OSError, EOFError):
+                    return
+                if kind == "urls":
+                    with self.lock:
+                        self.received += len(body[0])
+                        for url, depth in body[0]:
+                            self._add(url, depth)
+                    METRICS.inc("partition_urls_received_total", len(body[0]))
+                elif kind == "status":
+                    connection.send(self._status())
+                elif kind == "stop":
+                    self.logger.info("Stopped by partition 0.")
+                    self._stop()
+
+    def _coordinate(self):
+        previous = None
+        while not self.stopped:
+            time.sleep(self.PROBE_INTERVAL)
+            statuses = [
+                self._send(node, ("status",), reply=True) if node in self.outbox
+                else self._status() for node in self.nodes]
+            if None in statuses or not all(idle for idle, _, _ in statuses):
+                previous = None
+                continue
+            totals = (sum(sent for _, sent, _ in statuses),
+                      sum(received for _, _, received in statuses))
+            if totals[0] == totals[1] and totals == previous:
+                self.logger.info("All partitions are idle, stopping the crawl.")
+                for node in self.outbox:
+                    for _ in range(self.STOP_ATTEMPTS):
+                        if self._send(node, ("stop",)):
+                            break
+                        time.sleep(self.PROBE_INTERVAL)
+                self._stop()
+            previous = totals
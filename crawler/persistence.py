@@ -0,0 +1,195 @@
+import atexit
+import json
+import os
+import shelve
+import time
+
+from threading import Thread, RLock
+
+from utils import get_logger, get_fingerprint
+from utils.fingerprints import FingerprintSet
+
+
+def open_save(config):
+    ''' Open the frontier save file named by SAVE. A name ending in .log gets
+    the append-only log, anything else the legacy shelve. '''
+    if config.save_file.endswith(".log"):
+        return LogSave(
+            config.save_file, config.save_flush_records,
+            config.save_flush_interval)
+    return ShelveSave(config.save_file)
+
+
+class ShelveSave(object):
+    ''' Legacy backend: a shelve synced to disk on every commit. '''
+    def __init__(self, path):
+        self.shelf = shelve.open(path)
+
+    def __contains__(self, urlhash):
+        return urlhash in self.shelf
+
+    def __len__(self):
+        return len(self.shelf)
+
+    def __setitem__(self, urlhash, value):
+        self.shelf[urlhash] = value
+
+    def fingerprints(self):
+        return (get_fingerprint(urlhash) for urlhash in self.shelf.keys())
+
+    def values(self):
+        return self.shelf.values()
+
+    def commit(self):
+        self.shelf.sync()
+
+    def close(self):
+        self.shelf.close()
+
+
+class LogSave(object):
+    ''' Append-only log of (urlhash, url, completed) records.
+
+    Writes are buffered and group committed once flush_records are pending
+    or flush_interval seconds have passed, whichever comes first. On open the
+    log is replayed and a torn last record left by a crash is cut off. When
+    the log holds too many superseded records it is rewritten with only the
+    latest record per url and atomically swapped in.
+
+    Only url fingerprints are kept in memory, in two FingerprintSets: every
+    url, and the completed ones. A completed url stays completed, as the
+    frontier never saves it as pending again.
+    '''
+    COMPACT_RATIO = 2
+    COMPACT_MIN_RECORDS = 10000
+
+    def __init__(self, path, flush_records=1000, flush_interval=0.5):
+        self.logger = get_logger("FRONTIER")
+        self.path = path
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.lock = RLock()
+        self.index = FingerprintSet()       # every url saved
+        self.completed = FingerprintSet()   # urls saved as completed
+        self.pending = list()
+        self.log_records = 0
+        self._replay()
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.last_flush = time.monotonic()
+        if self._needs_compaction():
+            self.compact()
+        self.closed = False
+        Thread(target=self._flush_periodically, daemon=True).start()
+        atexit.register(self.close)
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        good_bytes = 0
+        with open(self.path, "rb") as log:
+            for line in log:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    urlhash, _, completed = json.loads(line)
+                except ValueError:
+                    break
+                self._index(urlhash, completed)
+                self.log_records += 1
+                good_bytes += len(line)
+        if good_bytes < os.path.getsize(self.path):
+            self.logger.info(
+                f"Dropping torn records at the end of {self.path}.")
+            with open(self.path, "r+b") as log:
+                log.truncate(good_bytes)
+
+    def _index(self, urlhash, completed):
+        fingerprint = get_fingerprint(urlhash)
+        self.index.add(fingerprint)
+        if completed:
+            self.completed.add(fingerprint)
+
+    def _live_records(self, path):
+        ''' Yield the latest record of every url in the log at path. '''
+        written = FingerprintSet(len(self.index))
+        with open(path, "rb") as log:
+            for line in log:
+                urlhash, url, completed = json.loads(line)
+                fingerprint = get_fingerprint(urlhash)
+                if completed == (fingerprint in self.completed) and written.add(fingerprint):
+                    yield urlhash, url, completed
+
+    def __contains__(self, urlhash):
+        return get_fingerprint(urlhash) in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __setitem__(self, urlhash, value):
+        url, completed = value
+        with self.lock:
+            self._index(urlhash, completed)
+            self.pending.append(json.dumps([urlhash, url, completed]) + "\n")
+
+    def fingerprints(self):
+        return iter(self.index)
+
+    def values(self):
+        with self.lock:
+            self.flush()
+            return [(url, completed) for _, url, completed in self._live_records(self.path)]
+
+    def commit(self):
+        ''' Flush if enough records are pending or the last flush is old. '''
+        with self.lock:
+            if (len(self.pending) >= self.flush_records
+                    or time.monotonic() - self.last_flush >= self.flush_interval):
+                self.flush()
+                if self._needs_compaction():
+                    self.compact()
+
+    def flush(self):
+        with self.lock:
+            if self.pending:
+                self.file.write("".join(self.pending))
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                self.log_records += len(self.pending)
+                self.pending.clear()
+            self.last_flush = time.monotonic()
+
+    def _needs_compaction(self):
+        return self.log_records > (
+            self.COMPACT_RATIO * len(self.index) + self.COMPACT_MIN_RECORDS)
+
+    def compact(self):
+        with self.lock:
+            self.flush()
+            compact_path = self.path + ".compact"
+            records = 0
+            with open(compact_path, "w", encoding="utf-8") as compacted:
+                for record in self._live_records(self.path):
+                    compacted.write(json.dumps(list(record)) + "\n")
+                    records += 1
+                compacted.flush()
+                os.fsync(compacted.fileno())
+            self.file.close()
+            os.replace(compact_path, self.path)
+            self.file = open(self.path, "a", encoding="utf-8")
+            self.logger.info(
+                f"Compacted {self.path} from {self.log_records} to {records} records.")
+            self.log_records = records
+
+    def _flush_periodically(self):
+        while not self.closed:
+            time.sleep(self.flush_interval)
+            with self.lock:
+                if not self.closed and self.pending:
+                    self.flush()
+
+    def close(self):
+        with self.lock:
+            if not self.closed:
+                self.flush()
+                self.file.close()
+                self.closed = True
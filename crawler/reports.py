@@ -0,0 +1,61 @@
+from threading import Event, Thread
+
+from utils import get_logger
+import scraper
+
+
+class ReportFlusher(Thread):
+    ''' Writes the Report/ files, and saves the visited / rejected url
+    state, in the background instead of from the scraper every 50 pages.
+
+    Reports are flushed once REPORTPAGES more pages were visited or
+    REPORTINTERVAL seconds passed since the last flush, whichever comes first.
+    Only reports whose state changed since they were last written are
+    rendered again, and each is replaced atomically, so a crash never leaves
+    a half written report behind. stop() does one final flush.
+    '''
+    TICK = 1.0
+
+    def __init__(self, config):
+        self.logger = get_logger("REPORTS")
+        self.interval = config.report_interval
+        self.pages = config.report_pages
+        self.stopped = Event()
+        self.written = dict()   # path -> state of the report when last written
+        self.flushed_pages = 0
+        super().__init__(daemon=True)
+
+    def run(self):
+        waited = 0.0
+        while not self.stopped.wait(self.TICK):
+            waited += self.TICK
+            if waited >= self.interval or len(scraper.VISITED) - self.flushed_pages >= self.pages:
+                self.flush()
+                waited = 0.0
+
+    def flush(self):
+        ''' Write every report that changed since its last write. '''
+        self.flushed_pages = len(scraper.VISITED)
+        written = 0
+        for path, state, render in scraper.report_states():
+            if path in self.written and self.written[path] == state:
+                continue
+            try:
+                scraper.write_report(path, render())
+            except OSError as e:
+                self.logger.error(f"Failed to write {path}: {e}")
+                continue
+            self.written[path] = state
+            written += 1
+        try:
+            scraper.URL_STATE.flush()
+        except OSError as e:
+            self.logger.error(f"Failed to save the url state: {e}")
+        if written:
+            self.logger.info(f"[WRITE UPDATE] Processed {self.flushed_pages} pages, wrote {written} reports")
+
+    def stop(self):
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+        self.flush()
@@ -0,0 +1,251 @@
+import re
+import time
+import zlib
+
+from html import unescape
+from threading import Lock, Event
+from urllib.parse import urlparse, urljoin
+from weakref import WeakKeyDictionary
+
+from utils import get_logger
+from utils.download import download
+from utils.metrics import METRICS
+import scraper
+
+# Only the start of a huge robots.txt is read, as RFC 9309 allows.
+MAX_ROBOTS_BYTES = 500 * 1024
+_LOC = re.compile(r"<loc>\s*(.*?)\s*</loc>", re.S | re.I)
+
+
+def _gunzip(content, max_bytes=0):
+    ''' content decompressed, or None if it is not valid gzip or inflates
+    past max_bytes (0 for no cap), so a small bomb cannot fill memory. '''
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        data = decompressor.decompress(content, max_bytes + 1 if max_bytes else 0)
+    except zlib.error:
+        return None
+    if max_bytes and len(data) > max_bytes:
+        return None
+    return data
+
+
+class RobotsRules(object):
+    ''' The rules of one robots.txt for one user agent.
+
+    Allow and Disallow patterns are compiled into one regex, most specific
+    (longest) pattern first and Allow before Disallow of the same length, so
+    the first alternative that matches is the rule that applies. Checking a
+    url is a single re.match. '''
+    def __init__(self, text="", user_agent="*"):
+        self.crawl_delay = None
+        self.sitemaps = list()
+        rules = self._parse(text, user_agent.lower())
+        rules.sort(key=lambda rule: (-len(rule[0]), not rule[1]))
+        self.allows = [allow for _, allow in rules]
+        self.matcher = re.compile("|".join(
+            f"({self._to_regex(pattern)})" for pattern, _ in rules)) if rules else None
+
+    def _parse(self, text, user_agent):
+        ''' [(pattern, allow)] of the group that best matches user_agent:
+        the longest agent name contained in it, or else "*". '''
+        groups = dict()         # agent -> [(pattern, allow)]
+        delays = dict()         # agent -> crawl delay
+        agents = list()         # agents of the group being read
+        in_rules = False
+        for line in text.splitlines():
+            line = line.partition("#")[0].strip()
+            field, _, value = line.partition(":")
+            field, value = field.strip().lower(), value.strip()
+            if field == "user-agent":
+                if in_rules:
+                    agents = list()
+                    in_rules = False
+                agents.append(value.lower())
+                groups.setdefault(value.lower(), list())
+            elif field in ("allow", "disallow"):
+                in_rules = True
+                if value:
+                    for agent in agents:
+                        groups[agent].append((value, field == "allow"))
+            elif field == "crawl-delay":
+                in_rules = True
+                try:
+                    for agent in agents:
+                        delays[agent] = float(value)
+                except ValueError:
+                    pass
+            elif field == "sitemap" and value:
+                self.sitemaps.append(value)
+        matches = [agent for agent in groups if agent != "*" and agent in user_agent]
+        agent = max(matches, key=len) if matches else "*"
+        self.crawl_delay = delays.get(agent)
+        return list(groups.get(agent, ()))
+
+    @staticmethod
+    def _to_regex(pattern):
+        end = pattern.endswith("$")
+        if end:
+            pattern = pattern[:-1]
+        regex = ".*".join(re.escape(part) for part in pattern.split("*"))
+        return regex + "$" if end else regex
+
+    def allowed(self, path):
+        ''' Whether path (with its query) may be crawled. '''
+        if self.matcher is None or path == "/robots.txt":
+            return True
+        match = self.matcher.match(path)
+        return match is None or self.allows[match.lastindex - 1]
+
+
+class RobotsCache(object):
+    ''' robots.txt of every host, fetched once through the cache server.
+
+    The first url of a host to be checked fetches its robots.txt; other
+    threads asking for the same host meanwhile wait for that fetch instead of
+    starting their own. Rules are kept for ROBOTSTTL seconds. A missing
+    robots.txt (or an error) allows everything. When rules are fetched, the
+    host's Crawl-delay (at most ROBOTSMAXDELAY) is handed to the frontier and
+    up to SITEMAPLIMIT of its sitemaps are read for urls to seed it with.
+
+    These downloads keep to the frontier's politeness: the worker asking has
+    the host checked out and waits its delay before each of them, and before
+    the page it asked about. Sitemaps on other hosts check those out first.
+    '''
+    def __init__(self, config, frontier, fetch=download):
+        self.logger = get_logger("ROBOTS", "Worker")
+        self.config = config
+        self.frontier = frontier
+        self.fetch = fetch
+        self.lock = Lock()
+        self.rules = dict()     # scheme://host -> (RobotsRules, expires at)
+        self.pending = dict()   # scheme://host -> Event set once it is fetched
+
+    def allowed(self, url, fetch=True):
+        ''' Whether robots.txt lets us crawl url. With fetch False, hosts
+        whose rules are not known yet are allowed. '''
+        parsed = urlparse(url)
+        site = f"{parsed.scheme}://{parsed.netloc.lower()}"
+        rules = self._rules(site, fetch)
+        if rules is None:
+            return True
+        path = parsed.path or "/"
+        if parsed.query:
+            path += "?" + parsed.query
+        return rules.allowed(path)
+
+    def _rules(self, site, fetch):
+        while True:
+            with self.lock:
+                cached = self.rules.get(site)
+                if cached is not None and cached[1] > time.monotonic():
+                    return cached[0]
+                if not fetch:
+                    return None
+                waiting = self.pending.get(site)
+                if waiting is None:
+                    waiting = self.pending[site] = Event()
+                    break
+            waiting.wait()
+        try:
+            rules = self._fetch_rules(site)
+        except Exception as error:
+            self.logger.error(f"Failed to fetch {site}/robots.txt: {error}")
+            rules = RobotsRules()
+        with self.lock:
+            self.rules[site] = (rules, time.monotonic() + self.config.robots_ttl)
+            del self.pending[site]
+        waiting.set()
+        self._apply(site, rules)
+        # The page this was fetched for comes next from the same host.
+        self.frontier.wait_for_host(urlparse(site).netloc)
+        return rules
+
+    def _fetch(self, url, own_host):
+        ''' Download url once its host may be fetched. None when the host is
+        another one some other worker has checked out. '''
+        host = urlparse(url).netloc.lower()
+        if host == own_host:
+            self.frontier.wait_for_host(host)
+            return self.fetch(url, self.config, self.logger)
+        if not self.frontier.check_out_host(host):
+            return None
+        try:
+            return self.fetch(url, self.config, self.logger)
+        finally:
+            self.frontier.release_host(host)
+
+    def _fetch_rules(self, site):
+        METRICS.inc("robots_fetches_total")
+        resp = self._fetch(f"{site}/robots.txt", urlparse(site).netloc)
+        if resp.status != 200 or not resp.raw_response:
+            return RobotsRules()
+        text = resp.raw_response.content[:MAX_ROBOTS_BYTES].decode("utf-8", "replace")
+        return RobotsRules(text, self.config.user_agent)
+
+    def _apply(self, site, rules):
+        host = urlparse(site).netloc
+        if rules.crawl_delay:
+            self.frontier.set_crawl_delay(
+                host, min(rules.crawl_delay, self.config.robots_max_delay))
+        if rules.sitemaps and self.config.sitemap_limit > 0:
+            added = self.read_sitemaps(
+                (urljoin(site, sitemap) for sitemap in rules.sitemaps), host)
+            self.logger.info(f"Seeded {added} urls from the sitemaps of {host}.")
+
+    def read_sitemaps(self, sitemaps, own_host=None):
+        ''' Add the valid urls of the sitemaps (following sitemap indexes)
+        to the frontier, reading at most SITEMAPLIMIT files. own_host is the
+        host the caller has checked out; sitemaps on a host another worker
+        holds are skipped. Returns how many urls were passed on. '''
+        to_read = list(sitemaps)
+        read = added = 0
+        while to_read and read < self.config.sitemap_limit:
+            sitemap = to_read.pop(0)
+            read += 1
+            resp = self._fetch(sitemap, own_host)
+            if resp is None:
+                self.logger.info(f"Skipped sitemap {sitemap}, its host is being crawled.")
+                continue
+            if resp.status != 200 or not resp.raw_response:
+                continue
+            content = resp.raw_response.content
+            if content[:2] == b"\x1f\x8b":
+                content = _gunzip(content, self.config.max_page_bytes)
+                if content is None:
+                    self.logger.warning(f"Skipped sitemap {sitemap}, bad gzip or over MAXPAGEBYTES.")
+                    continue
+            text = content.decode("utf-8", "replace")
+            locations = [unescape(location) for location in _LOC.findall(text)]
+            if "<sitemapindex" in text:
+                to_read.extend(locations)
+                continue
+            for location in scraper.valid_links(locations):
+                self.frontier.add_url(location)
+                added += 1
+        return added
+
+
+# Frontier methods RobotsCache uses, beyond the ones every frontier has.
+FRONTIER_METHODS = ("set_crawl_delay", "wait_for_host", "check_out_host", "release_host")
+
+_caches = WeakKeyDictionary()
+_caches_lock = Lock()
+
+def get_robots_cache(config, frontier):
+    ''' The RobotsCache all workers of a frontier share, or None when ROBOTS
+    is off or the frontier lacks FRONTIER_METHODS. '''
+    if not config.robots:
+        return None
+    with _caches_lock:
+        if frontier in _caches:
+            return _caches[frontier]
+        missing = [name for name in FRONTIER_METHODS if not hasattr(frontier, name)]
+        if missing:
+            get_logger("ROBOTS", "Worker").warning(
+                f"ROBOTS is off: {type(frontier).__name__} has no {', '.join(missing)}.")
+            cache = None
+        else:
+            cache = RobotsCache(config, frontier)
+        _caches[frontier] = cache
+        return cache
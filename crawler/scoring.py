@@ -0,0 +1,35 @@
+from importlib import import_module
+
+import scraper
+
+# How many levels of depth a url shape that only ever gave bad pages is
+# pushed back by trap_aware.
+TRAP_PENALTY = 10
+
+
+def bfs(url, depth, parent):
+    ''' Breadth first within every host: shallow urls first, and urls of the
+    same depth in the order they were found. '''
+    return depth
+
+
+def trap_aware(url, depth, parent):
+    ''' bfs, but urls shaped like pages that turned out to be duplicates,
+    errors or empty are crawled later. '''
+    return depth + TRAP_PENALTY * scraper.TRAP_DETECTOR.bad_ratio_of(url)
+
+
+SCORERS = {"bfs": bfs, "trap_aware": trap_aware}
+
+
+def get_scorer(name):
+    ''' The scorer registered as name, or "module:function" for one of your
+    own. A scorer is called as scorer(url, depth, parent url or None) and
+    returns a number, lower is crawled first. '''
+    name = name.strip()
+    if ":" in name:
+        module, _, function = name.partition(":")
+        return getattr(import_module(module), function)
+    if name not in SCORERS:
+        raise ValueError(f"Unknown SCORER {name}, expected one of {sorted(SCORERS)} or module:function")
+    return SCORERS[name]
@@ -0,0 +1,68 @@
+import sys
+
+from utils.tokenizer import iter_file_tokens, word_frequencies
+
+
+def iter_tokens(file_path):
+    """ Runtime Complexity: O(n)
+    Generator version of tokenize(): yields the tokens of the file one at a time while reading it
+    in 1 MB chunks, so memory stays constant however large the file is. Each chunk is lowercased
+    and split on every byte that is not an ASCII (English) letter or digit with one
+    bytes.translate call, so the per character work runs in C. A token cut in two by the end of a
+    chunk is carried over to the next chunk. Every character is still looked at a constant number
+    of times, so the runtime is O(n), where n is the number of characters in the file."""
+    try:
+        yield from iter_file_tokens(file_path)
+    except FileNotFoundError:
+        print(f"File not found: {file_path}")
+        sys.exit(1)
+    except Exception as error:
+        print(f"Error while reading file:\n{error}")
+        sys.exit(1)
+
+
+def tokenize(file_path):
+    """ Runtime Complexity: O(n)
+    This method returns the list of tokens of the input file: sequences of ASCII (English)
+    alphanumeric characters, lowercased. Non-alphanumeric or non-English characters act as
+    delimiters that mark the end of a token. It collects the tokens of iter_tokens(), which
+    processes each character exactly once, so the overall runtime complexity grows linearly with
+    the size of the file, resulting in O(n), where n is the number of characters in the file."""
+    return list(iter_tokens(file_path))
+
+
+def computeWordFrequencies(token_list):
+    """ Runtime Complexity: O(m)
+    This method takes the tokens produced by the tokenizer (a list or the iter_tokens() generator)
+    and counts how often each one appears by iterating once through them with a Counter, whose
+    counting loop runs in C. Each dictionary insertion or update operation runs in constant average
+    time, meaning the total runtime scales linearly with the number of tokens processed, meaning
+    its runtime complexity is O(m), where m is the total number of tokens."""
+    return word_frequencies(token_list)
+
+def printFrequencies(token_freq):
+    """ Runtime Complexity: O(k log k)
+    This method sorts and displays the token frequencies in descending order. While printing itself
+    takes linear time, sorting the tokens by frequency dominates the runtime. Python’s built-in
+    sorted() function uses Timsort, which has an average and worst-case complexity of O(k log k),
+    where k is the number of unique tokens. Therefore, the overall runtime complexity for this
+    method is O(k log k)."""
+    sorted_tokens = sorted(token_freq.items(), key = lambda x: x[1], reverse=True)
+    for token, count in sorted_tokens:
+        print(f"{token} = {count}")
+
+
+if __name__ == "__main__":
+    """Runtime Complexity: O(n + m + k log k)
+    The main section of Part A orchestrates the tokenization, frequency computation, and frequency 
+    printing processes. It streams the tokens of the file (O(n)) straight into the word frequencies
+    (O(m)), without keeping a token list, and then sorts and prints them (O(k log k)). The overall runtime is O(n + m + k log k), where n 
+    (the number of characters) is typically much larger than m or k, the tokenization and sorting 
+    steps dominate the runtime."""
+    if len(sys.argv) != 2:
+        print("Incorrect input format (python3 -m crawler.tokenizer.PartA <textfile>)")
+        sys.exit(1)
+
+    file_path = sys.argv[1]
+    token_freq = computeWordFrequencies(iter_tokens(file_path))
+    printFrequencies(token_freq)
@@ -0,0 +1,156 @@
+import multiprocessing
+import os
+import sys
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor
+from zlib import crc32
+
+from utils.tokenizer import iter_file_tokens
+
+# Distinct tokens of one file held in memory before switching to temp files.
+MAX_VOCABULARY = 10_000_000
+# Temp files each input is split into by the external intersection.
+PARTITIONS = 64
+
+
+def _vocabulary(file_path, limit=MAX_VOCABULARY):
+    """ Set of the tokens of the file, or None once it holds more than limit tokens. """
+    vocabulary = set()
+    for token in iter_file_tokens(file_path):
+        vocabulary.add(token)
+        if len(vocabulary) > limit:
+            return None
+    return vocabulary
+
+
+def _spill(file_path, directory, index, partitions=PARTITIONS, limit=MAX_VOCABULARY):
+    """ Write the distinct tokens of the file to `partitions` temp files, picked by a crc32 of the
+    token (stable across processes, unlike hash()), so a token lands in the same partition for
+    every input. Tokens are deduplicated in batches of up to limit before being written. """
+    paths = [os.path.join(directory, f"{index}.{part}") for part in range(partitions)]
+    part_files = [open(path, "w", encoding="ascii") for path in paths]
+    try:
+        batch = set()
+
+        def write_batch():
+            buckets = [list() for _ in range(partitions)]
+            for token in batch:
+                buckets[crc32(token.encode("ascii")) % partitions].append(token)
+            for part_file, bucket in zip(part_files, buckets):
+                if bucket:
+                    part_file.write("\n".join(bucket))
+                    part_file.write("\n")
+            batch.clear()
+
+        for token in iter_file_tokens(file_path):
+            batch.add(token)
+            if len(batch) >= limit:
+                write_batch()
+        write_batch()
+    finally:
+        for part_file in part_files:
+            part_file.close()
+    return paths
+
+
+def _common_in_partition(paths, count=False):
+    """ Tokens of one partition found in every input (or how many there are). """
+    common = None
+    for path in paths:
+        with open(path, encoding="ascii") as part_file:
+            tokens = part_file.read().split()
+        common = set(tokens) if common is None else common.intersection(tokens)
+        if not common:
+            break
+    return len(common) if count else common
+
+
+def _map(function, arguments, processes):
+    """ map() over processes worker processes, or in this one for a single process. """
+    if processes <= 1 or len(arguments) <= 1:
+        return list(map(function, *zip(*arguments)))
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        return list(executor.map(function, *zip(*arguments)))
+
+
+def _external(file_paths, processes, partitions, limit, count):
+    with tempfile.TemporaryDirectory(prefix="common-tokens-") as directory:
+        spilled = _map(_spill, [
+            (path, directory, index, partitions, limit)
+            for index, path in enumerate(file_paths)], processes)
+        results = _map(_common_in_partition, [
+            (parts, count) for parts in zip(*spilled)], processes)
+    return sum(results) if count else set().union(*results)
+
+
+def _common(file_paths, processes, max_vocabulary, partitions, count):
+    for path in file_paths:
+        if not os.path.isfile(path):
+            print(f"File not found: {path}")
+            sys.exit(1)
+    # Smallest file first: its vocabulary is the one kept in memory.
+    file_paths = sorted(file_paths, key=os.path.getsize)
+    if processes > 1:
+        vocabularies = _map(_vocabulary, [(path, max_vocabulary) for path in file_paths], processes)
+        if None not in vocabularies:
+            common = set.intersection(*vocabularies)
+            return len(common) if count else common
+    else:
+        common = _vocabulary(file_paths[0], max_vocabulary)
+        if common is not None:
+            for path in file_paths[1:]:
+                if not common:
+                    break
+                # Streams the file against the set; only matches are kept.
+                common = common.intersection(iter_file_tokens(path))
+            return len(common) if count else common
+    return _external(file_paths, processes, partitions, max_vocabulary, count)
+
+
+def commonTokens(file_paths, processes=1, max_vocabulary=MAX_VOCABULARY, partitions=PARTITIONS):
+    """Runtime complexity: O(n1+...+nf)
+    Returns the set of tokens found in every one of the files. With one process, only the
+    vocabulary of the smallest file is kept as a set and every other file is streamed against it,
+    keeping only the tokens that matched, so peak memory is the smallest vocabulary rather than
+    all the token lists. With processes > 1 the files are tokenized in parallel worker processes,
+    each building the vocabulary of one file, and the sets are intersected at the end.
+
+    When a vocabulary grows past max_vocabulary tokens, the files are instead split into
+    `partitions` temp files by a hash of each token (in parallel too), so that a token always lands
+    in the same partition, and the partitions are then intersected one at a time. Every file is
+    still read a constant number of times, so the runtime stays linear in the total number of
+    characters n1+...+nf, while memory is bounded by the size of one partition."""
+    return _common(list(file_paths), processes, max_vocabulary, partitions, count=False)
+
+
+def findCommonTokens(file1, file2, processes=1, max_vocabulary=MAX_VOCABULARY):
+    """Runtime complexity: O(n1+n2)
+    It takes O(n) to tokenize a file, meaning that tokenizing the 2 input files costs O(n1+n2) for
+    input file1 and file2. Only the smaller file's tokens go into a hash set, which costs O(m1)
+    since insertion is done in constant time (since it's hash based). The tokens of the other file
+    are then streamed against that set, each look up being done in constant time, O(m2), and only
+    the common tokens are kept. The overall time complexity O(n1+n2)+O(m1+m2) is dominated by
+    O(n1+n2) since n >= m. See commonTokens() for what happens when the vocabulary does not fit
+    in memory (max_vocabulary) or with several processes."""
+    return _common([file1, file2], processes, max_vocabulary, PARTITIONS, count=True)
+
+
+if __name__ == "__main__":
+    """Runtime complexity: O(n1+...+nf)
+     Since the main work is done inside findCommonTokens(), the overall runtime of this method
+     remains O(n1+n2), dominated by the cost of tokenizing both input files. With more than two
+     files, the number of tokens common to all of them is printed, tokenizing the files in
+     parallel on every core."""
+
+    if len(sys.argv) < 3:
+        print("Incorrect input format (python3 -m crawler.tokenizer.PartB <file1> <file2> [<file3> ...])")
+        sys.exit(1)
+
+    file_paths = sys.argv[1:]
+    if len(file_paths) == 2:
+        count = findCommonTokens(*file_paths)
+    else:
+        count = len(commonTokens(file_paths, processes=min(len(file_paths), os.cpu_count() or 1)))
+    print(count)
@@ -0,0 +1,2 @@
+from utils.tokenizer import (
+    CHUNK_SIZE, tokenize_bytes, tokenize_text, iter_file_tokens, word_frequencies)
@@ -3,8 +3,9 @@ from threading import Thread
 from inspect import getsource
 from utils.download import download
 from utils import get_logger
+from crawler.parse_pool import get_parse_pool
+from crawler.robots import get_robots_cache
 import scraper
-import time
 
 
 class Worker(Thread):
@@ -12,23 +13,36 @@ class Worker(Thread):
         self.logger = get_logger(f"Worker-{worker_id}", "Worker")
         self.config = config
         self.frontier = frontier
+        parse_pool = get_parse_pool(config)
+        self.analyzer = parse_pool.analyze_html if parse_pool else None
+        self.robots = get_robots_cache(config, frontier)
         # basic check for requests in scraper
         assert {getsource(scraper).find(req) for req in {"from requests import", "import requests"}} == {-1}, "Do not use requests in scraper.py"
         assert {getsource(scraper).find(req) for req in {"from urllib.request import", "import urllib.request"}} == {-1}, "Do not use urllib.request in scraper.py"
         super().__init__(daemon=True)
-        
+
     def run(self):
         while True:
+            # Blocks until a host is polite to hit again, so no sleep here.
             tbd_url = self.frontier.get_tbd_url()
             if not tbd_url:
                 self.logger.info("Frontier is empty. Stopping Crawler.")
                 break
-            resp = download(tbd_url, self.config, self.logger)
-            self.logger.info(
-                f"Downloaded {tbd_url}, status <{resp.status}>, "
-                f"using cache {self.config.cache_server}.")
-            scraped_urls = scraper.scraper(tbd_url, resp)
-            for scraped_url in scraped_urls:
-                self.frontier.add_url(scraped_url)
-            self.frontier.mark_url_complete(tbd_url)
-            time.sleep(self.config.time_delay)
+            try:
+                if self.robots is not None and not self.robots.allowed(tbd_url):
+                    scraper.log_debug("robots_disallowed", tbd_url)
+                    continue
+                resp = download(tbd_url, self.config, self.logger, scraper.PAGE_TYPES)
+                self.logger.info(
+                    f"Downloaded {tbd_url}, status <{resp.status}>, "
+                    f"using cache {self.config.cache_server}.")
+                scraped_urls = scraper.scraper(tbd_url, resp, self.analyzer)
+                for scraped_url in scraped_urls:
+                    # Hosts whose robots.txt is known are filtered right away.
+                    if self.robots is None or self.robots.allowed(scraped_url, fetch=False):
+                        self.frontier.add_url(scraped_url, tbd_url)
+            except Exception as e:
+                self.logger.error(f"Failed to crawl {tbd_url}: {e}")
+            finally:
+                # Always hand the host back, or its queue would stall.
+                self.frontier.mark_url_complete(tbd_url)
@@ -1,17 +1,46 @@
+import os
+
 from configparser import ConfigParser
 from argparse import ArgumentParser
 
 from utils.server_registration import get_cache_server
 from utils.config import Config
-from crawler import Crawler
+from crawler import Crawler, Worker, AsyncWorker
+from crawler.frontier import Frontier
+from crawler.partition import PartitionedFrontier, partition_save_file
+
+
+ENGINES = {"threaded": Worker, "async": AsyncWorker}
 
 
-def main(config_file, restart):
+def main(config_file, restart, engine="threaded", record=None, replay=None,
+         nodes=None, partition=None):
     cparser = ConfigParser()
     cparser.read(config_file)
     config = Config(cparser)
-    config.cache_server = get_cache_server(config, restart)
-    crawler = Crawler(config, restart)
+    frontier_factory = Frontier
+    if nodes:
+        # One process of a distributed crawl, owning a share of the hosts.
+        config.nodes = nodes.split(",")
+        assert partition is not None and 0 <= partition < len(config.nodes), \
+            "--partition must be the index of this process in --nodes"
+        assert config.partition_key, \
+            "Set PARTITIONKEY in config.ini or the environment, the same secret on every node"
+        config.partition = partition
+        config.save_file = partition_save_file(config.save_file, partition)
+        frontier_factory = PartitionedFrontier
+    if record:
+        config.record_dir = record
+    if replay:
+        # Pages come from disk: no cache server and no politeness needed.
+        assert os.path.isdir(replay), f"No recorded responses in {replay}"
+        config.record_dir = replay
+        config.replay = True
+        config.time_delay = 0
+    else:
+        config.cache_server = get_cache_server(config, restart)
+    crawler = Crawler(
+        config, restart, frontier_factory=frontier_factory, worker_factory=ENGINES[engine])
     crawler.start()
 
 
@@ -19,5 +48,12 @@ if __name__ == "__main__":
     parser = ArgumentParser()
     parser.add_argument("--restart", action="store_true", default=False)
     parser.add_argument("--config_file", type=str, default="config.ini")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="threaded")
+    replay = parser.add_mutually_exclusive_group()
+    replay.add_argument("--record", type=str, help="also store every response in this directory")
+    replay.add_argument("--replay", type=str, help="crawl the responses stored in this directory")
+    parser.add_argument("--nodes", type=str, help="host:port of every process of a distributed crawl, comma separated")
+    parser.add_argument("--partition", type=int, help="index of this process in --nodes")
     args = parser.parse_args()
-    main(args.config_file, args.restart)
+    main(args.config_file, args.restart, args.engine, args.record, args.replay,
+         args.nodes, args.partition)
@@ -1,19 +1,47 @@
-import re
-import gc
 import os
-from urllib.parse import urljoin, urldefrag, urlparse
-from bs4 import BeautifulSoup
-from lxml import html
+import atexit
+from collections import Counter
+from threading import Lock
+from urllib.parse import urljoin, urlparse
+from lxml import etree, html
+
+from utils.canonical import Canonicalizer, make_canonicalizer
+from utils.url_filter import UrlFilter
+from utils.url_state import UrlStateStore, UrlStateView, VISITED as VISITED_FLAG, REJECTED
+from utils.tokenizer import tokenize_text
+from utils.trap_detector import TrapDetector
+from utils.simhash import DuplicateIndex, checksum, simhash
+from utils.word_counter import make_word_counter
+from utils.metrics import METRICS
+from utils.response import Response, TOO_LARGE_STATUS
 
 os.makedirs('Report', exist_ok=True)
 
-DO_NOT_ENTER = set()
-VISITED = set() 
-COMMON_WORDS = dict()
+# Visited and rejected urls, as fingerprints, see utils.url_state. The
+# Crawler saves them next to the frontier save file.
+URL_STATE = UrlStateStore()
+DO_NOT_ENTER = UrlStateView(URL_STATE, REJECTED)
+VISITED = UrlStateView(URL_STATE, VISITED_FLAG)
+COMMON_WORDS = Counter()
 SUBDOMAINS = dict()
 LONGEST_PAGE = ('', 0)
+# Worker threads update SUBDOMAINS and LONGEST_PAGE concurrently.
+_report_lock = Lock()
+# Pages whose content (nearly) repeats an earlier page: url -> url of that page
+DUPLICATE_PAGES = dict()
+DUPLICATES = DuplicateIndex()
 
 DEBUG_LOG_FILE = "Report/crawler_debug_log.txt"
+# Rejections are written to DEBUG_LOG_FILE in batches of this many lines.
+DEBUG_LOG_BUFFER = 500
+_debug_lines = []
+_debug_lock = Lock()
+
+# Shortest token counted as a word on a page.
+MIN_TOKEN_LENGTH = 3
+# Content-Types worth parsing. Workers pass them to download, so big pages
+# of other types are turned down before they are unpickled.
+PAGE_TYPES = ('text/html',)
 
 debug_stats = {
     "already_visited": 0,
@@ -28,29 +56,33 @@ debug_stats = {
 
 
 
-def scraper(url, resp):
+def scraper(url, resp, analyzer=None):
+    """ analyzer: optional stand-in for analyze_html(url, content), e.g. one
+        that parses in another process. Analytics are always merged here. """
     global DO_NOT_ENTER
 
-    links = extract_next_links(url, resp)
-    valids = [link for link in links if is_valid(link)]
+    analysis = analyze_page(url, resp, analyzer)
+    valids = valid_links(analysis.links)
 
+    good_page = False
     if resp.status == 200 and url not in DO_NOT_ENTER:
+        if is_duplicate_page(url, analysis):
+            TRAP_DETECTOR.record(url, False)
+            return []
+
         VISITED.add(url)
+        METRICS.inc("pages_visited_total")
         subdomains(url)
 
-        if not word_count_check(resp):
-            tokens = tokenize(resp)
-            if tokens:
-                confirm_longest_page(url, len(tokens))
-                word_freq(tokens)
-
+        if not word_count_out_of_range(analysis.word_count):
+            if analysis.token_counts:
+                good_page = True
+                confirm_longest_page(url, analysis.word_count)
+                word_freq(analysis.token_counts)
+    # errors, duplicates and pages without usable text count against the url's shape
+    TRAP_DETECTOR.record(url, good_page)
 
-    if len(VISITED) % 50 == 0:
-        common_words_file()
-        longest_page_file()
-        subdomain_write()
-        unique_pages_write()
-        print(f"[WRITE UPDATE] Processed {len(VISITED)} pages")
+    # Reports are written in the background by crawler.reports.ReportFlusher
     return valids
 
 def extract_next_links(url, resp):
@@ -65,63 +97,122 @@ def extract_next_links(url, resp):
     #         resp.raw_response.content: the content of the page!
     # Return a list with the hyperlinks (as strings) scrapped from resp.raw_response.content
     """
-    links = set()
-
+    return [link for link in analyze_page(url, resp).links if is_valid(link)]
+
+
+class PageAnalysis(object):
+    """ Links, visible token counts, word count and content fingerprints of one
+        page, from a single parse. Small and picklable, so it can come back
+        from a parsing process. """
+    def __init__(self, links=(), token_counts=None, checksum=None, simhash=None):
+        self.links = list(links)
+        self.token_counts = token_counts if token_counts is not None else Counter()
+        self.word_count = sum(self.token_counts.values())
+        self.checksum = checksum
+        self.simhash = simhash
+
+
+def analyze_page(url, resp, analyzer=None):
+    """ Parse the page in resp once and return its PageAnalysis.
+        Pages without usable html are marked DO_NOT_ENTER and analyze as empty. """
+    content = page_content(url, resp)
+    if content is None:
+        return PageAnalysis()
+    with METRICS.timer("parse_seconds"):
+        return (analyzer or analyze_html)(served_url(url, resp), content)
+
+def served_url(url, resp):
+    """ The url resp was served from, after redirects, which relative links
+        resolve against: the canonical url drops index.html and trailing
+        slashes, so /dir/index.html is fetched as /dir and served from /dir/.
+        url itself when resp does not say. """
+    served = getattr(resp.raw_response, 'url', None)
+    return served if isinstance(served, str) and served else url
+
+def page_content(url, resp):
+    """ Return the html of resp, or None if there is nothing to parse.
+        A Response hands over its text, decoded once; other responses (test
+        doubles) the bytes of their raw_response. """
+    # A Response has headers and content of its own, read from raw_response
+    page = resp if isinstance(resp, Response) else resp.raw_response
     # log urls without 200 response (okay) and return empty set
-    if resp.status != 200 or resp.raw_response is None:
-        
-        DO_NOT_ENTER.add(url)
+    if resp.status != 200 or page is None or page.headers is None:
+        DO_NOT_ENTER.add(url, "too_large" if resp.status == TOO_LARGE_STATUS else "http_error")
         print(f'Skip {url} - HTTP: {resp.status}')
-        return list(links)
+        return None
 
     # check for non-HTML pages (pdf, css, js, etc.)
-    page_type = resp.raw_response.headers.get('Content-Type', '').lower()
-    if 'text/html' not in page_type:
-        DO_NOT_ENTER.add(url)
-        return list(links)
-
-    # Avoid urls with too little/much info
-    #TODO: process the link before -> moved to scraper()
-    # if word_count_check(resp):
-    #     DO_NOT_ENTER.add(url)
-    #     return list(links)
-
-    # Already Seen, ignore
-    #if url in VISITED:
-        #print(f'Seen: {url}')
-        #return list(links)
-
-    # Ensure url contains text, not binary
+    page_type = page.headers.get('Content-Type', '').lower()
+    if not any(content_type in page_type for content_type in PAGE_TYPES):
+        DO_NOT_ENTER.add(url, "not_html")
+        return None
+
+    return resp.text if page is resp else page.content
+
+def analyze_html(url, content):
+    """ Decode and parse content served from url once; collect its links, then its visible text tokens. """
+    tree = parse_html(content)
+    if tree is None:
+        return PageAnalysis()
     try:
-        decoded_html = resp.raw_response.content.decode('utf-8', errors='replace')
-    except Exception as e:
-        DO_NOT_ENTER.add(url)
-        return list(links)
-
-    # Add url to visited and update subdomains
-    #VISITED.add(url)
-    #subdomains(url)
-
-    # Retrieve links without fragments and complete checks to ensure validity
-    try:
-        soup = BeautifulSoup(decoded_html, 'lxml')
-        for tag in soup.find_all('a', href=True):
-            og_url= urljoin(url, tag['href'])
-            clean_url, _ = urldefrag(og_url)
-            # check validity
-            if is_valid(clean_url):
-                links.add(clean_url)
+        links = page_links(url, tree)
     except Exception as e:
         print(f"Error extracting links from {url}: {e}")
-    finally: # memory
-        if 'soup' in locals():
-            del soup
-    if 'decoded_html' in locals():
-        del decoded_html
-    gc.collect()
-
+        links = []
+    with METRICS.timer("tokenize_seconds"):
+        tokens = page_tokens(tree)
+    token_counts = Counter(tokens)
+    return PageAnalysis(links, token_counts, checksum(tokens), simhash(token_counts))
+
+def parse_html(content):
+    """ lxml tree of the html in content (str, or bytes decoded as utf-8),
+        or None if it can't be parsed. """
+    try:
+        # Ensure url contains text, not binary
+        decoded_html = content if isinstance(content, str) else str(content, 'utf-8', errors='replace')
+        try:
+            return html.document_fromstring(decoded_html)
+        except ValueError:
+            # str input can't carry an xml encoding declaration, let lxml decode
+            return html.document_fromstring(
+                content.encode('utf-8') if isinstance(content, str) else bytes(content))
+    except (etree.ParserError, ValueError, AttributeError):
+        return None
+
+def page_links(url, tree):
+    """ Absolute, canonical hrefs of all anchors in tree, without duplicates. """
+    links = dict()
+    canonical = CANONICALIZER.canonicalize
+    for href in tree.xpath('//a/@href'):
+        links[canonical(urljoin(url, href))] = None
     return list(links)
 
+def canonicalize(url):
+    """ The one spelling of url the crawler saves and fetches, see utils.canonical. """
+    return CANONICALIZER.canonicalize(url)
+
+def page_tokens(tree):
+    """ Lowercased alphanumeric tokens of the visible text in tree.
+        Drops script/style from the tree, so collect links first. """
+    etree.strip_elements(tree, 'script', 'style', 'template', with_tail=False)
+    text = ' '.join(tree.itertext())
+    return tokenize_text(text, MIN_TOKEN_LENGTH)
+
+
+def configure(config):
+    """ Rebuild the config dependent rules. Called once by the Crawler. """
+    global URL_FILTER, TRAP_DETECTOR, WORD_COUNTER, COMMON_WORDS, CANONICALIZER
+    URL_FILTER = UrlFilter(
+        config.allowed_domains or ALLOWED_DOMAINS, trap_keywords, BLOCKED_EXTENSIONS)
+    TRAP_DETECTOR = TrapDetector(
+        config.trap_max_depth, config.trap_max_repeats, config.trap_query_fanout,
+        config.trap_min_pages, config.trap_bad_ratio)
+    WORD_COUNTER = make_word_counter(
+        config.word_counter, stop_words, COMMON_WORDS, config.sketch_width,
+        config.sketch_depth, config.top_k_words)
+    COMMON_WORDS = WORD_COUNTER.counts
+    CANONICALIZER = make_canonicalizer(config)
+
 
 def is_valid(url):
     """ Decide whether to crawl this url (True) or not (False) """
@@ -129,106 +220,115 @@ def is_valid(url):
     global DO_NOT_ENTER
     
     try:
-        parsed = urlparse(url)
-        clean_url, _ = urldefrag(url)
-        domain = parsed.netloc.lower()
-        base = parsed.netloc
+        clean_url, _, _ = url.partition('#')
 
-        if clean_url in DO_NOT_ENTER or clean_url in VISITED:
+        if URL_STATE.state(clean_url) & (VISITED_FLAG | REJECTED):
             log_debug("already_visited", clean_url)
             return False
 
-        if parsed.scheme not in {"http", "https"}:
-            log_debug("invalid_scheme", clean_url)
-            return False
-
-        allowed_domains = ["ics.uci.edu", "cs.uci.edu", "informatics.uci.edu", "stat.uci.edu"]
-        # Fix domain matching to allow subdomains of the allowed domains
-        domain_valid = any(
-            domain == allowed_domain or
-            domain.endswith("." + allowed_domain)
-            for allowed_domain in allowed_domains
-        )
-
-        if not domain_valid:
-            log_debug("outside_allowed_domain", clean_url)
-            return False
-        # if not any(
-        #     domain == allowed or domain.endswith("." + allowed)
-        #     for allowed in allowed_domains
-        # ):
-        #     log_debug("outside_allowed_domain", clean_url)
-        #     return False
-
-        # avoiding traps
-        trap_detected = any(keyword in clean_url.lower() for keyword in trap_keywords)
-        if trap_detected:
-            # print(f"[DEBUG] REJECTED: Trap keyword detected")
-            log_debug("trap_keyword", clean_url)
-            DO_NOT_ENTER.add(clean_url)
-            return False
-        
-        # block any events folders (calendars tend to be traps)
-        #if re.search(r"/events?(/|$)", clean_url.lower()):
-            #log_debug("events_folder", clean_url)
-            #DO_NOT_ENTER.add(clean_url)
-            #return False
-
-
-        file_match = re.search(
-            r"\.(css|js|bmp|gif|jpe?g|ico"
-            + r"|png|tiff?|mid|mp2|mp3|mp4"
-            + r"|wav|avi|mov|mpeg|ram|m4v|mkv|ogg|ogv|pdf"
-            + r"|ps|eps|tex|ppt|pptx|doc|docx|xls|xlsx|names"
-            + r"|data|dat|exe|bz2|tar|msi|bin|7z|psd|dmg|iso"
-            + r"|epub|dll|cnf|tgz|sha1"
-            + r"|thmx|mso|arff|rtf|jar|csv"
-            + r"|rm|smil|wmv|swf|wma|zip|rar|gz)$", parsed.path.lower())
-
-        if file_match:
-            log_debug("blocked_extension", clean_url)
+        # scheme, allowed domains, trap keywords and file extensions, then
+        # the url statistics of the crawl so far
+        reason = URL_FILTER.check(clean_url) or TRAP_DETECTOR.check(clean_url)
+        if reason is not None:
+            reject_url(reason, clean_url)
             return False
 
-        debug_stats["valid"] += 1
+        with _debug_lock:
+            debug_stats["valid"] += 1
+        METRICS.inc("urls_accepted_total")
         return True
 
     except Exception as error:
         log_debug("validation_error", url)
         print(f"[IS_VALID ERROR] Failed to validate {url}: {error}")
-        DO_NOT_ENTER.add(url)
+        DO_NOT_ENTER.add(url, "validation_error")
         return False
 
+def valid_links(urls):
+    """ is_valid for a whole page of defragmented links in one call """
+    with METRICS.timer("is_valid_seconds"):
+        fresh = []
+        for url in urls:
+            if URL_STATE.state(url) & (VISITED_FLAG | REJECTED):
+                log_debug("already_visited", url)
+            else:
+                fresh.append(url)
+        valids = URL_FILTER.filter_many(fresh, on_reject=reject_url)
+        valids = TRAP_DETECTOR.filter_many(valids, on_reject=reject_url)
+    with _debug_lock:
+        debug_stats["valid"] += len(valids)
+    METRICS.inc("urls_accepted_total", len(valids))
+    return valids
+
+def reject_url(reason, url):
+    log_debug(reason, url)
+    if reason in ("trap_keyword", "validation_error"):
+        DO_NOT_ENTER.add(url, reason)
+
+def is_duplicate_page(url, analysis):
+    """ Record url as a duplicate if its content matches or nearly matches a page
+        seen before. Duplicates are neither counted nor expanded. """
+    if not analysis.token_counts:
+        return False
+    original = DUPLICATES.check_and_add(url, analysis.checksum, analysis.simhash)
+    if original is None:
+        return False
+    DUPLICATE_PAGES[url] = original
+    log_debug("duplicate_page", url)
+    return True
+
 # HELPER FUNCTIONS:
 # 4 analytics functions + their helpers
+def write_report(path, text):
+    """ Replace the report at path with text atomically (temp file + rename) """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as txtfile:
+        txtfile.write(text)
+    os.replace(tmp_path, path)
+
 def unique_pages_write(): #done/untested
     """ Q1:Writes the total # of unique pages successfully crawled to a file """
-    with open("Report/UniquePages.txt", "w") as unique_pages:
-        unique_pages.write(f"Unique Pages: {len(VISITED)}")
+    write_report("Report/UniquePages.txt", unique_pages_text())
     return
 
+def unique_pages_text():
+    return render_unique_pages(len(VISITED))
+
+def render_unique_pages(count):
+    return f"Unique Pages: {count}"
+
 
 def confirm_longest_page(url, pageLength): #done/untested
     '''Q2: Check if url is the new longest page and update LONGEST_PAGE.'''
     global LONGEST_PAGE
-    if LONGEST_PAGE[1] < pageLength:
-        LONGEST_PAGE = (url, pageLength)
+    with _report_lock:
+        if LONGEST_PAGE[1] < pageLength:
+            LONGEST_PAGE = (url, pageLength)
 
 def longest_page_file(): #done/untested
     '''Q2: Write the longest page's url and # of words.'''
-    global LONGEST_PAGE
-    with open('Report/LongestPage.txt', 'w') as txtfile:
-        txtfile.write(f'Longest Page URL: {LONGEST_PAGE[0]} | # of Words: {LONGEST_PAGE[1]}')
+    write_report('Report/LongestPage.txt', longest_page_text())
+
+def longest_page_text():
+    return render_longest_page(LONGEST_PAGE)
+
+def render_longest_page(longest_page):
+    url, length = longest_page
+    return f'Longest Page URL: {url} | # of Words: {length}'
 
 
 def common_words_file(): #done/untested
     '''Q3: Write 50 most common words and their frequency in entire set of pages crawled. '''
-    global COMMON_WORDS
-    # ignore english stop words
-    with open('Report/CommonWords.txt', 'w') as txtfile:
-        string = ""  # Initialize string variable
-        for freq, item in enumerate(sorted(COMMON_WORDS.items(), key=lambda x: x[1], reverse=True)[:50]):
-            string += f'{freq+1}, {item[0]} - {item[1]}\n'
-        txtfile.write(string)  # Write the complete string
+    write_report('Report/CommonWords.txt', common_words_text())
+
+def common_words_text():
+    # stop words are left out by WORD_COUNTER
+    return render_common_words(WORD_COUNTER.most_common(50))
+
+def render_common_words(most_common):
+    return ''.join(
+        f'{freq+1}, {item[0]} - {item[1]}\n'
+        for freq, item in enumerate(most_common))
 
 
 # def subdomains(url):
@@ -263,72 +363,86 @@ def common_words_file(): #done/untested
 
 def subdomains(url):
     global SUBDOMAINS
+    host = subdomain_of(url)
+    if host is not None:
+        with _report_lock:
+            SUBDOMAINS[host] = SUBDOMAINS.get(host, 0) + 1
+
+def subdomain_of(url):
+    """ The uci.edu subdomain url counts towards in Q4, or None """
     try:
         parsed = urlparse(url)
         host = parsed.hostname  # this strips any port
         if not host:
-            return
+            return None
 
         host = host.lower().rstrip('.')  # normalize
 
         # Only consider uci.edu subdomains
         if not host.endswith('.uci.edu'):
-            return
+            return None
 
         # Exclude the root and common www host
         if host == 'uci.edu' or host == 'www.uci.edu':
-            return
+            return None
 
         # At this point host is something like 'ics.uci.edu' or 'vision.ics.uci.edu'
-        SUBDOMAINS[host] = SUBDOMAINS.get(host, 0) + 1
+        return host
 
     except Exception as e:
         # don't crash the crawler because of a weird URL
         print(f"Error in subdomains for {url}: {e}")
+        return None
 
 def subdomain_write(): #done/untested
     """ Q4 Writes what subdomains are visited in a file """
-    with open("Report/subdomains.txt", "w") as subdomains:
-        subdomains.write(f"# of Subdomains: {len(SUBDOMAINS)}\n\n") # Subdomain Number: 3
-        subdomains.write("Subdomain Name, # of Unique Pages in Subdomain\n\n")
-        for item in sorted(SUBDOMAINS):
-            subdomains.write(f"{item}, {SUBDOMAINS[item]}\n") # cs.uci.edu, 25
+    write_report("Report/subdomains.txt", subdomains_text())
     return
+
+def subdomains_text():
+    with _report_lock:
+        snapshot = dict(SUBDOMAINS)
+    return render_subdomains(snapshot)
+
+def render_subdomains(snapshot):
+    lines = [f"# of Subdomains: {len(snapshot)}\n\n"] # Subdomain Number: 3
+    lines.append("Subdomain Name, # of Unique Pages in Subdomain\n\n")
+    for item in sorted(snapshot):
+        lines.append(f"{item}, {snapshot[item]}\n") # cs.uci.edu, 25
+    return ''.join(lines)
+
+def report_states():
+    """ For each report: (path, cheap value that changes whenever the report does,
+        function rendering its text). Used by the background report flusher. """
+    return [
+        ("Report/UniquePages.txt", len(VISITED), unique_pages_text),
+        ("Report/LongestPage.txt", LONGEST_PAGE, longest_page_text),
+        ("Report/CommonWords.txt", WORD_COUNTER.updates, common_words_text),
+        ("Report/subdomains.txt", len(VISITED), subdomains_text),
+    ]
     
     
 
 def tokenize(resp):
     """Extracts & filters alphanumeric tokens from actual page content only"""
     try:
-        soup = BeautifulSoup(resp.raw_response.content, 'lxml')
-        for element in soup(['script', 'style']):
-            element.decompose()
-        text = soup.get_text(separator=' ')
-        text = ' '.join(text.split())
-
-        tokens = re.findall(r'\b[a-zA-Z0-9]{3,}\b', text)
-        token_list = [token.lower() for token in tokens]
-        return token_list
+        tree = parse_html(resp.text if isinstance(resp, Response) else resp.raw_response.content)
+        return page_tokens(tree) if tree is not None else []
     except Exception as error:
         print(f"[TOKENIZER ERROR] {error}")
         return []
     
 def word_freq(token_list): #done/untested
-#TODO: use counters instead of dict
-    """ Counts word frequencies from token list """
-    global COMMON_WORDS
-    for token in token_list:
-        if token not in stop_words and token.isalpha():
-            if token not in COMMON_WORDS:
-                COMMON_WORDS[token] = 1
-            else:
-                COMMON_WORDS[token] += 1
+    """ Counts word frequencies from token list, or merges a {token: count} mapping """
+    WORD_COUNTER.update(token_list)
 
 
 def word_count_check(resp): #done/untested
     """ Check if webpage has useable word count (100-100000) """
-    word_count = len(tokenize(resp))
+    return word_count_out_of_range(len(tokenize(resp)))
 
+def word_count_out_of_range(word_count):
+    """ True if a page with word_count words is too short or too long to use """
     if word_count < 10:
         print(f"[WORD COUNT] {word_count} < 10)")
         return True
@@ -340,11 +454,26 @@ def word_count_check(resp): #done/untested
 
 def log_debug(reason, url):
     """Log the rejected URL with a reason and update stats."""
-    if reason not in debug_stats:
-        debug_stats[reason] = 0
-    debug_stats[reason] += 1
-    with open(DEBUG_LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(f"[{reason}] {url}\n")
+    METRICS.inc("urls_rejected_total", reason=reason)
+    with _debug_lock:
+        if reason not in debug_stats:
+            debug_stats[reason] = 0
+        debug_stats[reason] += 1
+        _debug_lines.append(f"[{reason}] {url}\n")
+        if len(_debug_lines) < DEBUG_LOG_BUFFER:
+            return
+    flush_debug_log()
+
+def flush_debug_log():
+    """Append the buffered rejections to DEBUG_LOG_FILE."""
+    with _debug_lock:
+        lines = ''.join(_debug_lines)
+        _debug_lines.clear()
+        if lines:
+            with open(DEBUG_LOG_FILE, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+atexit.register(flush_debug_log)
 
 
 
@@ -352,10 +481,21 @@ trap_keywords = [
     'ical=', 'outlook-ical', 'eventdisplay=past', 'tribe-bar-date', 'action=', 'share=', 'swiki',
     'calendar', 'event', 'events', '/?page=', '/?year=', '/?month=', '/?day=', '/?view=archive',
     '/?sort=', 'sessionid=', 'utm_', 'replytocom=', '/html_oopsc/', '/risc/v063/html_oopsc/a\\d+\\.html',
-    '/doku', '/files/', '/papers/', '/publications/', '/pub/', 'wp-login.php', '?do=edit', '?do=diff','?rev=',
+    '/doku', '/files/', '/pub/', 'wp-login.php', '?do=edit', '?do=diff','?rev=',
     '/~eppstein/', '/covid19/' , '/doku', 'seminar-series', 'doku.php', 'seminarseries' , 'department-seminars',
     '/Nanda', '/seminar'
 ]
+ALLOWED_DOMAINS = ["ics.uci.edu", "cs.uci.edu", "informatics.uci.edu", "stat.uci.edu"]
+BLOCKED_EXTENSIONS = [
+    "css", "js", "bmp", "gif", "jpg", "jpeg", "ico",
+    "png", "tif", "tiff", "mid", "mp2", "mp3", "mp4",
+    "wav", "avi", "mov", "mpeg", "ram", "m4v", "mkv", "ogg", "ogv", "pdf",
+    "ps", "eps", "tex", "ppt", "pptx", "doc", "docx", "xls", "xlsx", "names",
+    "data", "dat", "exe", "bz2", "tar", "msi", "bin", "7z", "psd", "dmg", "iso",
+    "epub", "dll", "cnf", "tgz", "sha1",
+    "thmx", "mso", "arff", "rtf", "jar", "csv",
+    "rm", "smil", "wmv", "swf", "wma", "zip", "rar", "gz"
+]
 # trap_keywords = [
 #    'action=', 'share=', 'swiki', 'sessionid=', 'utm_', 'replytocom=',
 #    '/html_oopsc/', '/risc/v063/html_oopsc/a\\d+\\.html',
@@ -375,3 +515,8 @@ stop_words = [
     "under", "until", "up", "very", "was", "wasn", "we", "were", "weren", "what", "when", "where", "which", 
     "while", "who", "whom", "why", "with", "won", "would", "wouldn", "you", "your", "yours", "yourself", "yourselves"
 ]
+
+URL_FILTER = UrlFilter(ALLOWED_DOMAINS, trap_keywords, BLOCKED_EXTENSIONS)
+TRAP_DETECTOR = TrapDetector()
+CANONICALIZER = Canonicalizer()
+WORD_COUNTER = make_word_counter("exact", stop_words, COMMON_WORDS)
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+from configparser import ConfigParser
+
+import analytics
+import scraper
+from bench.corpus import Page, SyntheticCorpus
+from bench.server import encode_page
+from utils.config import Config
+from utils.response_store import ResponseStore
+
+# What scraper.configure replaces, put back after each test.
+CONFIGURED = ("URL_FILTER", "TRAP_DETECTOR", "WORD_COUNTER", "COMMON_WORDS", "CANONICALIZER")
+
+
+class TestAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.recorded = os.path.join(self.tmp.name, "recorded")
+        self.reports = os.path.join(self.tmp.name, "Report")
+        self.configured = {name: getattr(scraper, name) for name in CONFIGURED}
+
+    def tearDown(self):
+        for name, value in self.configured.items():
+            setattr(scraper, name, value)
+        self.tmp.cleanup()
+
+    def read(self, name):
+        with open(os.path.join(self.reports, name)) as report:
+            return report.read()
+
+    def test_reports_from_recorded_crawl(self):
+        """Reports count unique html pages; duplicates, errors and non-html pages are left out"""
+        corpus = SyntheticCorpus(pages = 6)
+        store = ResponseStore(self.recorded)
+        for number in range(5):
+            url = corpus.page_url(number)
+            store.put(url, 200, encode_page(url, corpus.get(url)))
+        copy = "https://www.stat.uci.edu/copy"
+        store.put(copy, 200, encode_page(copy, Page(copy, content = corpus.get(corpus.page_url(1)).content)))
+        pdf = "https://www.ics.uci.edu/download/1"
+        store.put(pdf, 200, encode_page(pdf, corpus.get(pdf)))
+        store.put("https://www.ics.uci.edu/page/99", 404, encode_page("https://www.ics.uci.edu/page/99", None))
+        store.close()
+
+        summary = analytics.run(self.recorded, processes = 2, chunk_size = 3, report_dir = self.reports)
+        self.assertEqual(self.read("UniquePages.txt"), "Unique Pages: 5")
+        self.assertEqual(summary.subdomains["www.stat.uci.edu"], 1)
+        self.assertIn("# of Subdomains: 5", self.read("subdomains.txt"))
+
+        single = os.path.join(self.tmp.name, "single")
+        store = ResponseStore(single)
+        for number in range(5):
+            url = corpus.page_url(number)
+            store.put(url, 200, encode_page(url, corpus.get(url)))
+        store.close()
+        expected = analytics.run(single, processes = 1, report_dir = single)
+        self.assertEqual(summary.words, expected.words)
+        self.assertEqual(summary.longest_page, expected.longest_page)
+
+    def test_crawl_config_used(self):
+        """The url rules of the config the crawl ran with decide what is reported"""
+        corpus = SyntheticCorpus(pages = 8)
+        store = ResponseStore(self.recorded)
+        for number in range(8):
+            url = corpus.page_url(number)
+            store.put(url, 200, encode_page(url, corpus.get(url)))
+        store.close()
+        cparser = ConfigParser()
+        cparser.read("config.ini")
+        cparser["CRAWLER"]["ALLOWEDDOMAINS"] = "ics.uci.edu"
+        summary = analytics.run(self.recorded, processes = 2, report_dir = self.reports,
+                                config = Config(cparser))
+        ics_pages = [url for url in map(corpus.page_url, range(8)) if ".ics.uci.edu" in url]
+        self.assertTrue(0 < len(ics_pages) < 8)
+        self.assertEqual(summary.unique_pages, len(ics_pages))
+        self.assertTrue(all(host.endswith(".ics.uci.edu") for host in summary.subdomains))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 2)
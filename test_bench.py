@@ -0,0 +1,49 @@
+import unittest
+from unittest.mock import Mock
+
+from bench.corpus import SyntheticCorpus
+from bench.micro import measure
+from bench.server import CacheServer
+from utils.download import download
+
+
+class TestBench(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.corpus = SyntheticCorpus(pages = 20, trap_ratio = 1.0, trap_depth = 3)
+
+    def test_corpus_is_deterministic(self):
+        """The same url always gets the same page, traps end at trap_depth"""
+        url = self.corpus.page_url(7)
+        self.assertEqual(self.corpus.get(url).content, SyntheticCorpus(pages = 20).get(url).content)
+        self.assertIsNone(self.corpus.get(self.corpus.page_url(20)))
+        self.assertIsNotNone(self.corpus.get("https://www.ics.uci.edu/archive?page=2"))
+        self.assertIsNone(self.corpus.get("https://www.ics.uci.edu/archive?page=3"))
+        self.assertIsNone(self.corpus.get("https://www.example.com/page/1"))
+
+    def test_server_speaks_cache_format(self):
+        """download() decodes what the local cache server sends"""
+        server = CacheServer(self.corpus)
+        config = Mock(cache_server = server.start(), user_agent = "bench", connect_timeout = 5,
+                      read_timeout = 5, retries = 0, retry_backoff = 0, record_dir = "",
+                      replay = False, max_page_bytes = 0)
+        try:
+            url = self.corpus.page_url(3)
+            resp = download(url, config)
+            self.assertEqual(resp.status, 200)
+            self.assertEqual(resp.raw_response.content, self.corpus.get(url).content)
+            self.assertEqual(download(self.corpus.page_url(99), config).status, 404)
+        finally:
+            server.stop()
+        self.assertEqual(server.requests, 2)
+
+    def test_measure(self):
+        """measure() times every call of every repetition"""
+        result = measure("len", len, [("abc",), ("de",)], repeat = 3)
+        self.assertEqual(result.calls, 6)
+        self.assertLessEqual(result.p50, result.p99)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 2)
@@ -0,0 +1,58 @@
+import unittest
+
+from utils.canonical import Canonicalizer, remove_dot_segments
+
+
+class TestCanonicalizer(unittest.TestCase):
+
+    def setUp(self):
+        self.canonical = Canonicalizer().canonicalize
+
+    def test_variants_collapse(self):
+        """Spellings of the same url come out the same"""
+        variants = [
+            "HTTPS://WWW.ICS.UCI.EDU/about/?b=2&a=1",
+            "https://www.ics.uci.edu:443/about/?a=1&b=2#people",
+            "https://www.ics.uci.edu/x/../about/./?a=1&utm_source=mail&b=2",
+            "https://www.ics.uci.edu./about/index.html?a=1&b=2&fbclid=abc",
+        ]
+        self.assertEqual({self.canonical(url) for url in variants},
+                         {"https://www.ics.uci.edu/about/?a=1&b=2"})
+
+    def test_trailing_slash_like_normalize(self):
+        """The result never ends in a slash, as utils.normalize would leave it"""
+        self.assertEqual(self.canonical("https://www.ics.uci.edu/"), "https://www.ics.uci.edu")
+        self.assertEqual(self.canonical("https://www.ics.uci.edu/a/index.php"), "https://www.ics.uci.edu/a")
+
+    def test_percent_escapes(self):
+        """Unreserved escapes are decoded, the others uppercased"""
+        self.assertEqual(self.canonical("http://www.ics.uci.edu/%7euser/a%2fb"),
+                         "http://www.ics.uci.edu/~user/a%2Fb")
+
+    def test_other_ports_are_kept(self):
+        """Only the scheme's default port is dropped"""
+        self.assertEqual(self.canonical("http://www.ics.uci.edu:8080/a"), "http://www.ics.uci.edu:8080/a")
+        self.assertEqual(self.canonical("http://www.ics.uci.edu:443/a"), "http://www.ics.uci.edu:443/a")
+
+    def test_rules_are_configurable(self):
+        """Query order, dropped parameters and index pages can be changed"""
+        keep = Canonicalizer(sort_query = False, drop_params = ["session*"], index_pages = [])
+        self.assertEqual(keep.canonicalize("https://a.uci.edu/index.html?b=1&sessionkey=2&a=3"),
+                         "https://a.uci.edu/index.html?b=1&a=3")
+
+    def test_memoized(self):
+        """Repeated links are answered from the cache"""
+        canonicalizer = Canonicalizer()
+        for _ in range(3):
+            canonicalizer.canonicalize("https://a.uci.edu/x")
+        self.assertEqual(canonicalizer.canonicalize.cache_info().hits, 2)
+
+    def test_remove_dot_segments(self):
+        """RFC 3986 dot segment removal"""
+        self.assertEqual(remove_dot_segments("/a/b/c/./../../g"), "/a/g")
+        self.assertEqual(remove_dot_segments("/a/b/.."), "/a/")
+        self.assertEqual(remove_dot_segments("/../x"), "/x")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 2)
@@ -0,0 +1,200 @@
+import asyncio
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
+
+import requests
+
+from bench.corpus import SyntheticCorpus
+from bench.server import CacheServer, encode_page
+from utils import download as download_module
+from utils.download import RETRY_STATUSES, download, download_async
+
+
+def make_config(cache_server, retries = 0):
+    return Mock(cache_server = cache_server, user_agent = "test", connect_timeout = 5,
+                read_timeout = 5, retries = retries, retry_backoff = 0, record_dir = "",
+                replay = False, max_page_bytes = 0)
+
+
+async def silent_server():
+    ''' Server that reads a request and hangs up without answering, like a
+    cache server dropping an idle keep-alive connection. '''
+    async def hang_up(reader, writer):
+        await reader.readline()
+        writer.close()
+    return await asyncio.start_server(hang_up, "127.0.0.1", 0)
+
+
+class ScriptedServer(object):
+    ''' Cache server on a thread answering with the given statuses in turn,
+    then 200 with the page of corpus, sleeping `delay` seconds first. '''
+    def __init__(self, corpus, statuses = (), delay = 0):
+        script = list(statuses)
+        self.attempts = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.attempts += 1
+                time.sleep(delay)
+                url = self.path.split("q=")[1].split("&")[0]
+                url = requests.utils.unquote(url)
+                status = script.pop(0) if script else 200
+                body = encode_page(url, corpus.get(url)) if status == 200 else b""
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target = self.httpd.serve_forever, daemon = True).start()
+        self.address = self.httpd.server_address
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TestDownload(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.corpus = SyntheticCorpus(pages = 5)
+
+    def setUp(self):
+        # Sessions are cached per thread, start this one with a fresh one
+        download_module._sessions.__dict__.clear()
+        self.server = None
+
+    def tearDown(self):
+        download_module._sessions.__dict__.clear()
+        if self.server is not None:
+            self.server.stop()
+
+    def test_retries_until_answered(self):
+        """A 503 is retried by the session and the 200 after it is returned"""
+        self.server = ScriptedServer(self.corpus, [503])
+        url = self.corpus.page_url(1)
+        resp = download(url, make_config(self.server.address, retries = 2))
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(resp.raw_response.content, self.corpus.get(url).content)
+        self.assertEqual(self.server.attempts, 2)
+
+    def test_gives_up_after_retries(self):
+        self.server = ScriptedServer(self.corpus, [503, 502, 500, 504])
+        resp = download(self.corpus.page_url(1), make_config(self.server.address, retries = 2))
+        self.assertEqual(resp.status, 500)
+        self.assertEqual(self.server.attempts, 3)
+
+    def test_final_statuses_not_retried(self):
+        self.server = ScriptedServer(self.corpus, [404])
+        resp = download(self.corpus.page_url(1), make_config(self.server.address, retries = 2))
+        self.assertEqual(resp.status, 404)
+        self.assertEqual(self.server.attempts, 1)
+
+    def test_read_timeout(self):
+        """READTIMEOUT bounds every try"""
+        self.server = ScriptedServer(self.corpus, delay = 0.5)
+        config = make_config(self.server.address)
+        config.read_timeout = 0.1
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            download(self.corpus.page_url(1), config)
+
+    def test_session_per_thread(self):
+        """One session per thread, its retries set from the config"""
+        config = make_config(("127.0.0.1", 1), retries = 4)
+        config.retry_backoff = 0.25
+        session = download_module._get_session(config)
+        self.assertIs(download_module._get_session(config), session)
+        others = list()
+        thread = threading.Thread(target = lambda: others.append(download_module._get_session(config)))
+        thread.start()
+        thread.join()
+        self.assertIsNot(others[0], session)
+        retries = session.get_adapter("http://127.0.0.1:1/").max_retries
+        self.assertEqual(retries.total, 4)
+        self.assertEqual(retries.backoff_factor, 0.25)
+        self.assertEqual(set(retries.status_forcelist), set(RETRY_STATUSES))
+
+
+class TestDownloadAsync(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.corpus = SyntheticCorpus(pages = 5)
+
+    def setUp(self):
+        self.server = None
+
+    def tearDown(self):
+        if self.server is not None:
+            self.server.stop()
+
+    def start(self, **settings):
+        self.server = CacheServer(self.corpus, **settings)
+        return self.server.start()
+
+    def test_reuses_idle_connection(self):
+        """Downloads on one loop share a keep-alive connection"""
+        config = make_config(self.start())
+        urls = [self.corpus.page_url(1), self.corpus.page_url(2)]
+
+        async def crawl():
+            with patch("utils.download.asyncio.open_connection",
+                       wraps = asyncio.open_connection) as opened:
+                responses = [await download_async(url, config) for url in urls]
+                idle = download_module._idle_connections[asyncio.get_running_loop()]
+                return responses, opened.call_count, len(idle)
+
+        responses, opened, idle = asyncio.run(crawl())
+        self.assertEqual([resp.status for resp in responses], [200, 200])
+        self.assertEqual(responses[1].raw_response.content, self.corpus.get(urls[1]).content)
+        self.assertEqual(opened, 1)
+        self.assertEqual(idle, 1)
+        self.assertEqual(self.server.requests, 2)
+
+    def test_dropped_idle_connection(self):
+        """A reused connection the server closed is replaced, not counted as a failed try"""
+        config = make_config(self.start(), retries = 0)
+        url = self.corpus.page_url(3)
+
+        async def crawl():
+            silent = await silent_server()
+            host, port = silent.sockets[0].getsockname()[:2]
+            stale = await asyncio.open_connection(host, port)
+            download_module._idle_connections[asyncio.get_running_loop()] = [stale]
+            try:
+                with patch("utils.download._read_http_response",
+                           wraps = download_module._read_http_response) as reads:
+                    return await download_async(url, config), reads.call_count
+            finally:
+                silent.close()
+                await silent.wait_closed()
+
+        resp, reads = asyncio.run(crawl())
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(resp.raw_response.content, self.corpus.get(url).content)
+        # one read on the stale connection, one on the fresh one
+        self.assertEqual(reads, 2)
+        self.assertEqual(self.server.requests, 1)
+
+    def test_retries_server_errors(self):
+        """503 answers are retried RETRIES times, then handed back as errors"""
+        config = make_config(self.start(error_rate = 1.0), retries = 2)
+        resp = asyncio.run(download_async(self.corpus.page_url(1), config))
+        self.assertEqual(resp.status, 503)
+        self.assertIsNone(resp.raw_response)
+        self.assertEqual(self.server.requests, 3)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity = 2)
@@ -0,0 +1,301 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from threading import Thread
+from unittest.mock import Mock
+
+from crawler.frontier import Frontier
+from crawler.persistence import LogSave
+from crawler.scoring import get_scorer
+from utils import get_fingerprint, get_urlhash
+from utils.fingerprints import FingerprintSet
+
+
+def make_config(save_dir, time_delay=0.0, seed_urls=None, save_name="frontier.shelve"):
+    config = Mock()
+    config.save_file = os.path.join(save_dir, save_name)
+    config.save_flush_records = 1000
+    config.save_flush_interval = 0.5
+    config.seed_urls = seed_urls or ["https://www.ics.uci.edu"]
+    config.time_delay = time_delay
+    config.scorer = "bfs"
+    return config
+
+
+class TestFrontier(unittest.TestCase):
+
+    def setUp(self):
+        self.save_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.save_dir, ignore_errors = True)
+
+    def test_starts_from_seed(self):
+        """Seed urls are handed out, then the frontier reports it is empty"""
+        frontier = Frontier(make_config(self.save_dir), True)
+        url = frontier.get_tbd_url()
+        self.assertEqual(url, "https://www.ics.uci.edu")
+        frontier.mark_url_complete(url)
+        self.assertIsNone(frontier.get_tbd_url())
+
+    def test_duplicates_are_ignored(self):
+        """Adding the same url twice queues it once"""
+        frontier = Frontier(make_config(self.save_dir), True)
+        seed = frontier.get_tbd_url()
+        frontier.add_url("https://www.ics.uci.edu/a")
+        frontier.add_url("https://www.ics.uci.edu/a/")
+        frontier.mark_url_complete(seed)
+        self.assertEqual(frontier.get_tbd_url(), "https://www.ics.uci.edu/a")
+        frontier.mark_url_complete("https://www.ics.uci.edu/a")
+        self.assertIsNone(frontier.get_tbd_url())
+
+    def test_url_variants_are_queued_once(self):
+        """Different spellings of one url are saved and served once"""
+        frontier = Frontier(make_config(self.save_dir), True)
+        seed = frontier.get_tbd_url()
+        frontier.add_url("https://WWW.ICS.UCI.EDU:443/a/?y=2&x=1#top")
+        frontier.add_url("https://www.ics.uci.edu/b/../a/?x=1&y=2&utm_source=feed")
+        frontier.mark_url_complete(seed)
+        self.assertEqual(frontier.get_tbd_url(), "https://www.ics.uci.edu/a/?x=1&y=2")
+        self.assertEqual(len(frontier.save), 2)
+
+    def test_host_is_checked_out_while_downloading(self):
+        """A second url of a busy host is not served, other hosts are"""
+        frontier = Frontier(make_config(self.save_dir), True)
+        seed = frontier.get_tbd_url()
+        frontier.add_url("https://www.ics.uci.edu/a")
+        frontier.add_url("https://www.cs.uci.edu/b")
+        self.assertEqual(frontier.get_tbd_url(), "https://www.cs.uci.edu/b")
+        frontier.mark_url_complete(seed)
+        self.assertEqual(frontier.get_tbd_url(), "https://www.ics.uci.edu/a")
+
+    def test_politeness_per_host(self):
+        """The same host is not served again before POLITENESS has passed"""
+        frontier = Frontier(make_config(self.save_dir, time_delay = 0.2), True)
+        seed = frontier.get_tbd_url()
+        frontier.add_url("https://www.ics.uci.edu/a")
+        frontier.mark_url_complete(seed)
+        start = time.monotonic()
+        self.assertEqual(frontier.get_tbd_url(), "https://www.ics.uci.edu/a")
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    def test_crawl_delay_overrides_politeness(self):
+        """A host's Crawl-delay is used when it is longer than POLITENESS"""
+        frontier = Frontier(make_config(self.save_dir, time_delay = 0.1), True)
+        frontier.set_crawl_delay("www.ics.uci.edu", 5)
+        seed = frontier.get_tbd_url()
+        frontier.add_url("https://www.ics.uci.edu/a")
+        frontier.mark_url_complete(seed)
+        url, wait = frontier.poll_tbd_url()
+        self.assertIsNone(url)
+        self.assertGreater(wait, 4)
+
+    def test_wait_for_host(self):
+        """Downloads outside get_tbd_url wait POLITENESS too"""
+        frontier = Frontier(make_config(self.save_dir, time_delay = 0.2), True)
+        frontier.get_tbd_url()
+        start = time.monotonic()
+        frontier.wait_for_host("www.ics.uci.edu")
+        self.assertLess(time.monotonic() - start, 0.1)
+        frontier.wait_for_host("www.ics.uci.edu")
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    def test_checked_out_host_not_served(self):
+        """A host taken with check_out_host is not handed out until released"""
+        frontier = Frontier(make_config(self.save_dir, time_delay = 0.2), True)
+        self.assertTrue(frontier.check_out_host("WWW.ics.uci.edu"))
+        self.assertFalse(frontier.check_out_host("www.ics.uci.edu"))
+        self.assertEqual(frontier.poll_tbd_url(), (None, Frontier.IDLE_POLL))
+        frontier.release_host("www.ics.uci.edu")
+        url, wait = frontier.poll_tbd_url()
+        self.assertIsNone(url)
+        self.assertGreater(wait, 0.1)
+        self.assertEqual(frontier.get_tbd_url(), "https://www.ics.uci.edu")
+
+    def test_waits_for_in_progress_downloads(self):
+        """An idle worker waits for urls discovered by a busy one"""
+        frontier = Frontier(make_config(self.save_dir), True)
+        seed = frontier.get_tbd_url()
+        result = []
+        waiter = Thread(target = lambda: result.append(frontier.get_tbd_url()))
+        waiter.start()
+        time.sleep(0.05)
+        frontier.add_url("https://www.cs.uci.edu/b")
+        waiter.join(timeout = 2)
+        self.assertEqual(result, ["https://www.cs.uci.edu/b"])
+        frontier.mark_url_complete(seed)
+
+    def test_poll_does_not_block(self):
+        """poll_tbd_url reports how long to wait instead of blocking"""
+        frontier = Frontier(make_config(self.save_dir, time_delay = 5), True)
+        seed, wait = frontier.poll_tbd_url()
+        self.assertEqual((seed, wait), ("https://www.ics.uci.edu", 0))
+        self.assertEqual(frontier.poll_tbd_url(), (None, Frontier.IDLE_POLL))
+        frontier.add_url("https://www.ics.uci.edu/a")
+        frontier.mark_url_complete(seed)
+        url, wait = frontier.poll_tbd_url()
+        self.assertIsNone(url)
+        self.assertGreater(wait, 4)
+
+    def test_resume_from_save_file(self):
+        """Incomplete urls are reloaded from the save file"""
+        config = make_config(self.save_dir)
+        frontier = Frontier(config, True)
+        seed = frontier.get_tbd_url()
+        frontier.add_url("https://www.ics.uci.edu/a")
+        frontier.mark_url_complete(seed)
+        frontier.save.close()
+
+        resumed = Frontier(config, False)
+        self.assertEqual(resumed.get_tbd_url(), "https://www.ics.uci.edu/a")
+
+    def test_resume_from_log_save_file(self):
+        """The append-only log backend resumes the same way as shelve"""
+        config = make_config(self.save_dir, save_name = "frontier.log")
+        frontier = Frontier(config, True)
+        self.assertIsInstance(frontier.save, LogSave)
+        seed = frontier.get_tbd_url()
+        frontier.add_url("https://www.ics.uci.edu/a")
+        frontier.mark_url_complete(seed)
+        frontier.save.close()
+
+        resumed = Frontier(config, False)
+        self.assertEqual(resumed.get_tbd_url(), "https://www.ics.uci.edu/a")
+        self.assertIsNone(resumed.poll_tbd_url()[0])
+
+    def test_shallow_urls_first(self):
+        """Within a host, urls closer to the seed are served first"""
+        frontier = Frontier(make_config(self.save_dir), True)
+        seed = frontier.get_tbd_url()
+        frontier.add_url("https://www.ics.uci.edu/a", seed)
+        frontier.mark_url_complete(seed)
+        page = frontier.get_tbd_url()
+        frontier.add_url("https://www.ics.uci.edu/a/deep", page)
+        frontier.add_url("https://www.ics.uci.edu/b")
+        frontier.mark_url_complete(page)
+        self.assertEqual(frontier.get_tbd_url(), "https://www.ics.uci.edu/b")
+        frontier.mark_url_complete("https://www.ics.uci.edu/b")
+        self.assertEqual(frontier.get_tbd_url(), "https://www.ics.uci.edu/a/deep")
+
+    def test_custom_scorer(self):
+        """SCORER can name a module:function"""
+        config = make_config(self.save_dir)
+        config.scorer = "test_frontier:longest_first"
+        frontier = Frontier(config, True)
+        seed = frontier.get_tbd_url()
+        frontier.add_url("https://www.ics.uci.edu/a")
+        frontier.add_url("https://www.ics.uci.edu/abc")
+        frontier.mark_url_complete(seed)
+        self.assertEqual(frontier.get_tbd_url(), "https://www.ics.uci.edu/abc")
+
+    def test_unknown_scorer(self):
+        """An unknown SCORER name fails early"""
+        with self.assertRaises(ValueError):
+            get_scorer("dfs")
+
+
+def longest_first(url, depth, parent):
+    return -len(url)
+
+
+def urlhash(i):
+    return get_urlhash(f"https://www.ics.uci.edu/{i}")
+
+
+class TestLogSave(unittest.TestCase):
+
+    def setUp(self):
+        self.save_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.save_dir, "frontier.log")
+
+    def tearDown(self):
+        shutil.rmtree(self.save_dir, ignore_errors = True)
+
+    def test_records_are_batched(self):
+        """Nothing reaches the file until a batch is full"""
+        save = LogSave(self.path, flush_records = 3, flush_interval = 60)
+        save[urlhash(1)] = ("https://www.ics.uci.edu/1", False)
+        save.commit()
+        save[urlhash(2)] = ("https://www.ics.uci.edu/2", False)
+        save.commit()
+        self.assertEqual(os.path.getsize(self.path), 0)
+        save[urlhash(3)] = ("https://www.ics.uci.edu/3", False)
+        save.commit()
+        self.assertGreater(os.path.getsize(self.path), 0)
+        save.close()
+
+    def test_replay_drops_torn_tail(self):
+        """A half written last record from a crash is ignored and cut off"""
+        save = LogSave(self.path)
+        save[urlhash(1)] = ("https://www.ics.uci.edu/1", False)
+        save[urlhash(1)] = ("https://www.ics.uci.edu/1", True)
+        save[urlhash(2)] = ("https://www.ics.uci.edu/2", False)
+        save.close()
+        with open(self.path, "a") as log:
+            log.write('["h3", "https://www.ics')
+
+        replayed = LogSave(self.path)
+        self.assertEqual(len(replayed), 2)
+        self.assertNotIn(urlhash(3), replayed)
+        self.assertEqual(sorted(replayed.values()), [
+            ("https://www.ics.uci.edu/1", True),
+            ("https://www.ics.uci.edu/2", False)])
+        replayed.close()
+
+    def test_compaction_keeps_latest_records(self):
+        """Compaction leaves one record per url with its latest state"""
+        save = LogSave(self.path)
+        for i in range(10):
+            save[urlhash(i)] = (f"https://www.ics.uci.edu/{i}", False)
+            save[urlhash(i)] = (f"https://www.ics.uci.edu/{i}", i % 2 == 0)
+        save.compact()
+        with open(self.path) as log:
+            self.assertEqual(len(log.readlines()), 10)
+        save.close()
+
+        replayed = LogSave(self.path)
+        self.assertIn(("https://www.ics.uci.edu/4", True), replayed.values())
+        self.assertIn(("https://www.ics.uci.edu/5", False), replayed.values())
+        replayed.close()
+
+    def test_index_holds_fingerprints(self):
+        """Only 64 bit fingerprints of the urls are kept in memory"""
+        save = LogSave(self.path)
+        for i in range(3):
+            save[urlhash(i)] = (f"https://www.ics.uci.edu/{i}", False)
+        save[urlhash(0)] = ("https://www.ics.uci.edu/0", True)
+        self.assertIsInstance(save.index, FingerprintSet)
+        self.assertEqual(len(save), 3)
+        self.assertIn(urlhash(2), save)
+        self.assertEqual(set(save.fingerprints()), {get_fingerprint(urlhash(i)) for i in range(3)})
+        self.assertEqual(list(save.completed), [get_fingerprint(urlhash(0))])
+        save.close()
+
+
+class TestFingerprintSet(unittest.TestCase):
+
+    def test_add_and_contains(self):
+        """add reports whether a fingerprint is new, also across growth"""
+        seen = FingerprintSet()
+        fingerprints = [i * 0x9E3779B97F4A7C15 % (1 << 64) for i in range(5000)]
+        for fingerprint in fingerprints:
+            self.assertTrue(seen.add(fingerprint))
+        for fingerprint in fingerprints:
+            self.assertFalse(seen.add(fingerprint))
+            self.assertIn(fingerprint, seen)
+        self.assertEqual(len(seen), 5000)
+        self.assertNotIn(12345, seen)
+        self.assertEqual(sorted(seen), sorted(fingerprints[1:] + [1]))
+
+    def test_zero_fingerprint(self):
+        """A fingerprint of 0 does not collide with empty slots"""
+        seen = FingerprintSet()
+        self.assertNotIn(0, seen)
+        self.assertTrue(seen.add(0))
+        self.assertIn(0, seen)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 2)
@@ -0,0 +1,55 @@
+import json
+import unittest
+
+from utils.metrics import MetricsRegistry
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = MetricsRegistry()
+
+    def test_counters_and_labels(self):
+        """Plain and labeled counters add up and show in both export formats"""
+        self.metrics.inc("pages_downloaded_total")
+        self.metrics.inc("pages_downloaded_total", 2)
+        self.metrics.inc("urls_rejected_total", reason = "trap_keyword")
+        self.metrics.inc("urls_rejected_total", reason = "trap_keyword")
+        self.metrics.inc("urls_rejected_total", reason = "blocked_extension")
+        self.assertEqual(self.metrics.counter("pages_downloaded_total"), 3)
+        self.assertEqual(self.metrics.counter("urls_rejected_total", reason = "trap_keyword"), 2)
+
+        snapshot = json.loads(self.metrics.to_json())
+        self.assertEqual(snapshot["counters"]["urls_rejected_total"],
+                         {"blocked_extension": 1, "trap_keyword": 2})
+        text = self.metrics.to_prometheus()
+        self.assertIn("pages_downloaded_total 3\n", text)
+        self.assertIn('urls_rejected_total{reason="trap_keyword"} 2\n', text)
+
+    def test_histogram_quantiles(self):
+        """Quantiles are the upper bound of the bucket they fall in"""
+        for _ in range(98):
+            self.metrics.observe("download_seconds", 0.003)
+        self.metrics.observe("download_seconds", 0.7)
+        self.metrics.observe("download_seconds", 0.7)
+        with self.metrics.timer("download_seconds"):
+            pass
+        histogram = self.metrics.snapshot()["histograms"]["download_seconds"]
+        self.assertEqual(histogram["count"], 101)
+        self.assertEqual(histogram["p50"], 0.005)
+        self.assertEqual(histogram["p99"], 1.0)
+        self.assertIn('download_seconds_bucket{le="+Inf"} 101\n', self.metrics.to_prometheus())
+
+    def test_gauges(self):
+        """Gauges are read when a snapshot is taken, dict gauges get a label per key"""
+        depths = {"www.ics.uci.edu": 3}
+        self.metrics.gauge("host_queue_depth", lambda: depths, "host")
+        self.metrics.gauge("broken", lambda: 1 / 0)
+        depths["www.cs.uci.edu"] = 1
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot["gauges"], {"host_queue_depth": depths})
+        self.assertIn('host_queue_depth{host="www.cs.uci.edu"} 1\n', self.metrics.to_prometheus(snapshot))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 2)
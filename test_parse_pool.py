@@ -0,0 +1,63 @@
+import unittest
+from configparser import ConfigParser
+from unittest.mock import Mock
+
+from crawler import parse_pool
+from crawler.parse_pool import ParsePool, get_parse_pool, shutdown_parse_pool
+from utils.config import Config
+
+PAGE = (b'<html><body><a href="/people">People</a><a href="https://www.cs.uci.edu/">CS</a>'
+        b'<script>var hidden = 1;</script><p>Crawling crawling the web pages</p></body></html>')
+
+
+class TestParsePool(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = ParsePool(1, 2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+
+    def test_analysis_from_worker_process(self):
+        """A page parsed in the pool comes back as a full PageAnalysis"""
+        url = "https://www.ics.uci.edu/about"
+        for content in (PAGE, memoryview(PAGE), PAGE.decode("utf-8")):
+            with self.subTest(kind = type(content).__name__):
+                analysis = self.pool.analyze_html(url, content)
+                self.assertEqual(analysis.links, ["https://www.ics.uci.edu/people", "https://www.cs.uci.edu"])
+                self.assertEqual(analysis.token_counts, {"crawling": 2, "people": 1, "the": 1, "web": 1, "pages": 1})
+                self.assertEqual(analysis.word_count, 6)
+                self.assertIsNotNone(analysis.simhash)
+
+    def test_workers_use_crawl_config(self):
+        """Worker processes canonicalize links with the crawl's settings"""
+        cparser = ConfigParser()
+        cparser.read("config.ini")
+        cparser["CRAWLER"]["CANONICALSORTQUERY"] = "false"
+        cparser["CRAWLER"]["CANONICALINDEXPAGES"] = "default.htm"
+        page = b'<a href="/search?b=2&a=1">x</a><a href="/dir/default.htm">y</a>'
+        url = "https://www.ics.uci.edu/about"
+        self.assertEqual(self.pool.analyze_html(url, page).links,
+                         ["https://www.ics.uci.edu/search?a=1&b=2", "https://www.ics.uci.edu/dir/default.htm"])
+        pool = ParsePool(1, 2, Config(cparser))
+        try:
+            self.assertEqual(pool.analyze_html(url, page).links,
+                             ["https://www.ics.uci.edu/search?b=2&a=1", "https://www.ics.uci.edu/dir"])
+        finally:
+            pool.shutdown()
+
+    def test_shared_pool_shut_down(self):
+        """Crawler.join stops the shared pool, a new crawl gets a fresh one"""
+        config = Mock(parse_processes = 1, parse_queue = 2)
+        self.assertIsNone(get_parse_pool(Mock(parse_processes = 0)))
+        pool = get_parse_pool(config)
+        self.assertIs(get_parse_pool(config), pool)
+        shutdown_parse_pool()
+        self.assertIsNone(parse_pool._pool)
+        shutdown_parse_pool()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity = 2)
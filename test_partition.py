@@ -0,0 +1,123 @@
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+from threading import Thread
+from unittest.mock import Mock
+
+from crawler.partition import PartitionedFrontier, parse_address, partition_save_file
+from utils.hash_ring import HashRing
+
+HOSTS = [f"host{i}.ics.uci.edu" for i in range(50)]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestHashRing(unittest.TestCase):
+
+    def test_same_owner_everywhere(self):
+        """The owner of a host depends on the node names, not their order"""
+        nodes = ["10.0.0.1:7000", "10.0.0.2:7000", "10.0.0.3:7000"]
+        first, second = HashRing(nodes), HashRing(list(reversed(nodes)))
+        for host in HOSTS:
+            self.assertEqual(first.node_for(host), second.node_for(host))
+        self.assertEqual({first.node_for(host) for host in HOSTS}, set(nodes))
+
+    def test_removing_a_node_moves_only_its_hosts(self):
+        """Hosts of the remaining nodes keep their owner"""
+        nodes = ["a:1", "b:1", "c:1", "d:1"]
+        before, after = HashRing(nodes), HashRing(nodes[:-1])
+        for host in HOSTS:
+            if before.node_for(host) != "d:1":
+                self.assertEqual(before.node_for(host), after.node_for(host))
+
+
+class TestPartitionedFrontier(unittest.TestCase):
+
+    def setUp(self):
+        self.save_dir = tempfile.mkdtemp()
+        self.nodes = [f"127.0.0.1:{free_port()}", f"127.0.0.1:{free_port()}"]
+        ring = HashRing(self.nodes)
+        self.hosts = [[host for host in HOSTS if ring.node_for(host) == node] for node in self.nodes]
+        seeds = [f"https://{self.hosts[0][0]}/", f"https://{self.hosts[1][0]}/"]
+        self.frontiers = [PartitionedFrontier(self.make_config(index, seeds), True)
+                          for index in range(2)]
+
+    def tearDown(self):
+        for frontier in self.frontiers:
+            frontier._stop()
+            frontier.listener.close()
+            frontier.save.close()
+        shutil.rmtree(self.save_dir, ignore_errors = True)
+
+    def make_config(self, partition, seeds):
+        config = Mock()
+        config.save_file = partition_save_file(os.path.join(self.save_dir, "frontier.shelve"), partition)
+        config.seed_urls = seeds
+        config.time_delay = 0
+        config.scorer = "bfs"
+        config.user_agent = "IR UF25 test"
+        config.partition_key = "partition test key"
+        config.nodes = self.nodes
+        config.partition = partition
+        config.partition_batch = 10
+        config.partition_flush_interval = 0.02
+        return config
+
+    def crawl(self, frontier, links, seen):
+        ''' Worker loop: every page links to the urls in links[url]. '''
+        while True:
+            url = frontier.get_tbd_url()
+            if url is None:
+                return
+            seen.append(url)
+            for link in links.get(url, ()):
+                frontier.add_url(link, url)
+            frontier.mark_url_complete(url)
+
+    def test_urls_reach_their_owner_and_crawl_stops(self):
+        """Every url is crawled once, by the partition owning its host, then all stop"""
+        first, second = self.hosts[0][0], self.hosts[1][0]
+        links = {
+            f"https://{first}": [f"https://{second}/a", f"https://{first}/b"],
+            f"https://{second}": [f"https://{first}/b", f"https://{second}/a"],
+            f"https://{second}/a": [f"https://{first}/c"],
+        }
+        seen = [list(), list()]
+        threads = [Thread(target = self.crawl, args = (frontier, links, seen[index]))
+                   for index, frontier in enumerate(self.frontiers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout = 10)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(sorted(seen[0]), [f"https://{first}", f"https://{first}/b", f"https://{first}/c"])
+        self.assertEqual(sorted(seen[1]), [f"https://{second}", f"https://{second}/a"])
+        self.assertEqual(self.frontiers[0].depths, {})
+        # both seeds, then /a, /b and /c across partitions
+        self.assertEqual(self.frontiers[0].sent + self.frontiers[1].sent, 5)
+
+    def test_partition_key_required(self):
+        """No node starts without PARTITIONKEY, and peers must know it"""
+        config = self.make_config(0, [])
+        config.partition_key = ""
+        with self.assertRaises(ValueError):
+            PartitionedFrontier(config, True)
+        with self.assertRaises(AuthenticationError):
+            Client(parse_address(self.nodes[0]), authkey = b"IR UF25 test")
+
+    def test_save_file_per_partition(self):
+        """Each partition keeps its own save file"""
+        self.assertEqual(partition_save_file("frontier.log", 2), "frontier.p2.log")
+        self.assertNotEqual(self.frontiers[0].config.save_file, self.frontiers[1].config.save_file)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 2)
@@ -0,0 +1,76 @@
+import os
+import sys
+import tempfile
+import unittest
+from threading import Thread
+from unittest.mock import Mock
+
+import scraper
+from crawler.reports import ReportFlusher
+
+
+class TestReportFlusher(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        os.mkdir("Report")
+        scraper.VISITED.clear()
+        self.flusher = ReportFlusher(Mock(report_interval = 30, report_pages = 50))
+
+    def tearDown(self):
+        scraper.VISITED.clear()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_flush_writes_only_changed_reports(self):
+        """A second flush only rewrites the reports whose state changed"""
+        self.flusher.flush()
+        with open("Report/UniquePages.txt") as report:
+            self.assertEqual(report.read(), "Unique Pages: 0")
+        os.remove("Report/LongestPage.txt")
+        scraper.VISITED.add("http://www.ics.uci.edu/a")
+        self.flusher.flush()
+
+        with open("Report/UniquePages.txt") as report:
+            self.assertEqual(report.read(), "Unique Pages: 1")
+        self.assertFalse(os.path.exists("Report/LongestPage.txt"))
+        self.assertEqual(sorted(os.listdir("Report")),
+                         ["CommonWords.txt", "UniquePages.txt", "subdomains.txt"])
+
+
+class TestReportCounts(unittest.TestCase):
+
+    def setUp(self):
+        scraper.SUBDOMAINS.clear()
+        scraper.LONGEST_PAGE = ('', 0)
+        self.interval = sys.getswitchinterval()
+        # switch threads often, so a lost update would show
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.interval)
+        scraper.SUBDOMAINS.clear()
+        scraper.LONGEST_PAGE = ('', 0)
+
+    def run_threads(self, target, count = 8):
+        threads = [Thread(target = target, args = (index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_concurrent_updates_are_counted(self):
+        """Worker threads updating Q2 and Q4 at once lose nothing"""
+        def crawl(index):
+            for page in range(5000):
+                scraper.subdomains(f"https://vision.ics.uci.edu/{page}")
+                scraper.confirm_longest_page(f"https://www.ics.uci.edu/{index}/{page}", index * 5000 + page)
+        self.run_threads(crawl)
+        self.assertEqual(scraper.SUBDOMAINS, {"vision.ics.uci.edu": 40000})
+        self.assertEqual(scraper.LONGEST_PAGE, ("https://www.ics.uci.edu/7/4999", 39999))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 2)
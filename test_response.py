@@ -0,0 +1,191 @@
+import asyncio
+import pickle
+import unittest
+from unittest.mock import Mock, patch
+
+import cbor
+import requests
+
+import scraper
+from utils.download import download, _read_http_response
+from utils.response import PEEK_BYTES, TOO_LARGE_STATUS, Response, peek_headers
+
+
+def pickled_page(content, content_type, protocol = pickle.DEFAULT_PROTOCOL,
+                 url = "https://www.ics.uci.edu/page"):
+    raw = requests.models.Response()
+    raw.status_code = 200
+    raw.url = url
+    raw._content = content
+    raw.headers["Content-Type"] = content_type
+    raw.headers["Server"] = "text/html"
+    raw.encoding = "utf-8"
+    return pickle.dumps(raw, protocol = protocol)
+
+
+def payload_of(content, content_type):
+    return cbor.dumps({"url": "https://www.ics.uci.edu/page", "status": 200,
+                       "response": pickled_page(content, content_type)})
+
+
+def make_config(max_page_bytes):
+    return Mock(record_dir = "", replay = False, cache_server = ("127.0.0.1", 1),
+                user_agent = "test", max_page_bytes = max_page_bytes)
+
+
+def read_answer(data, max_bytes):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await _read_http_response(reader, max_bytes)
+    return asyncio.run(read())
+
+
+class TestPeekHeaders(unittest.TestCase):
+
+    def test_every_protocol(self):
+        """Headers are read off the pickle whatever protocol wrote it"""
+        for protocol in range(2, pickle.HIGHEST_PROTOCOL + 1):
+            with self.subTest(protocol = protocol):
+                headers = peek_headers(pickled_page(b"%PDF" * 100, "application/pdf", protocol))
+                self.assertEqual(headers["content-type"], "application/pdf")
+                self.assertEqual(headers["Server"], "text/html")
+
+    def test_not_a_response(self):
+        self.assertIsNone(peek_headers(pickle.dumps({"headers": "text/html"})))
+        self.assertIsNone(peek_headers(b"not a pickle"))
+
+
+class TestResponseGating(unittest.TestCase):
+
+    def test_big_binary_not_unpickled(self):
+        """A big pdf keeps its headers but its content is never unpickled"""
+        resp_dict = {"url": "u", "status": 200,
+                     "response": pickled_page(b"%PDF" * (PEEK_BYTES // 4), "application/pdf")}
+        with patch("utils.response.pickle.loads") as loads:
+            resp = Response(resp_dict, ("text/html",))
+            self.assertEqual(resp.raw_response.headers["Content-Type"], "application/pdf")
+            self.assertEqual(resp.raw_response.content, b"")
+        loads.assert_not_called()
+        # Without content types everything is unpickled, as before
+        self.assertEqual(len(Response(resp_dict).raw_response.content), PEEK_BYTES)
+
+    def test_big_html_and_small_binary_unpickled(self):
+        big = b"<p>" + b"x" * PEEK_BYTES
+        resp = Response({"url": "u", "status": 200,
+                         "response": pickled_page(big, "text/html; charset=utf-8")}, ("text/html",))
+        self.assertEqual(resp.raw_response.content, big)
+        resp = Response({"url": "u", "status": 200,
+                         "response": pickled_page(b"%PDF", "application/pdf")}, ("text/html",))
+        self.assertEqual(resp.raw_response.content, b"%PDF")
+
+
+class TestLazyResponse(unittest.TestCase):
+
+    def test_unpickled_on_first_use(self):
+        resp_dict = {"url": "u", "status": 200, "response": pickled_page(b"<p>hi</p>", "text/html")}
+        with patch("utils.response.pickle.loads", wraps = pickle.loads) as loads:
+            resp = Response(resp_dict)
+            loads.assert_not_called()
+            self.assertEqual(resp.raw_response.url, "https://www.ics.uci.edu/page")
+            self.assertIs(resp.raw_response, resp.raw_response)
+        loads.assert_called_once()
+        self.assertFalse(hasattr(resp, "__dict__"))
+
+    def test_content_and_text(self):
+        """content is a view of the page bytes, text is decoded once by the header charset"""
+        resp = Response({"url": "u", "status": 200, "response": pickled_page(
+            "<p>café</p>".encode("latin-1"), "text/html; charset=ISO-8859-1")})
+        self.assertIsInstance(resp.content, memoryview)
+        self.assertEqual(resp.content, "<p>café</p>".encode("latin-1"))
+        self.assertEqual(resp.text, "<p>café</p>")
+        self.assertIs(resp.text, resp.text)
+        resp = Response({"url": "u", "status": 200, "response": pickled_page(
+            b"<p>caf\xc3\xa9 \xff</p>", 'text/html; charset="no-such-charset"')})
+        self.assertEqual(resp.text, "<p>café \ufffd</p>")
+
+    def test_without_page(self):
+        resp = Response({"url": "u", "status": 404, "error": "not found"})
+        self.assertIsNone(resp.raw_response)
+        self.assertIsNone(resp.headers)
+        self.assertEqual(resp.content, b"")
+        self.assertEqual(resp.text, "")
+
+    def test_scraper_reads_text(self):
+        """The scraper parses the decoded text and never needs the bytes again"""
+        url = "https://www.ics.uci.edu/lazy-page"
+        resp = Response({"url": url, "status": 200, "response": pickled_page(
+            '<a href="/p1">caf\xe9</a>'.encode("latin-1"), "text/html; charset=latin-1")})
+        self.assertEqual(scraper.page_content(url, resp), '<a href="/p1">café</a>')
+        self.assertEqual(scraper.analyze_page(url, resp).links, ["https://www.ics.uci.edu/p1"])
+
+    def test_links_resolve_against_served_url(self):
+        """Relative links of an index page are relative to its directory, not its canonical url"""
+        url = scraper.canonicalize("https://www.ics.uci.edu/~smith/index.html")
+        self.assertEqual(url, "https://www.ics.uci.edu/~smith")
+        for served in ("https://www.ics.uci.edu/~smith/", "https://www.ics.uci.edu/~smith/index.html"):
+            with self.subTest(served = served):
+                resp = Response({"url": url, "status": 200, "response": pickled_page(
+                    b'<a href="pubs.html">pubs</a>', "text/html", url = served)})
+                self.assertEqual(scraper.analyze_page(url, resp).links,
+                                 ["https://www.ics.uci.edu/~smith/pubs.html"])
+
+
+class TestByteCap(unittest.TestCase):
+
+    def download_with(self, answer, max_page_bytes):
+        session = Mock()
+        session.get.return_value = answer
+        with patch("utils.download._get_session", return_value = session):
+            return download("https://www.ics.uci.edu/page", make_config(max_page_bytes))
+
+    def test_content_length_over_cap(self):
+        """The body of an answer over the cap is never read"""
+        answer = Mock(status_code = 200, headers = {"Content-Length": "5000"})
+        resp = self.download_with(answer, 1000)
+        self.assertEqual(resp.status, TOO_LARGE_STATUS)
+        self.assertIsNone(resp.raw_response)
+        answer.close.assert_called_once()
+        answer.iter_content.assert_not_called()
+
+    def test_streamed_body_over_cap(self):
+        """Without a Content-Length, reading stops once the cap is passed"""
+        answer = Mock(status_code = 200, headers = {})
+        answer.iter_content.return_value = iter([b"x" * 600, b"x" * 600, b"never read"])
+        self.assertEqual(self.download_with(answer, 1000).status, TOO_LARGE_STATUS)
+        answer.close.assert_called_once()
+
+    def test_under_cap(self):
+        payload = payload_of(b"<html>hi</html>", "text/html")
+        answer = Mock(status_code = 200, headers = {}, content = payload)
+        answer.iter_content.return_value = iter([payload[:10], payload[10:]])
+        resp = self.download_with(answer, len(payload))
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(resp.raw_response.content, b"<html>hi</html>")
+        answer = Mock(status_code = 200, headers = {"Content-Length": str(len(payload))},
+                      content = payload)
+        self.assertEqual(self.download_with(answer, len(payload)).status, 200)
+
+    def test_async_answers_over_cap(self):
+        """The event loop download stops reading at the cap too"""
+        sized = b"HTTP/1.1 200 OK\r\nContent-Length: 20\r\n\r\n" + b"x" * 20
+        self.assertEqual(read_answer(sized, 10), (200, None, False))
+        self.assertEqual(read_answer(sized, 20), (200, b"x" * 20, True))
+        chunked = (b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+                   b"8\r\nxxxxxxxx\r\n8\r\nxxxxxxxx\r\n0\r\n\r\n")
+        self.assertEqual(read_answer(chunked, 10), (200, None, False))
+        self.assertEqual(read_answer(chunked, 0), (200, b"x" * 16, True))
+        until_close = b"HTTP/1.0 200 OK\r\n\r\n" + b"x" * 20
+        self.assertEqual(read_answer(until_close, 10), (200, None, False))
+        self.assertEqual(read_answer(until_close, 30), (200, b"x" * 20, False))
+
+    def test_scraper_rejects_too_large(self):
+        url = "https://www.ics.uci.edu/too-large-page"
+        resp = Response({"url": url, "status": TOO_LARGE_STATUS, "error": "too big"})
+        self.assertEqual(scraper.scraper(url, resp), [])
+        self.assertEqual(scraper.URL_STATE.reason(url), "too_large")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity = 2)
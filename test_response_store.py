@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+import cbor
+
+from bench.corpus import SyntheticCorpus
+from bench.server import encode_page
+from utils.download import download
+from utils.response_store import INDEX_FILE, ResponseStore
+
+
+class TestResponseStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "recorded")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_put_get_and_reopen(self):
+        """Records survive a reopen, the latest record of a url wins"""
+        store = ResponseStore(self.path)
+        store.put("https://www.ics.uci.edu/a", 200, b"first")
+        store.put("https://www.ics.uci.edu/b", 404, b"")
+        store.put("https://www.ics.uci.edu/a", 200, b"second")
+        self.assertEqual(store.get("https://www.ics.uci.edu/a"), (200, b"second"))
+        store.close()
+
+        store = ResponseStore(self.path, readonly = True)
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.get("https://www.ics.uci.edu/a"), (200, b"second"))
+        self.assertEqual(store.get("https://www.ics.uci.edu/b"), (404, b""))
+        self.assertIsNone(store.get("https://www.ics.uci.edu/c"))
+        store.close()
+
+    def test_recovers_unindexed_records_and_torn_tail(self):
+        """Records missing from the index are recovered, a torn record is cut off"""
+        store = ResponseStore(self.path, segment_bytes = 64)
+        for i in range(5):
+            store.put(f"https://www.ics.uci.edu/{i}", 200, b"page %d" % i * 20)
+        store.close()
+        self.assertGreater(len(store.segments()), 1)
+        with open(os.path.join(self.path, INDEX_FILE), "r+") as index:
+            lines = index.readlines()
+            index.seek(0)
+            index.truncate()
+            index.writelines(lines[:3])
+            index.write('[1, 7')
+        last = store.segment_path(store.segments()[-1])
+        with open(last, "ab") as segment:
+            segment.write(b"RSP1 torn")
+
+        store = ResponseStore(self.path)
+        self.assertEqual(len(store), 5)
+        self.assertEqual(store.get("https://www.ics.uci.edu/4"), (200, b"page 4" * 20))
+        store.put("https://www.ics.uci.edu/5", 200, b"after")
+        store.close()
+        self.assertEqual(len(ResponseStore(self.path, readonly = True)), 6)
+
+    def test_download_records_and_replays(self):
+        """download() tees cache answers into the store and replays them without a server"""
+        corpus = SyntheticCorpus(pages = 5)
+        url = corpus.page_url(1)
+        payload = encode_page(url, corpus.get(url))
+        config = Mock(record_dir = self.path, record_segment_bytes = 1 << 20, replay = False,
+                      cache_server = ("127.0.0.1", 1), user_agent = "test", max_page_bytes = 0)
+        session = Mock()
+        session.get.return_value = Mock(status_code = 200, content = payload)
+        with unittest.mock.patch("utils.download._get_session", return_value = session):
+            recorded = download(url, config)
+
+        config.replay = True
+        config.record_dir = os.path.join(self.path, "..", "recorded")
+        replayed = download(url, config)
+        self.assertEqual(replayed.status, 200)
+        self.assertEqual(replayed.raw_response.content, recorded.raw_response.content)
+        self.assertEqual(cbor.loads(payload)["url"], url)
+        self.assertEqual(download(corpus.page_url(2), config).status, 404)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 2)
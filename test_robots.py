@@ -0,0 +1,196 @@
+import gzip
+import unittest
+from threading import Thread
+from unittest.mock import Mock
+
+from crawler.robots import RobotsCache, RobotsRules, get_robots_cache
+
+ROBOTS = b"""
+User-agent: *
+Disallow: /private/
+Allow: /private/public
+Disallow: /*.php$
+Crawl-delay: 2
+
+User-agent: OtherBot
+Disallow: /
+
+Sitemap: https://www.ics.uci.edu/sitemap-index.xml
+"""
+
+SITEMAP_INDEX = b"""<?xml version="1.0"?>
+<sitemapindex><sitemap><loc>https://www.ics.uci.edu/sitemap.xml</loc></sitemap></sitemapindex>
+"""
+
+SITEMAP = b"""<?xml version="1.0"?>
+<urlset>
+<url><loc>https://www.ics.uci.edu/people</loc></url>
+<url><loc> https://www.ics.uci.edu/about?a=1&amp;b=2 </loc></url>
+<url><loc>https://www.example.com/elsewhere</loc></url>
+</urlset>
+"""
+
+
+def make_fetch(pages):
+    calls = []
+    def fetch(url, config, logger=None):
+        calls.append(url)
+        if url not in pages:
+            return Mock(status = 404, raw_response = None)
+        return Mock(status = 200, raw_response = Mock(content = pages[url]))
+    fetch.calls = calls
+    return fetch
+
+
+def make_config():
+    return Mock(user_agent = "IR UF25 crawler", robots_ttl = 60, robots_max_delay = 1,
+                sitemap_limit = 5, max_page_bytes = 1000)
+
+
+class TestRobotsRules(unittest.TestCase):
+
+    def test_longest_match_wins(self):
+        """The most specific rule applies, Allow wins ties"""
+        rules = RobotsRules(ROBOTS.decode(), "IR UF25 crawler")
+        self.assertTrue(rules.allowed("/people"))
+        self.assertFalse(rules.allowed("/private/notes"))
+        self.assertTrue(rules.allowed("/private/public/index.html"))
+        tie = RobotsRules("User-agent: *\nDisallow: /a\nAllow: /a\n")
+        self.assertTrue(tie.allowed("/a/b"))
+
+    def test_wildcards(self):
+        """* matches anything and $ anchors the end"""
+        rules = RobotsRules(ROBOTS.decode())
+        self.assertFalse(rules.allowed("/cgi/search.php"))
+        self.assertTrue(rules.allowed("/cgi/search.php?q=1"))
+
+    def test_group_for_user_agent(self):
+        """A group naming our agent replaces the * group"""
+        rules = RobotsRules(ROBOTS.decode(), "OtherBot/1.0")
+        self.assertFalse(rules.allowed("/people"))
+        self.assertIsNone(rules.crawl_delay)
+        rules = RobotsRules(ROBOTS.decode(), "IR UF25 crawler")
+        self.assertEqual(rules.crawl_delay, 2)
+        self.assertEqual(rules.sitemaps, ["https://www.ics.uci.edu/sitemap-index.xml"])
+
+    def test_empty(self):
+        """No robots.txt allows everything"""
+        self.assertTrue(RobotsRules().allowed("/private/notes"))
+
+
+class TestRobotsCache(unittest.TestCase):
+
+    def setUp(self):
+        self.fetch = make_fetch({
+            "https://www.ics.uci.edu/robots.txt": ROBOTS,
+            "https://www.ics.uci.edu/sitemap-index.xml": SITEMAP_INDEX,
+            "https://www.ics.uci.edu/sitemap.xml": SITEMAP})
+        self.frontier = Mock()
+        self.robots = RobotsCache(make_config(), self.frontier, self.fetch)
+
+    def test_fetched_once_per_host(self):
+        """Many threads asking about one host cause a single robots.txt fetch"""
+        results = []
+        threads = [Thread(target = lambda: results.append(
+            self.robots.allowed("https://www.ics.uci.edu/private/x"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [False] * 8)
+        self.assertTrue(self.robots.allowed("https://www.ics.uci.edu/"))
+        self.assertEqual(self.fetch.calls.count("https://www.ics.uci.edu/robots.txt"), 1)
+
+    def test_unknown_host_without_fetch(self):
+        """With fetch False, hosts not fetched yet are allowed and not fetched"""
+        self.assertTrue(self.robots.allowed("https://www.ics.uci.edu/private/x", fetch = False))
+        self.assertEqual(self.fetch.calls, [])
+
+    def test_missing_robots_allows_all(self):
+        """A host without robots.txt is allowed everywhere"""
+        self.assertTrue(self.robots.allowed("https://www.cs.uci.edu/private/x"))
+        self.frontier.set_crawl_delay.assert_not_called()
+
+    def test_crawl_delay_and_sitemaps(self):
+        """Crawl-delay goes to the frontier, capped, and sitemap urls are added"""
+        self.robots.allowed("https://www.ics.uci.edu/people")
+        self.frontier.set_crawl_delay.assert_called_once_with("www.ics.uci.edu", 1)
+        added = [call.args[0] for call in self.frontier.add_url.call_args_list]
+        self.assertEqual(added, ["https://www.ics.uci.edu/people",
+                                 "https://www.ics.uci.edu/about?a=1&b=2"])
+
+    def test_fetches_wait_for_host(self):
+        """robots.txt, each sitemap and the page after them wait the host's delay"""
+        events = []
+        self.frontier.wait_for_host.side_effect = lambda host: events.append(("wait", host))
+        fetch = self.robots.fetch
+        self.robots.fetch = lambda url, config, logger: events.append(("fetch", url)) or fetch(url, config)
+        self.robots.allowed("https://www.ics.uci.edu/people")
+        host = "www.ics.uci.edu"
+        self.assertEqual(events, [
+            ("wait", host), ("fetch", "https://www.ics.uci.edu/robots.txt"),
+            ("wait", host), ("fetch", "https://www.ics.uci.edu/sitemap-index.xml"),
+            ("wait", host), ("fetch", "https://www.ics.uci.edu/sitemap.xml"),
+            ("wait", host)])
+        self.frontier.check_out_host.assert_not_called()
+
+    def test_sitemap_on_other_host(self):
+        """A sitemap elsewhere checks its host out, or is skipped while it is busy"""
+        sitemap = "https://sitemaps.uci.edu/ics.xml"
+        self.fetch = make_fetch({sitemap: SITEMAP})
+        self.robots.fetch = self.fetch
+        self.frontier.check_out_host.return_value = False
+        self.assertEqual(self.robots.read_sitemaps([sitemap], "www.ics.uci.edu"), 0)
+        self.assertEqual(self.fetch.calls, [])
+        self.frontier.check_out_host.return_value = True
+        self.assertEqual(self.robots.read_sitemaps([sitemap], "www.ics.uci.edu"), 2)
+        self.frontier.check_out_host.assert_called_with("sitemaps.uci.edu")
+        self.frontier.release_host.assert_called_once_with("sitemaps.uci.edu")
+        self.frontier.wait_for_host.assert_not_called()
+
+    def test_gzipped_sitemaps(self):
+        """Gzipped sitemaps are read, unless they inflate past MAXPAGEBYTES"""
+        bomb = gzip.compress(b"<urlset>" + b" " * 100000 + b"</urlset>")
+        self.robots.fetch = make_fetch({
+            "https://www.ics.uci.edu/sitemap.xml.gz": gzip.compress(SITEMAP),
+            "https://www.ics.uci.edu/bomb.xml.gz": bomb,
+            "https://www.ics.uci.edu/broken.xml.gz": b"\x1f\x8b not gzip"})
+        self.assertLess(len(bomb), 1000)
+        self.assertEqual(self.robots.read_sitemaps([
+            "https://www.ics.uci.edu/bomb.xml.gz", "https://www.ics.uci.edu/broken.xml.gz",
+            "https://www.ics.uci.edu/sitemap.xml.gz"], "www.ics.uci.edu"), 2)
+
+
+class PlainFrontier(object):
+    ''' Frontier with only the methods the README interface requires. '''
+    def get_tbd_url(self):
+        return None
+
+    def add_url(self, url, parent=None):
+        pass
+
+    def mark_url_complete(self, url):
+        pass
+
+
+class TestGetRobotsCache(unittest.TestCase):
+
+    def test_shared_per_frontier(self):
+        frontier = Mock()
+        config = Mock(robots = True)
+        cache = get_robots_cache(config, frontier)
+        self.assertIsInstance(cache, RobotsCache)
+        self.assertIs(get_robots_cache(config, frontier), cache)
+        self.assertIsNone(get_robots_cache(Mock(robots = False), Mock()))
+
+    def test_off_for_plain_frontier(self):
+        """A frontier without the politeness methods crawls without robots, with a warning"""
+        frontier = PlainFrontier()
+        with self.assertLogs("ROBOTS", "WARNING") as logs:
+            self.assertIsNone(get_robots_cache(Mock(robots = True), frontier))
+        self.assertIn("wait_for_host", logs.output[0])
+        self.assertIsNone(get_robots_cache(Mock(robots = True), frontier))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 2)
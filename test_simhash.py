@@ -0,0 +1,45 @@
+import random
+import unittest
+from collections import Counter
+
+from utils.simhash import DuplicateIndex, checksum, simhash
+
+
+class TestSimhash(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(121)
+        vocabulary = [f"word{i}" for i in range(2000)]
+        self.page = [rng.choice(vocabulary) for _ in range(1500)]
+        self.other_page = [rng.choice(vocabulary) for _ in range(1500)]
+
+    def test_similar_pages_get_close_fingerprints(self):
+        """A couple of changed words moves the fingerprint by a few bits at most"""
+        edited = list(self.page)
+        edited[10] = "printer"
+        edited[700] = "friendly"
+        distance = bin(simhash(Counter(self.page)) ^ simhash(Counter(edited))).count("1")
+        self.assertLessEqual(distance, 3)
+
+    def test_different_pages_get_distant_fingerprints(self):
+        """Unrelated pages are far apart"""
+        distance = bin(simhash(Counter(self.page)) ^ simhash(Counter(self.other_page))).count("1")
+        self.assertGreater(distance, 10)
+
+    def test_duplicate_index(self):
+        """Exact and near duplicates are reported with the original url"""
+        index = DuplicateIndex()
+        fingerprint = simhash(Counter(self.page))
+        self.assertIsNone(index.check_and_add("https://ics.uci.edu/a", checksum(self.page), fingerprint))
+        self.assertEqual(
+            index.check_and_add("https://ics.uci.edu/a?print=1", checksum(self.page), fingerprint),
+            "https://ics.uci.edu/a")
+        self.assertEqual(
+            index.check_and_add("https://ics.uci.edu/b", b"other", fingerprint ^ 0b101),
+            "https://ics.uci.edu/a")
+        self.assertIsNone(
+            index.check_and_add("https://ics.uci.edu/c", b"third", fingerprint ^ 0b1111))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 2)
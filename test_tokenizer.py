@@ -0,0 +1,96 @@
+import os
+import re
+import tempfile
+import types
+import unittest
+
+from utils.tokenizer import tokenize_bytes, tokenize_text, iter_file_tokens, word_frequencies
+from crawler.tokenizer.PartA import tokenize, iter_tokens, computeWordFrequencies
+from crawler.tokenizer.PartB import findCommonTokens, commonTokens
+
+TEXT = ("The quick_brown fox -- jumps over 42 LAZY dogs!\n"
+        "Café naïve résumé 漢字 tab\tsep, it's x1y2 The END")
+
+
+def old_tokenize(text):
+    ''' What PartA did one character at a time. '''
+    return re.findall(r"[a-z0-9]+", text.lower().encode("ascii", "replace").decode("ascii"))
+
+
+class TestTokenizer(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, text, name="text.txt"):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", encoding="utf-8") as text_file:
+            text_file.write(text)
+        return path
+
+    def test_same_tokens_as_before(self):
+        """ASCII alphanumeric runs, lowercased, everything else splits"""
+        self.assertEqual(tokenize_text(TEXT), old_tokenize(TEXT))
+        self.assertEqual(tokenize_text("Café quick_brown"), ["caf", "quick", "brown"])
+
+    def test_min_length(self):
+        self.assertEqual(tokenize_text("a an the of them", 3), ["the", "them"])
+        self.assertEqual(tokenize_bytes(b"Hi THERE", 2), ["hi", "there"])
+
+    def test_chunk_boundaries(self):
+        """Tokens cut by a chunk end come out whole, whatever the chunk size"""
+        path = self.write(TEXT * 3)
+        expected = old_tokenize(TEXT * 3)
+        for chunk_size in (1, 2, 3, 7, 64, 1 << 20):
+            with self.subTest(chunk_size = chunk_size):
+                self.assertEqual(list(iter_file_tokens(path, chunk_size = chunk_size)), expected)
+        self.assertEqual(list(iter_file_tokens(path, 4, chunk_size = 5)),
+                         [token for token in expected if len(token) >= 4])
+
+    def test_lazy(self):
+        """Tokens are yielded while the file is read"""
+        tokens = iter_tokens(self.write("one two three"))
+        self.assertIsInstance(tokens, types.GeneratorType)
+        self.assertEqual(next(tokens), "one")
+
+    def test_empty_file(self):
+        self.assertEqual(tokenize(self.write("")), [])
+
+    def test_part_a(self):
+        path = self.write("Dog cat DOG, dog-cat")
+        self.assertEqual(tokenize(path), ["dog", "cat", "dog", "dog", "cat"])
+        self.assertEqual(computeWordFrequencies(tokenize(path)), {"dog": 3, "cat": 2})
+        self.assertEqual(computeWordFrequencies(iter_tokens(path)), word_frequencies(tokenize(path)))
+
+    def test_missing_file_exits(self):
+        with self.assertRaises(SystemExit):
+            tokenize(os.path.join(self.directory.name, "missing.txt"))
+
+    def test_part_b(self):
+        first = self.write("apple Banana cherry apple", "a.txt")
+        second = self.write("banana, CHERRY; durian", "b.txt")
+        self.assertEqual(findCommonTokens(first, second), 2)
+        self.assertEqual(findCommonTokens(first, self.write("", "empty.txt")), 0)
+
+    def test_common_tokens_modes_agree(self):
+        """Streaming, parallel and the temp file fallback find the same tokens"""
+        paths = [
+            self.write("alpha beta gamma delta epsilon zeta alpha", "a.txt"),
+            self.write("Beta GAMMA delta eta theta " * 50, "b.txt"),
+            self.write("gamma, delta; beta iota kappa", "c.txt"),
+        ]
+        expected = {"beta", "gamma", "delta"}
+        self.assertEqual(commonTokens(paths), expected)
+        # Vocabularies above 2 tokens spill to 3 partition files
+        self.assertEqual(commonTokens(paths, max_vocabulary = 2, partitions = 3), expected)
+        self.assertEqual(findCommonTokens(paths[0], paths[1], max_vocabulary = 2), 3)
+        self.assertEqual(commonTokens(paths, processes = 2), expected)
+        self.assertEqual(commonTokens(paths, processes = 2, max_vocabulary = 2, partitions = 3), expected)
+        self.assertEqual(commonTokens(paths[:1]), {"alpha", "beta", "gamma", "delta", "epsilon", "zeta"})
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity = 2)
@@ -0,0 +1,63 @@
+import unittest
+
+from utils.trap_detector import TrapDetector, url_shape
+
+
+class TestTrapDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.detector = TrapDetector(max_depth = 6, max_repeats = 3, query_fanout = 3,
+                                     min_pages = 4, bad_ratio = 0.75)
+
+    def test_url_shape_collapses_numbers_and_ids(self):
+        """Urls that differ only in numbers, ids and query values have the same shape"""
+        first = url_shape("www.ics.uci.edu", "/events/2024/05/", "page=3&sort=new")
+        second = url_shape("www.ics.uci.edu", "/events/2023/11", "sort=old&page=9")
+        self.assertEqual(first, second)
+        self.assertEqual(url_shape("a.uci.edu", "/f/3f2a9c81d0e4b7a6c5", ""), "a.uci.edu/f/*")
+        self.assertNotEqual(first, url_shape("www.ics.uci.edu", "/news/2024/05", "page=3"))
+
+    def test_deep_and_repeating_paths(self):
+        """Deep paths and paths that repeat a segment are rejected"""
+        self.assertEqual(self.detector.check("https://a.uci.edu/1/2/3/4/5/6/7"), "path_too_deep")
+        self.assertEqual(self.detector.check("https://a.uci.edu/a/b/a/b/a"), "repeating_segments")
+        self.assertIsNone(self.detector.check("https://a.uci.edu/a/b/a/c"))
+
+    def test_query_fanout(self):
+        """A path seen with too many query strings is cut off"""
+        for page in range(3):
+            self.assertIsNone(self.detector.check(f"https://a.uci.edu/cal?day={page}"))
+        self.assertIsNone(self.detector.check("https://a.uci.edu/cal?day=0"))
+        self.assertEqual(self.detector.check("https://a.uci.edu/cal?day=3"), "query_fanout")
+        self.assertEqual(self.detector.check("https://a.uci.edu/cal?day=0"), "query_fanout")
+        self.assertIsNone(self.detector.check("https://a.uci.edu/other?day=3"))
+
+    def test_bad_shape_is_cut_off(self):
+        """Once enough pages of a shape were bad, new urls of that shape are rejected"""
+        for page in range(2):
+            self.detector.record(f"https://a.uci.edu/archive/{page}", False)
+        self.assertIsNone(self.detector.check("https://a.uci.edu/archive/10"))
+        self.detector.record("https://a.uci.edu/archive/3", True)
+        self.assertIsNone(self.detector.check("https://a.uci.edu/archive/10"))
+        self.detector.record("https://a.uci.edu/archive/4", False)
+        self.assertEqual(self.detector.check("https://a.uci.edu/archive/10"), "trap_shape")
+        self.assertIsNone(self.detector.check("https://a.uci.edu/people/10"))
+
+    def test_bad_ratio_of(self):
+        """bad_ratio_of is the share of bad pages of the url's shape"""
+        self.assertEqual(self.detector.bad_ratio_of("https://a.uci.edu/p/1"), 0.0)
+        self.detector.record("https://a.uci.edu/p/1", False)
+        self.detector.record("https://a.uci.edu/p/2", True)
+        self.assertEqual(self.detector.bad_ratio_of("https://a.uci.edu/p/9"), 0.5)
+
+    def test_filter_many(self):
+        """filter_many keeps the order and reports the rejected urls"""
+        rejected = list()
+        urls = ["https://a.uci.edu/x", "https://a.uci.edu/a/a/a", "https://a.uci.edu/y"]
+        valid = self.detector.filter_many(urls, on_reject = lambda reason, url: rejected.append(url))
+        self.assertEqual(valid, ["https://a.uci.edu/x", "https://a.uci.edu/y"])
+        self.assertEqual(rejected, ["https://a.uci.edu/a/a/a"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 2)
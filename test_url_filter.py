@@ -0,0 +1,41 @@
+import unittest
+
+from utils.url_filter import UrlFilter
+
+
+class TestUrlFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.url_filter = UrlFilter(
+            ["ics.uci.edu", "stat.uci.edu"], ["calendar", "share="], ["pdf", "jpg"])
+
+    def test_check_reasons(self):
+        """check returns the first rule a url breaks"""
+        cases = [
+            ('https://vision.ics.uci.edu/page', None),
+            ('ftp://ics.uci.edu/page', 'invalid_scheme'),
+            ('https://uci.edu/page', 'outside_allowed_domain'),
+            ('https://physics.uci.edu/page', 'outside_allowed_domain'),
+            ('https://stat.uci.edu/Calendar/2020', 'trap_keyword'),
+            ('https://ics.uci.edu/paper.PDF', 'blocked_extension'),
+            ('https://ics.uci.edu/paper.pdf.d/index', None),
+        ]
+        for url, reason in cases:
+            with self.subTest(url = url):
+                self.assertEqual(self.url_filter.check(url), reason)
+
+    def test_filter_many(self):
+        """filter_many keeps valid urls in order and reports the rest"""
+        rejected = []
+        valid = self.url_filter.filter_many(
+            ['https://ics.uci.edu/b', 'https://[::1/x', 'https://ics.uci.edu/?share=1',
+             'https://stat.uci.edu/a'],
+            on_reject = lambda reason, url: rejected.append((reason, url)))
+        self.assertEqual(valid, ['https://ics.uci.edu/b', 'https://stat.uci.edu/a'])
+        self.assertEqual(rejected, [
+            ('validation_error', 'https://[::1/x'),
+            ('trap_keyword', 'https://ics.uci.edu/?share=1')])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 2)
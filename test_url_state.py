@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from utils.url_state import (
+    UrlStateStore, UrlStateView, VISITED, REJECTED, RECORD, url_state_file)
+
+
+class TestUrlStateStore(unittest.TestCase):
+
+    def setUp(self):
+        self.save_dir = tempfile.mkdtemp()
+        self.path = url_state_file(os.path.join(self.save_dir, "frontier.shelve"))
+        self.store = UrlStateStore()
+        self.visited = UrlStateView(self.store, VISITED)
+        self.rejected = UrlStateView(self.store, REJECTED)
+
+    def tearDown(self):
+        shutil.rmtree(self.save_dir, ignore_errors = True)
+
+    def test_views_behave_like_sets(self):
+        """add, in, len and clear work per flag"""
+        urls = [f"https://www.ics.uci.edu/{i}" for i in range(5000)]
+        self.visited.update(urls)
+        self.rejected.add(urls[0], "not_html")
+        self.assertEqual(len(self.visited), 5000)
+        self.assertEqual(len(self.rejected), 1)
+        self.assertIn(urls[4999], self.visited)
+        self.assertNotIn(urls[1], self.rejected)
+        self.assertNotIn("https://www.ics.uci.edu/5000", self.visited)
+        self.visited.clear()
+        self.assertEqual(len(self.visited), 0)
+        self.assertNotIn(urls[4999], self.visited)
+        self.assertIn(urls[0], self.rejected)
+
+    def test_reasons(self):
+        """The reason of a rejection is kept, unknown ones as other"""
+        self.rejected.add("https://a.uci.edu/x", "trap_keyword")
+        self.rejected.add("https://a.uci.edu/y", "something_new")
+        self.assertEqual(self.store.reason("https://a.uci.edu/x"), "trap_keyword")
+        self.assertEqual(self.store.reason("https://a.uci.edu/y"), "other")
+        self.assertIsNone(self.store.reason("https://a.uci.edu/z"))
+
+    def test_reload_after_flush(self):
+        """Flushed state comes back on open, restart throws it away"""
+        self.store.open(self.path)
+        self.visited.add("https://a.uci.edu/x")
+        self.rejected.add("https://a.uci.edu/y", "http_error")
+        self.store.flush()
+
+        resumed = UrlStateStore()
+        resumed.open(self.path)
+        self.assertIn("https://a.uci.edu/x", UrlStateView(resumed, VISITED))
+        self.assertEqual(resumed.reason("https://a.uci.edu/y"), "http_error")
+        self.assertEqual(resumed.count(VISITED), 1)
+
+        restarted = UrlStateStore()
+        restarted.open(self.path, restart = True)
+        self.assertEqual(len(restarted), 0)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_torn_tail_is_dropped(self):
+        """A half written last record is cut off on open"""
+        self.store.open(self.path)
+        self.visited.add("https://a.uci.edu/x")
+        self.store.flush()
+        with open(self.path, "ab") as state_file:
+            state_file.write(b"\x01\x02\x03")
+        resumed = UrlStateStore()
+        resumed.open(self.path)
+        self.assertEqual(len(resumed), 1)
+        self.assertEqual(os.path.getsize(self.path), RECORD.size)
+
+    def test_superseded_records_are_compacted(self):
+        """The file is rewritten once most of its records are stale"""
+        self.store.open(self.path)
+        self.visited.add("https://a.uci.edu/x")
+        self.store.flush()
+        self.rejected.add("https://a.uci.edu/x", "trap_keyword")
+        self.store.flush()
+        self.rejected.add("https://a.uci.edu/x", "validation_error")
+        self.store.flush()
+        self.store.flush()
+        self.assertEqual(os.path.getsize(self.path), RECORD.size)
+        resumed = UrlStateStore()
+        resumed.open(self.path)
+        self.assertEqual(resumed.reason("https://a.uci.edu/x"), "validation_error")
+        self.assertIn("https://a.uci.edu/x", UrlStateView(resumed, VISITED))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 2)
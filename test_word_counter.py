@@ -0,0 +1,40 @@
+import random
+import unittest
+from collections import Counter
+
+from utils.word_counter import SketchWordCounter, WordCounter
+
+
+class TestWordCounter(unittest.TestCase):
+
+    def test_exact_counts(self):
+        """Stop words and non alphabetic tokens are skipped, lists and mappings merge"""
+        counter = WordCounter(["the", "and"])
+        counter.update(["the", "crawler", "and", "crawler", "page404"])
+        counter.update(Counter({"crawler": 2, "frontier": 1, "the": 7}))
+        self.assertEqual(counter.counts, {"crawler": 4, "frontier": 1})
+        self.assertEqual(counter.most_common(1), [("crawler", 4)])
+
+    def test_sketch_finds_top_words(self):
+        """The sketch keeps the frequent words of a zipf-like stream in fixed memory"""
+        rng = random.Random(121)
+        vocabulary = [f"word{chr(97 + i % 26)}{chr(97 + i // 26 % 26)}{chr(97 + i // 676)}"
+                      for i in range(5000)]
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+        exact = WordCounter([])
+        sketch = SketchWordCounter([], sketch_width = 4096, sketch_depth = 4, top_k = 100)
+        for _ in range(50):
+            page = rng.choices(vocabulary, weights, k = 400)
+            exact.update(page)
+            sketch.update(page)
+
+        self.assertLessEqual(len(sketch.counts), 100)
+        expected = {word for word, _ in exact.most_common(10)}
+        found = {word for word, _ in sketch.most_common(10)}
+        self.assertGreaterEqual(len(expected & found), 9)
+        for word, count in sketch.most_common(10):
+            self.assertGreaterEqual(count, exact.counts[word])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 2)
@@ -33,3 +33,7 @@ def normalize(url):
     if url.endswith("/"):
         return url.rstrip("/")
     return url
+
+def get_fingerprint(urlhash):
+    # 64 bit prefix of a urlhash, plenty to tell urls apart in memory.
+    return int(urlhash[:16], 16)
@@ -0,0 +1,106 @@
+import re
+
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit
+
+from utils import normalize
+
+TRACKING_PARAMS = (
+    "utm_*", "fbclid", "gclid", "msclkid", "mc_cid", "mc_eid", "_ga",
+    "jsessionid", "phpsessid", "sessionid")
+INDEX_PAGES = ("index.html", "index.htm", "index.php")
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+_ESCAPE = re.compile(r"%[0-9a-fA-F]{2}")
+_UNRESERVED = frozenset(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+
+
+def _fix_escape(match):
+    ''' %7e -> ~ for unreserved characters, %2f -> %2F for the rest. '''
+    char = chr(int(match.group()[1:], 16))
+    return char if char in _UNRESERVED else match.group().upper()
+
+
+def remove_dot_segments(path):
+    ''' /a/./b/../c -> /a/c, as in RFC 3986 5.2.4. '''
+    if "." not in path:
+        return path
+    output = list()
+    for segment in path.split("/"):
+        if segment == "..":
+            if len(output) > 1:
+                output.pop()
+        elif segment != ".":
+            output.append(segment)
+    if path.endswith(("/.", "/..")):
+        output.append("")
+    return "/".join(output)
+
+
+class Canonicalizer(object):
+    ''' One spelling for all the variants of a url, so they are fetched and
+    saved once.
+
+    Lowercases scheme and host, drops default ports, fragments, dot
+    segments and trailing index pages (INDEX_PAGES), fixes the case of
+    percent escapes, removes tracking parameters (a trailing * matches a
+    prefix) and, with sort_query, orders the query parameters. The result
+    is also normalize()d. Results are memoized, since the same hrefs show
+    up on page after page.
+    '''
+    def __init__(self, sort_query=True, drop_params=TRACKING_PARAMS,
+                 index_pages=INDEX_PAGES, cache_size=1 << 16):
+        self.sort_query = sort_query
+        self.drop_params = frozenset(
+            param.lower() for param in drop_params if not param.endswith("*"))
+        self.drop_prefixes = tuple(
+            param[:-1].lower() for param in drop_params if param.endswith("*"))
+        self.index_pages = frozenset(index_pages)
+        self.canonicalize = lru_cache(maxsize=cache_size)(self._canonicalize)
+
+    def _canonicalize(self, url):
+        try:
+            scheme, netloc, path, query, _ = urlsplit(url.strip())
+        except ValueError:
+            return normalize(url)
+        scheme = scheme.lower()
+        userinfo, at, host = netloc.rpartition("@")
+        host = host.lower()
+        host, _, port = host.rpartition(":") if ":" in host else (host, "", "")
+        if "]" in port:
+            # [ipv6] without a port
+            host, port = f"{host}:{port}", ""
+        if port == DEFAULT_PORTS.get(scheme):
+            port = ""
+        netloc = userinfo + at + host.rstrip(".") + (f":{port}" if port else "")
+        if "%" in path:
+            path = _ESCAPE.sub(_fix_escape, path)
+        path = remove_dot_segments(path)
+        head, _, last = path.rpartition("/")
+        if last in self.index_pages:
+            path = head + "/"
+        if query:
+            query = self._query(query)
+        return normalize(urlunsplit((scheme, netloc, path, query, "")))
+
+    def _query(self, query):
+        params = list()
+        for param in query.split("&"):
+            if not param:
+                continue
+            name = param.partition("=")[0].lower()
+            if name in self.drop_params or (self.drop_prefixes and name.startswith(self.drop_prefixes)):
+                continue
+            if "%" in param:
+                param = _ESCAPE.sub(_fix_escape, param)
+            params.append(param)
+        if self.sort_query:
+            params.sort()
+        return "&".join(params)
+
+
+def make_canonicalizer(config):
+    return Canonicalizer(
+        config.canonical_sort_query, config.canonical_drop_params,
+        config.canonical_index_pages, config.canonical_cache)
@@ -1,5 +1,8 @@
+import os
 import re
 
+from utils.canonical import TRACKING_PARAMS, INDEX_PAGES
+
 
 class Config(object):
     def __init__(self, config):
@@ -9,11 +12,65 @@ class Config(object):
         assert re.match(r"^[a-zA-Z0-9_ ,]+$", self.user_agent), "User agent should not have any special characters outside '_', ',' and 'space'"
         self.threads_count = int(config["LOCAL PROPERTIES"]["THREADCOUNT"])
         self.save_file = config["LOCAL PROPERTIES"]["SAVE"]
+        self.save_flush_records = int(config["LOCAL PROPERTIES"].get("SAVEFLUSHRECORDS", "1000"))
+        self.save_flush_interval = int(config["LOCAL PROPERTIES"].get("SAVEFLUSHMS", "500")) / 1000
+        self.async_tasks = int(config["LOCAL PROPERTIES"].get("ASYNCTASKS", "100"))
+        self.parse_processes = int(config["LOCAL PROPERTIES"].get("PARSEPROCESSES", "0"))
+        self.parse_queue = int(config["LOCAL PROPERTIES"].get("PARSEQUEUE", "64"))
+        self.word_counter = config["LOCAL PROPERTIES"].get("WORDCOUNTER", "exact").strip()
+        self.sketch_width = int(config["LOCAL PROPERTIES"].get("SKETCHWIDTH", "1048576"))
+        self.sketch_depth = int(config["LOCAL PROPERTIES"].get("SKETCHDEPTH", "4"))
+        self.top_k_words = int(config["LOCAL PROPERTIES"].get("TOPKWORDS", "1000"))
+        self.report_interval = float(config["LOCAL PROPERTIES"].get("REPORTINTERVAL", "30"))
+        self.report_pages = int(config["LOCAL PROPERTIES"].get("REPORTPAGES", "50"))
+        self.metrics_file = config["LOCAL PROPERTIES"].get("METRICSFILE", "Logs/metrics.json").strip()
+        self.metrics_interval = float(config["LOCAL PROPERTIES"].get("METRICSINTERVAL", "10"))
+        self.metrics_port = int(config["LOCAL PROPERTIES"].get("METRICSPORT", "0"))
+        self.record_dir = config["LOCAL PROPERTIES"].get("RECORD", "").strip()
+        self.record_segment_bytes = int(config["LOCAL PROPERTIES"].get("RECORDSEGMENTMB", "256")) << 20
+        # Set by launch.py --replay: serve downloads from record_dir only.
+        self.replay = False
+        self.partition_batch = int(config["LOCAL PROPERTIES"].get("PARTITIONBATCH", "500"))
+        self.partition_flush_interval = int(config["LOCAL PROPERTIES"].get("PARTITIONFLUSHMS", "200")) / 1000
+        # The environment wins, so the secret need not be in config.ini.
+        self.partition_key = os.environ.get(
+            "PARTITIONKEY", config["LOCAL PROPERTIES"].get("PARTITIONKEY", "")).strip()
+        # Set by launch.py --nodes/--partition for a distributed crawl.
+        self.nodes = []
+        self.partition = None
 
         self.host = config["CONNECTION"]["HOST"]
         self.port = int(config["CONNECTION"]["PORT"])
+        self.connect_timeout = float(config["CONNECTION"].get("CONNECTTIMEOUT", "5"))
+        self.read_timeout = float(config["CONNECTION"].get("READTIMEOUT", "30"))
+        self.retries = int(config["CONNECTION"].get("RETRIES", "3"))
+        self.retry_backoff = float(config["CONNECTION"].get("RETRYBACKOFF", "0.5"))
+        self.max_page_bytes = int(config["CONNECTION"].get("MAXPAGEBYTES", "10485760"))
 
         self.seed_urls = config["CRAWLER"]["SEEDURL"].split(",")
+        self.trap_max_depth = int(config["CRAWLER"].get("TRAPMAXDEPTH", "15"))
+        self.trap_max_repeats = int(config["CRAWLER"].get("TRAPMAXREPEATS", "3"))
+        self.trap_query_fanout = int(config["CRAWLER"].get("TRAPQUERYFANOUT", "500"))
+        self.trap_min_pages = int(config["CRAWLER"].get("TRAPMINPAGES", "10"))
+        self.trap_bad_ratio = float(config["CRAWLER"].get("TRAPBADRATIO", "0.8"))
+        self.scorer = config["CRAWLER"].get("SCORER", "bfs").strip()
+        self.robots = config["CRAWLER"].getboolean("ROBOTS", True)
+        self.robots_ttl = float(config["CRAWLER"].get("ROBOTSTTL", "86400"))
+        self.robots_max_delay = float(config["CRAWLER"].get("ROBOTSMAXDELAY", "5"))
+        self.sitemap_limit = int(config["CRAWLER"].get("SITEMAPLIMIT", "10"))
+        self.canonical_sort_query = config["CRAWLER"].getboolean("CANONICALSORTQUERY", True)
+        self.canonical_drop_params = [
+            param.strip() for param in config["CRAWLER"].get(
+                "CANONICALDROPPARAMS", ",".join(TRACKING_PARAMS)).split(",")
+            if param.strip()]
+        self.canonical_index_pages = [
+            page.strip() for page in config["CRAWLER"].get(
+                "CANONICALINDEXPAGES", ",".join(INDEX_PAGES)).split(",")
+            if page.strip()]
+        self.canonical_cache = int(config["CRAWLER"].get("CANONICALCACHE", "65536"))
+        self.allowed_domains = [
+            domain.strip() for domain in config["CRAWLER"].get("ALLOWEDDOMAINS", "").split(",")
+            if domain.strip()]
         self.time_delay = float(config["CRAWLER"]["POLITENESS"])
 
         self.cache_server = None
\ No newline at end of file
@@ -1,21 +1,229 @@
+import asyncio
+import threading
+import weakref
 import requests
 import cbor
 import time
 
-from utils.response import Response
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode
+from urllib3.util.retry import Retry
 
-def download(url, config, logger=None):
+from utils.response import Response, TOO_LARGE_STATUS, too_large
+from utils.metrics import METRICS
+from utils.response_store import get_response_store
+
+# Cache server answers worth retrying. 4xx and 6xx are final.
+RETRY_STATUSES = (500, 502, 503, 504)
+
+_sessions = threading.local()
+# event loop -> idle keep-alive (reader, writer) pairs to the cache server
+_idle_connections = weakref.WeakKeyDictionary()
+
+def download(url, config, logger=None, content_types=None):
+    ''' content_types: see Response, pages of other types larger than
+    PEEK_BYTES are not unpickled. '''
+    store = get_response_store(config)
+    if config.replay:
+        return _replay(url, store, logger, config.max_page_bytes, content_types)
     host, port = config.cache_server
-    resp = requests.get(
-        f"http://{host}:{port}/",
-        params=[("q", f"{url}"), ("u", f"{config.user_agent}")])
+    with METRICS.timer("download_seconds"):
+        resp = _get_session(config).get(
+            f"http://{host}:{port}/",
+            params=[("q", f"{url}"), ("u", f"{config.user_agent}")],
+            timeout=(config.connect_timeout, config.read_timeout),
+            stream=True)
+        content = _read_body(resp, config.max_page_bytes)
+    if content is None:
+        return _too_large(url, resp.headers.get("Content-Length"), config, store, logger)
+    _count_download(resp.status_code, content)
+    if store is not None:
+        store.put(url, resp.status_code, content)
+    return _to_response(url, resp.status_code, content, logger, content_types=content_types)
+
+def _read_body(resp, max_bytes):
+    ''' Body of a streamed answer, or None once it is known to be bigger than
+    max_bytes, in which case the rest of it is never read. '''
+    if not max_bytes:
+        return resp.content
+    length = resp.headers.get("Content-Length", "")
+    if length.isdigit():
+        if int(length) <= max_bytes:
+            return resp.content
+        resp.close()
+        return None
+    body = bytearray()
+    for chunk in resp.iter_content(1 << 16):
+        body += chunk
+        if len(body) > max_bytes:
+            resp.close()
+            return None
+    return bytes(body)
+
+def _too_large(url, size, config, store, logger):
+    METRICS.inc("pages_too_large_total")
+    _count_download(TOO_LARGE_STATUS, b"")
+    if store is not None:
+        store.put(url, TOO_LARGE_STATUS, b"")
+    if logger:
+        logger.warning(f"Skipped {url}, larger than {config.max_page_bytes} bytes.")
+    return too_large(url, size, config.max_page_bytes)
+
+def _get_session(config):
+    ''' One keep-alive session per thread, so every worker reuses its own
+    connection to the cache server instead of opening one per url. '''
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        retries = Retry(
+            total=config.retries, backoff_factor=config.retry_backoff,
+            status_forcelist=RETRY_STATUSES, allowed_methods=frozenset(["GET"]),
+            raise_on_status=False)
+        session = requests.Session()
+        session.mount("http://", HTTPAdapter(max_retries=retries))
+        _sessions.session = session
+    return session
+
+async def download_async(url, config, logger=None, content_types=None):
+    ''' Same as download, but on the running event loop. Speaks just enough
+    HTTP/1.1 to talk to the cache server and keeps idle connections around
+    for reuse by the next request on the same loop. '''
+    store = get_response_store(config)
+    if config.replay:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, _replay, url, store, logger, config.max_page_bytes, content_types)
+    host, port = config.cache_server
+    query = urlencode([("q", f"{url}"), ("u", f"{config.user_agent}")])
+    request = (
+        f"GET /?{query} HTTP/1.1\r\n"
+        f"Host: {host}:{port}\r\n"
+        f"Accept-Encoding: identity\r\n\r\n").encode("latin-1")
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        reused = False
+        try:
+            reader, writer, reused = await _open_connection(
+                host, port, config.connect_timeout)
+            try:
+                writer.write(request)
+                await writer.drain()
+                status_code, content, keep_alive = await asyncio.wait_for(
+                    _read_http_response(reader, config.max_page_bytes), config.read_timeout)
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                _idle_connections[asyncio.get_running_loop()].append((reader, writer))
+            else:
+                writer.close()
+            if status_code not in RETRY_STATUSES or attempt >= config.retries:
+                METRICS.observe("download_seconds", time.perf_counter() - started)
+                if content is None:
+                    return await asyncio.get_running_loop().run_in_executor(
+                        None, _too_large, url, None, config, store, logger)
+                _count_download(status_code, content)
+                if store is not None:
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, store.put, url, status_code, content)
+                return _to_response(
+                    url, status_code, content, logger, content_types=content_types)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            if reused:
+                # The server dropped an idle connection, that is not a failure.
+                continue
+            if attempt >= config.retries:
+                raise
+        await asyncio.sleep(config.retry_backoff * (2 ** attempt))
+        attempt += 1
+
+async def _open_connection(host, port, timeout):
+    idle = _idle_connections.setdefault(asyncio.get_running_loop(), list())
+    while idle:
+        reader, writer = idle.pop()
+        if not reader.at_eof() and not writer.is_closing():
+            return reader, writer, True
+        writer.close()
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(host, port), timeout)
+    return reader, writer, False
+
+async def _read_http_response(reader, max_bytes=0):
+    ''' (status, body, keep alive) of the answer on reader. The body is None,
+    and the connection not reusable, once it passes max_bytes (0: no cap). '''
+    status_line = await reader.readline()
+    if not status_line:
+        raise asyncio.IncompleteReadError(b"", None)
+    version, status_code = status_line.split()[:2]
+    headers = dict()
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    keep_alive = (
+        version == b"HTTP/1.1"
+        and headers.get("connection", "").lower() != "close")
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = list()
+        total = 0
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                break
+            total += size
+            if max_bytes and total > max_bytes:
+                return int(status_code), None, False
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        await reader.readline()
+        return int(status_code), b"".join(chunks), keep_alive
+    if "content-length" in headers:
+        length = int(headers["content-length"])
+        if max_bytes and length > max_bytes:
+            return int(status_code), None, False
+        content = await reader.readexactly(length)
+        return int(status_code), content, keep_alive
+    # Body runs until the server closes the connection.
+    if not max_bytes:
+        return int(status_code), await reader.read(), False
+    content = bytearray()
+    while len(content) <= max_bytes:
+        chunk = await reader.read(1 << 16)
+        if not chunk:
+            return int(status_code), bytes(content), False
+        content += chunk
+    return int(status_code), None, False
+
+def _replay(url, store, logger, max_bytes=0, content_types=None):
+    ''' The recorded answer for url, instead of asking the cache server. '''
+    recorded = store.get(url)
+    if recorded is None:
+        if logger:
+            logger.error(f"No recorded response for {url}.")
+        return Response({
+            "error": f"No recorded response for {url}.", "status": 404, "url": url})
+    status_code, content = recorded
+    if max_bytes and len(content) > max_bytes:
+        METRICS.inc("pages_too_large_total")
+        return too_large(url, len(content), max_bytes)
+    _count_download(status_code, content)
+    return _to_response(url, status_code, content, logger, content_types=content_types)
+
+def _count_download(status_code, content):
+    METRICS.inc("pages_downloaded_total")
+    METRICS.inc("bytes_downloaded_total", len(content))
+    METRICS.inc("downloads_by_status_total", status=status_code)
+
+def _to_response(url, status_code, content, logger, content_types=None):
     try:
-        if resp and resp.content:
-            return Response(cbor.loads(resp.content))
+        if status_code < 400 and content:
+            return Response(cbor.loads(content), content_types)
     except (EOFError, ValueError) as e:
         pass
-    logger.error(f"Spacetime Response error {resp} with url {url}.")
+    if logger:
+        logger.error(f"Spacetime Response error <{status_code}> with url {url}.")
     return Response({
-        "error": f"Spacetime Response error {resp} with url {url}.",
-        "status": resp.status_code,
+        "error": f"Spacetime Response error <{status_code}> with url {url}.",
+        "status": status_code,
         "url": url})
@@ -0,0 +1,62 @@
+from array import array
+
+
+class FingerprintSet(object):
+    ''' Set of 64 bit url fingerprints kept in one flat array.
+
+    Open addressing with linear probing over an array('Q') costs 8 bytes per
+    slot, against roughly 100 bytes per entry for a set of hex strings, so
+    tens of millions of urls fit in a few hundred MB. Slot value 0 marks an
+    empty slot, so a fingerprint of 0 is stored as 1.
+    '''
+    MAX_LOAD = 0.6
+    MIN_SLOTS = 1 << 10
+
+    def __init__(self, capacity=0):
+        slots = self.MIN_SLOTS
+        while slots * self.MAX_LOAD < capacity:
+            slots <<= 1
+        self.slots = array('Q', bytes(8 * slots))
+        self.mask = slots - 1
+        self.count = 0
+
+    def _probe(self, fingerprint):
+        ''' Index of fingerprint's slot, or of the empty slot it would go in. '''
+        slots, mask = self.slots, self.mask
+        index = fingerprint & mask
+        while True:
+            current = slots[index]
+            if current == fingerprint or current == 0:
+                return index
+            index = (index + 1) & mask
+
+    def __contains__(self, fingerprint):
+        fingerprint = fingerprint or 1
+        return self.slots[self._probe(fingerprint)] == fingerprint
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        ''' The fingerprints in the set, 0 coming out as 1. '''
+        return (fingerprint for fingerprint in self.slots if fingerprint)
+
+    def add(self, fingerprint):
+        ''' Add fingerprint. Returns True if it was not in the set before. '''
+        fingerprint = fingerprint or 1
+        index = self._probe(fingerprint)
+        if self.slots[index] == fingerprint:
+            return False
+        self.slots[index] = fingerprint
+        self.count += 1
+        if self.count > self.MAX_LOAD * len(self.slots):
+            self._grow()
+        return True
+
+    def _grow(self):
+        old_slots = self.slots
+        self.slots = array('Q', bytes(16 * len(old_slots)))
+        self.mask = len(self.slots) - 1
+        for fingerprint in old_slots:
+            if fingerprint:
+                self.slots[self._probe(fingerprint)] = fingerprint
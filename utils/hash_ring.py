@@ -0,0 +1,32 @@
+from bisect import bisect
+from hashlib import md5
+
+
+def _point(key):
+    return int.from_bytes(md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing(object):
+    ''' Consistent hashing of keys (hosts) onto nodes.
+
+    Every node owns `replicas` points on a 64 bit ring and a key goes to the
+    node owning the first point at or after the key's hash. Adding or
+    removing a node only moves the keys of that node, and node names (not
+    their order) decide who owns what, so every process computes the same
+    owner for a host.
+    '''
+    def __init__(self, nodes, replicas=64):
+        self.nodes = list(nodes)
+        points = sorted(
+            (_point(f"{node}#{replica}"), node)
+            for node in self.nodes for replica in range(replicas))
+        self.points = [point for point, _ in points]
+        self.owners = [node for _, node in points]
+        self.cache = dict()     # key -> node, there are few hosts
+
+    def node_for(self, key):
+        node = self.cache.get(key)
+        if node is None:
+            index = bisect(self.points, _point(key)) % len(self.points)
+            node = self.cache[key] = self.owners[index]
+        return node
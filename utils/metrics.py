@@ -0,0 +1,182 @@
+import json
+import math
+import time
+
+from bisect import bisect_left
+from threading import Lock
+
+# Upper bounds (seconds) of the latency histogram buckets, a last +Inf
+# bucket catches everything slower.
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram(object):
+    ''' Counts of observations per bucket, plus their count and sum. '''
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        ''' Upper bound of the bucket holding the q-th quantile, so an
+        estimate that is never too low. '''
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+
+class _Timer(object):
+    __slots__ = ("registry", "name", "started")
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class MetricsRegistry(object):
+    ''' Counters, gauges and histograms of a running crawl.
+
+    Counters and histograms are updated on the hot path, so they are plain
+    dict and list updates under one lock. Gauges are functions that are only
+    called when a snapshot is taken; a gauge returning a dict is exported
+    with one sample per key (e.g. queue depth per host). Names follow the
+    Prometheus conventions: *_total for counters, *_seconds for latencies.
+    '''
+    def __init__(self):
+        self.lock = Lock()
+        self.counters = dict()      # (name, (label name, value) or None) -> value
+        self.histograms = dict()    # name -> Histogram
+        self.gauges = dict()        # name -> (label name, function)
+        self.started = time.time()
+
+    def inc(self, name, amount=1, **label):
+        ''' Add amount to a counter. One keyword argument optionally splits
+        the counter by a label, e.g. inc("urls_rejected_total", reason=r). '''
+        key = (name, label.popitem() if label else None)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def timer(self, name):
+        ''' with METRICS.timer("parse_seconds"): ... records the block's
+        duration in that histogram. '''
+        return _Timer(self, name)
+
+    def gauge(self, name, function, label_name=None):
+        ''' Register function as the source of gauge name. Functions
+        returning a dict need the label_name their keys are exported as. '''
+        with self.lock:
+            self.gauges[name] = (label_name, function)
+
+    def counter(self, name, **label):
+        with self.lock:
+            return self.counters.get((name, label.popitem() if label else None), 0)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.gauges.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        ''' A JSON friendly copy of every metric. '''
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {
+                name: (list(h.counts), h.count, h.sum, h.quantile(0.5),
+                       h.quantile(0.9), h.quantile(0.99), h.buckets)
+                for name, h in self.histograms.items()}
+            gauges = dict(self.gauges)
+        label_names = {name: label_name for name, (label_name, _) in gauges.items()}
+        snapshot = {
+            "time": time.time(), "uptime": time.time() - self.started,
+            "counters": dict(), "gauges": dict(), "histograms": dict(),
+            "labels": label_names}
+        for (name, label), value in sorted(counters.items(), key=_counter_order):
+            if label is None:
+                snapshot["counters"][name] = value
+            else:
+                snapshot["counters"].setdefault(name, dict())[label[1]] = value
+                label_names[name] = label[0]
+        for name, (label_name, function) in sorted(gauges.items()):
+            try:
+                snapshot["gauges"][name] = function()
+            except Exception:
+                continue
+        for name, (counts, count, total, p50, p90, p99, buckets) in sorted(histograms.items()):
+            snapshot["histograms"][name] = {
+                "count": count, "sum": total,
+                "p50": _finite(p50), "p90": _finite(p90), "p99": _finite(p99),
+                "buckets": dict(zip([str(b) for b in buckets] + ["+Inf"], counts))}
+        return snapshot
+
+    def to_json(self, snapshot=None):
+        return json.dumps(snapshot or self.snapshot(), indent=1, sort_keys=True)
+
+    def to_prometheus(self, snapshot=None):
+        ''' The snapshot in the Prometheus text exposition format. '''
+        snapshot = snapshot or self.snapshot()
+        label_names = snapshot["labels"]
+        lines = list()
+        for kind in ("counter", "gauge"):
+            for name, value in snapshot[kind + "s"].items():
+                lines.append(f"# TYPE {name} {kind}")
+                if isinstance(value, dict):
+                    label_name = label_names.get(name) or "label"
+                    lines.extend(f'{name}{{{label_name}="{_escape(key)}"}} {sample}'
+                                 for key, sample in value.items())
+                else:
+                    lines.append(f"{name} {value}")
+        for name, histogram in snapshot["histograms"].items():
+            lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in histogram["buckets"].items():
+                cumulative += count
+                lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum {histogram['sum']}")
+            lines.append(f"{name}_count {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _counter_order(item):
+    (name, label), _ = item
+    return name, "" if label is None else str(label[1])
+
+def _finite(value):
+    return value if value != math.inf else None
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# The registry every part of the crawler reports to.
+METRICS = MetricsRegistry()
@@ -0,0 +1,208 @@
+import atexit
+import json
+import os
+import struct
+import zlib
+
+from threading import Lock
+
+# Record header: magic, http status, url length, compressed payload length,
+# crc32 of url + compressed payload.
+RECORD = struct.Struct("<4sHII I")
+MAGIC = b"RSP1"
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".rsp"
+INDEX_FILE = "index.jsonl"
+
+
+class ResponseStore(object):
+    ''' Append-only store of raw cache server answers, for replaying a crawl
+    without the cache server.
+
+    Each record holds the url, the http status and the zlib compressed
+    payload exactly as the cache server sent it (cbor with the pickled
+    response, so headers and content included). Records are appended to
+    numbered segment files of about segment_bytes each, and every write
+    also appends (segment, offset, url) to index.jsonl. On open the index
+    is loaded, records written after its last line are recovered from the
+    last segment and a torn record at its end is cut off. The latest record
+    of a url wins.
+    '''
+    def __init__(self, directory, segment_bytes=256 << 20, readonly=False):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.readonly = readonly
+        self.lock = Lock()
+        self.index = dict()     # url -> (segment number, offset)
+        self.readers = dict()   # segment number -> read only fd
+        self.writer = None
+        self.index_file = None
+        if not readonly:
+            os.makedirs(directory, exist_ok=True)
+        self._load()
+        atexit.register(self.close)
+
+    def segment_path(self, number):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{number:05d}{SEGMENT_SUFFIX}")
+
+    def segments(self):
+        ''' Numbers of the segment files, oldest first. '''
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+
+    def _load(self):
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        torn_index = False
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as index_file:
+                for line in index_file:
+                    try:
+                        segment, offset, url = json.loads(line)
+                    except ValueError:
+                        torn_index = True
+                        break
+                    self.index[url] = (segment, offset)
+        segments = self.segments()
+        self.segment = segments[-1] if segments else 0
+        # Recover the records written after the last indexed one, and cut a
+        # torn record at the end of the last segment.
+        last_indexed = max(self.index.values(), default=(-1, -1))
+        recovered = list()
+        end = 0
+        for segment in segments:
+            if segment < last_indexed[0]:
+                continue
+            start = last_indexed[1] if segment == last_indexed[0] else 0
+            end = start
+            for offset, url, _, _, end in iter_segment(self.segment_path(segment), start):
+                if (segment, offset) > last_indexed:
+                    recovered.append((segment, offset, url))
+        last_path = self.segment_path(self.segment)
+        if not self.readonly and os.path.exists(last_path) and end < os.path.getsize(last_path):
+            with open(last_path, "r+b") as segment_file:
+                segment_file.truncate(end)
+        for url, (segment, offset) in list(self.index.items()):
+            if segment == self.segment and offset >= end:
+                del self.index[url]     # indexed, but the record was torn
+                torn_index = True
+        for segment, offset, url in recovered:
+            self.index[url] = (segment, offset)
+        if self.readonly:
+            return
+        self.writer = open(last_path, "ab")
+        if torn_index:
+            # Rewrite the index so later appends do not follow a bad line.
+            with open(index_path + ".tmp", "w", encoding="utf-8") as index_file:
+                index_file.write("".join(
+                    json.dumps((segment, offset, url)) + "\n"
+                    for url, (segment, offset) in self.index.items()))
+            os.replace(index_path + ".tmp", index_path)
+            recovered = list()
+        self.index_file = open(index_path, "a", encoding="utf-8")
+        if recovered:
+            self._write_index(recovered)
+
+    def _write_index(self, entries):
+        self.index_file.write("".join(
+            json.dumps(entry) + "\n" for entry in entries))
+        self.index_file.flush()
+
+    def put(self, url, status, payload):
+        ''' Append the cache server's answer for url. '''
+        url_bytes = url.encode("utf-8")
+        compressed = zlib.compress(payload or b"", 6)
+        checksum = zlib.crc32(compressed, zlib.crc32(url_bytes))
+        record = RECORD.pack(MAGIC, status, len(url_bytes), len(compressed), checksum)
+        with self.lock:
+            if self.writer.tell() >= self.segment_bytes:
+                self.writer.close()
+                self.segment += 1
+                self.writer = open(self.segment_path(self.segment), "ab")
+            offset = self.writer.tell()
+            self.writer.write(record + url_bytes + compressed)
+            self.writer.flush()
+            self.index[url] = (self.segment, offset)
+            self._write_index([(self.segment, offset, url)])
+
+    def get(self, url):
+        ''' (status, payload) last recorded for url, or None. '''
+        with self.lock:
+            location = self.index.get(url)
+            if location is None:
+                return None
+            segment, offset = location
+            fd = self.readers.get(segment)
+            if fd is None:
+                fd = self.readers[segment] = os.open(self.segment_path(segment), os.O_RDONLY)
+        _, status, payload = read_record(fd, offset)
+        return status, payload
+
+    def __contains__(self, url):
+        return url in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def locations(self):
+        ''' {url: (segment, offset)} of the latest record of every url. '''
+        with self.lock:
+            return dict(self.index)
+
+    def close(self):
+        with self.lock:
+            for closable in (self.writer, self.index_file):
+                if closable is not None:
+                    closable.close()
+            self.writer = self.index_file = None
+            for fd in self.readers.values():
+                os.close(fd)
+            self.readers.clear()
+
+
+def read_record(fd, offset):
+    ''' (url, status, payload) of the record at offset of an open segment. '''
+    _, status, url_length, length, _ = RECORD.unpack(os.pread(fd, RECORD.size, offset))
+    body = os.pread(fd, url_length + length, offset + RECORD.size)
+    return body[:url_length].decode("utf-8"), status, zlib.decompress(body[url_length:])
+
+
+def iter_segment(path, start=0):
+    ''' (offset, url, status, compressed payload, end offset) of every
+    intact record in a segment file from start on. Stops at the first torn
+    or corrupt record. '''
+    with open(path, "rb") as segment_file:
+        segment_file.seek(start)
+        offset = start
+        while True:
+            header = segment_file.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            magic, status, url_length, length, checksum = RECORD.unpack(header)
+            if magic != MAGIC:
+                return
+            body = segment_file.read(url_length + length)
+            if len(body) < url_length + length or zlib.crc32(body) != checksum:
+                return
+            end = offset + RECORD.size + len(body)
+            yield offset, body[:url_length].decode("utf-8"), status, body[url_length:], end
+            offset = end
+
+
+_stores = dict()
+_stores_lock = Lock()
+
+def get_response_store(config):
+    ''' The store in RECORD shared by all workers, or None when responses are
+    neither recorded nor replayed. '''
+    if not config.record_dir:
+        return None
+    with _stores_lock:
+        store = _stores.get(config.record_dir)
+        if store is None:
+            store = _stores[config.record_dir] = ResponseStore(
+                config.record_dir, config.record_segment_bytes, readonly=config.replay)
+        return store
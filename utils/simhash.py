@@ -0,0 +1,89 @@
+from hashlib import blake2b
+from threading import RLock
+
+# simhash adds up 64 weighted bit votes at once: each hash bit gets its own
+# 32 bit lane in one big int, so a token costs 8 table lookups, not 64 steps.
+# _SPREAD[k][b] holds the lanes for byte value b at byte position k.
+_LANE = 32
+_LANE_MASK = (1 << _LANE) - 1
+_SPREAD = [
+    [sum(((byte >> bit) & 1) << ((8 * position + bit) * _LANE) for bit in range(8))
+     for byte in range(256)]
+    for position in range(8)]
+
+
+def checksum(tokens):
+    ''' Exact fingerprint of a token sequence. '''
+    return blake2b(" ".join(tokens).encode("utf-8"), digest_size=16).digest()
+
+
+def token_hash(token):
+    return blake2b(token.encode("utf-8"), digest_size=8).digest()
+
+
+def simhash(token_counts):
+    ''' 64 bit SimHash of a {token: count} mapping, tokens weighted by count.
+    Pages with mostly the same words get fingerprints a few bits apart. '''
+    votes = 0
+    total = 0
+    s0, s1, s2, s3, s4, s5, s6, s7 = _SPREAD
+    for token, weight in token_counts.items():
+        h = token_hash(token)
+        lanes = (s0[h[0]] | s1[h[1]] | s2[h[2]] | s3[h[3]]
+                 | s4[h[4]] | s5[h[5]] | s6[h[6]] | s7[h[7]])
+        votes += lanes if weight == 1 else weight * lanes
+        total += weight
+    fingerprint = 0
+    for bit in range(64):
+        if ((votes >> (bit * _LANE)) & _LANE_MASK) * 2 > total:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class DuplicateIndex(object):
+    ''' Exact checksums plus SimHash fingerprints of every page seen.
+
+    Fingerprints are split into `bands` equal bands and bucketed by each
+    band's value. Two fingerprints at most max_distance bits apart must agree
+    on at least one band as long as bands > max_distance, so a lookup only
+    compares against the few pages sharing a bucket instead of all of them.
+    '''
+    def __init__(self, max_distance=3, bands=4):
+        assert bands > max_distance, "bands must exceed max_distance to find all near duplicates"
+        self.max_distance = max_distance
+        self.band_bits = 64 // bands
+        self.band_mask = (1 << self.band_bits) - 1
+        self.checksums = dict()     # checksum -> url
+        self.buckets = [dict() for _ in range(bands)]    # band value -> [(fingerprint, url)]
+        self.lock = RLock()
+
+    def _band_keys(self, fingerprint):
+        return [
+            (fingerprint >> (band * self.band_bits)) & self.band_mask
+            for band in range(len(self.buckets))]
+
+    def find(self, page_checksum, fingerprint):
+        ''' url of a page seen before with the same or nearly the same
+        content, or None. '''
+        with self.lock:
+            if page_checksum in self.checksums:
+                return self.checksums[page_checksum]
+            for buckets, key in zip(self.buckets, self._band_keys(fingerprint)):
+                for other, url in buckets.get(key, ()):
+                    if bin(fingerprint ^ other).count("1") <= self.max_distance:
+                        return url
+            return None
+
+    def add(self, url, page_checksum, fingerprint):
+        with self.lock:
+            self.checksums[page_checksum] = url
+            for buckets, key in zip(self.buckets, self._band_keys(fingerprint)):
+                buckets.setdefault(key, list()).append((fingerprint, url))
+
+    def check_and_add(self, url, page_checksum, fingerprint):
+        ''' find(), and add the page if it is not a duplicate. '''
+        with self.lock:
+            original = self.find(page_checksum, fingerprint)
+            if original is None:
+                self.add(url, page_checksum, fingerprint)
+            return original
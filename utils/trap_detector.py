@@ -0,0 +1,118 @@
+from threading import Lock
+from urllib.parse import urlparse
+
+
+def url_shape(host, path, query):
+    ''' The url with its variable parts collapsed: numbers become "#", long
+    ids become "*" and only the names of query parameters are kept, so
+    /events/2024/05?page=3 and /events/2023/11?page=9 have the same shape. '''
+    segments = list()
+    for segment in path.split("/"):
+        if not segment:
+            continue
+        if segment.isdigit():
+            segments.append("#")
+        elif len(segment) >= 16 and any(char.isdigit() for char in segment):
+            segments.append("*")
+        elif any(char.isdigit() for char in segment):
+            segments.append("".join("#" if char.isdigit() else char for char in segment))
+        else:
+            segments.append(segment)
+    shape = host + "/" + "/".join(segments)
+    if query:
+        names = sorted({part.partition("=")[0] for part in query.split("&") if part})
+        shape += "?" + "&".join(names)
+    return shape
+
+
+class TrapDetector(object):
+    ''' Online trap detection from url statistics, for is_valid.
+
+    Urls are rejected when their path is deeper than max_depth, when one
+    path segment repeats max_repeats times (/a/b/a/b/a), or when a single
+    path has been seen with more than query_fanout different query strings.
+    Pages crawled are reported back with record(); once min_pages pages of a
+    url shape were crawled and at least bad_ratio of them were duplicates,
+    errors or had no usable text, the whole shape is cut off. Every check is
+    a few dict lookups, O(1) amortized per url. 0 turns a rule off.
+    '''
+    def __init__(self, max_depth=15, max_repeats=3, query_fanout=500,
+                 min_pages=10, bad_ratio=0.8):
+        self.max_depth = max_depth
+        self.max_repeats = max_repeats
+        self.query_fanout = query_fanout
+        self.min_pages = min_pages
+        self.bad_ratio = bad_ratio
+        self.lock = Lock()
+        self.shapes = dict()        # shape -> [pages crawled, bad pages]
+        self.cut_shapes = set()
+        self.queries = dict()       # host + path -> set of query hashes, None once over fan-out
+
+    def check(self, url):
+        ''' Reason url looks like a trap, or None. '''
+        parsed = urlparse(url)
+        host = parsed.netloc.lower()
+        path = parsed.path
+        segments = [segment for segment in path.split("/") if segment]
+        if self.max_depth and len(segments) > self.max_depth:
+            return "path_too_deep"
+        if self.max_repeats and len(segments) >= self.max_repeats:
+            seen = dict()
+            for segment in segments:
+                seen[segment] = seen.get(segment, 0) + 1
+                if seen[segment] >= self.max_repeats:
+                    return "repeating_segments"
+        with self.lock:
+            if self.cut_shapes and url_shape(host, path, parsed.query) in self.cut_shapes:
+                return "trap_shape"
+            if self.query_fanout and parsed.query:
+                key = host + path
+                queries = self.queries.get(key, ())
+                if queries is None:
+                    return "query_fanout"
+                query_hash = hash(parsed.query)
+                if query_hash not in queries:
+                    if len(queries) >= self.query_fanout:
+                        self.queries[key] = None
+                        return "query_fanout"
+                    if not queries:
+                        queries = self.queries[key] = set()
+                    queries.add(query_hash)
+        return None
+
+    def filter_many(self, urls, on_reject=None):
+        ''' The urls that pass check(), in order. on_reject(reason, url) is
+        called for every other one. '''
+        valid = list()
+        for url in urls:
+            reason = self.check(url)
+            if reason is None:
+                valid.append(url)
+            elif on_reject is not None:
+                on_reject(reason, url)
+        return valid
+
+    def record(self, url, good):
+        ''' Report a crawled page. good is False for errors, duplicates and
+        pages without a usable amount of text. '''
+        parsed = urlparse(url)
+        shape = url_shape(parsed.netloc.lower(), parsed.path, parsed.query)
+        with self.lock:
+            counts = self.shapes.get(shape)
+            if counts is None:
+                counts = self.shapes[shape] = [0, 0]
+            counts[0] += 1
+            counts[1] += 0 if good else 1
+            pages, bad_pages = counts
+            if (self.min_pages and pages >= self.min_pages
+                    and bad_pages >= self.bad_ratio * pages):
+                self.cut_shapes.add(shape)
+
+    def bad_ratio_of(self, url):
+        ''' Share of bad pages among the crawled pages shaped like url, 0 if
+        none were crawled yet. Lets a frontier demote likely traps. '''
+        parsed = urlparse(url)
+        shape = url_shape(parsed.netloc.lower(), parsed.path, parsed.query)
+        with self.lock:
+            pages, bad_pages = self.shapes.get(shape, (0, 0))
+        return bad_pages / pages if pages else 0.0
@@ -0,0 +1,62 @@
+import re
+from urllib.parse import urlparse
+
+
+class UrlFilter(object):
+    ''' The static url rules of is_valid, compiled once.
+
+    Allowed domains become a set looked up once per label suffix of the
+    host, trap keywords a single alternation regex, and blocked extensions a
+    set looked up with the last extension of the path. check() returns the
+    reason a url is rejected, or None if it may be crawled.
+    '''
+    SCHEMES = frozenset(("http", "https"))
+
+    def __init__(self, allowed_domains, trap_keywords, blocked_extensions):
+        self.allowed_domains = frozenset(domain.lower() for domain in allowed_domains)
+        # Longest first, so the alternation prefers the most specific keyword.
+        keywords = sorted(set(trap_keywords), key=len, reverse=True)
+        self.trap_pattern = re.compile("|".join(map(re.escape, keywords))) if keywords else None
+        self.blocked_extensions = frozenset(ext.lower() for ext in blocked_extensions)
+
+    def domain_allowed(self, domain):
+        ''' True if domain is an allowed domain or a subdomain of one. '''
+        allowed = self.allowed_domains
+        while True:
+            if domain in allowed:
+                return True
+            _, dot, domain = domain.partition(".")
+            if not dot:
+                return False
+
+    def check(self, url):
+        ''' Reason url must not be crawled, or None. The url is expected to
+        have its fragment removed already. '''
+        parsed = urlparse(url)
+        if parsed.scheme not in self.SCHEMES:
+            return "invalid_scheme"
+        if not self.domain_allowed(parsed.netloc.lower()):
+            return "outside_allowed_domain"
+        if self.trap_pattern is not None and self.trap_pattern.search(url.lower()):
+            return "trap_keyword"
+        path = parsed.path.lower()
+        dot = path.rfind(".")
+        if dot != -1 and path[dot + 1:] in self.blocked_extensions:
+            return "blocked_extension"
+        return None
+
+    def filter_many(self, urls, on_reject=None):
+        ''' The urls that pass check(), in order. on_reject(reason, url) is
+        called for every other one. '''
+        check = self.check
+        valid = list()
+        for url in urls:
+            try:
+                reason = check(url)
+            except ValueError:
+                reason = "validation_error"
+            if reason is None:
+                valid.append(url)
+            elif on_reject is not None:
+                on_reject(reason, url)
+        return valid
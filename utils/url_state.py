@@ -0,0 +1,208 @@
+import os
+import struct
+
+from array import array
+from hashlib import blake2b
+from threading import Lock
+
+# State byte: flags in the low bits, the reason of a rejection above them.
+VISITED = 1
+REJECTED = 2
+FLAGS = VISITED | REJECTED
+REASON_SHIFT = 2
+# Reason codes are saved to disk, so only ever append to this list.
+REASONS = (
+    None, "other", "http_error", "not_html", "trap_keyword", "validation_error",
+    "too_large")
+_REASON_CODES = {reason: code for code, reason in enumerate(REASONS)}
+
+RECORD = struct.Struct("<QB")   # fingerprint, state
+
+
+def url_fingerprint(url):
+    ''' Stable 64 bit fingerprint of the exact url string. '''
+    return int.from_bytes(blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class UrlStateStore(object):
+    ''' Visited / rejected state of every url the scraper has decided on.
+
+    Urls are kept as 64 bit fingerprints in an open addressing table of two
+    flat arrays, one 'Q' for the fingerprints and one 'B' for the state, so
+    an url costs about 15 bytes instead of the 150 or so of a string in a
+    set. The state holds the VISITED and REJECTED flags and the reason a url
+    was rejected.
+
+    With open(path) the store is loaded from path and every change is later
+    appended to it by flush(), 9 bytes per change. The file is rewritten
+    with only the latest states once it holds twice as many records as
+    there are urls. A torn last record is dropped on load.
+    '''
+    MAX_LOAD = 0.6
+    MIN_SLOTS = 1 << 10
+
+    def __init__(self, capacity=0):
+        self.lock = Lock()
+        self.path = None
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        slots = self.MIN_SLOTS
+        while slots * self.MAX_LOAD < capacity:
+            slots <<= 1
+        self.keys = array('Q', bytes(8 * slots))
+        self.states = array('B', bytes(slots))
+        self.mask = slots - 1
+        self.used = 0
+        self.counts = {VISITED: 0, REJECTED: 0}
+        self.pending = bytearray()      # changes not written to path yet
+        self.records = 0                # records in the file at path
+        self.rewrite = False
+
+    def _probe(self, fingerprint):
+        keys, mask = self.keys, self.mask
+        index = fingerprint & mask
+        while True:
+            current = keys[index]
+            if current == fingerprint or current == 0:
+                return index
+            index = (index + 1) & mask
+
+    def _grow(self):
+        keys, states = self.keys, self.states
+        slots = len(keys) * 2
+        self.keys = array('Q', bytes(8 * slots))
+        self.states = array('B', bytes(slots))
+        self.mask = slots - 1
+        for fingerprint, state in zip(keys, states):
+            if fingerprint:
+                index = self._probe(fingerprint)
+                self.keys[index] = fingerprint
+                self.states[index] = state
+
+    def _set(self, fingerprint, state):
+        ''' Store state for fingerprint, keeping counts. Lock held. '''
+        index = self._probe(fingerprint)
+        if self.keys[index] == 0:
+            self.keys[index] = fingerprint
+            self.used += 1
+            old = 0
+        else:
+            old = self.states[index]
+        self.states[index] = state
+        for flag in (VISITED, REJECTED):
+            self.counts[flag] += bool(state & flag) - bool(old & flag)
+        if self.used > len(self.keys) * self.MAX_LOAD:
+            self._grow()
+
+    def state(self, url):
+        ''' Flags and reason of url, 0 if nothing is known about it. '''
+        fingerprint = url_fingerprint(url) or 1
+        with self.lock:
+            index = self._probe(fingerprint)
+            return self.states[index] if self.keys[index] == fingerprint else 0
+
+    def mark(self, url, flag, reason=None):
+        ''' Set flag on url, with the reason of a rejection. '''
+        fingerprint = url_fingerprint(url) or 1
+        with self.lock:
+            index = self._probe(fingerprint)
+            old = self.states[index] if self.keys[index] == fingerprint else 0
+            state = old | flag
+            if reason is not None:
+                code = _REASON_CODES.get(reason, 1)
+                state = (state & FLAGS) | (code << REASON_SHIFT)
+            if state != old or self.keys[index] != fingerprint:
+                self._set(fingerprint, state)
+                self.pending += RECORD.pack(fingerprint, state)
+
+    def reason(self, url):
+        return REASONS[self.state(url) >> REASON_SHIFT]
+
+    def count(self, flag):
+        return self.counts[flag]
+
+    def clear(self, flag):
+        ''' Take flag off every url. '''
+        with self.lock:
+            states = self.states
+            for index, state in enumerate(states):
+                if state & flag:
+                    states[index] = state & ~flag
+            self.counts[flag] = 0
+            self.rewrite = True
+
+    def __len__(self):
+        return self.used
+
+    def open(self, path, restart=False):
+        ''' Load the state saved at path, or with restart start over, and keep
+        saving to path from now on. '''
+        with self.lock:
+            if restart and os.path.exists(path):
+                os.remove(path)
+            self._allocate(0)
+            self.path = path
+            if not os.path.exists(path):
+                return
+            with open(path, "rb") as state_file:
+                data = state_file.read()
+            intact = len(data) - len(data) % RECORD.size
+            for fingerprint, state in RECORD.iter_unpack(memoryview(data)[:intact]):
+                self._set(fingerprint, state)
+            self.records = intact // RECORD.size
+            if intact != len(data):
+                with open(path, "r+b") as state_file:
+                    state_file.truncate(intact)
+            self.rewrite = self.records > 2 * self.used
+
+    def flush(self):
+        ''' Append the changes since the last flush to the file at path. '''
+        with self.lock:
+            if self.path is None or not (self.pending or self.rewrite):
+                return
+            if self.rewrite:
+                records = bytearray()
+                for fingerprint, state in zip(self.keys, self.states):
+                    if fingerprint:
+                        records += RECORD.pack(fingerprint, state)
+                with open(self.path + ".tmp", "wb") as state_file:
+                    state_file.write(records)
+                os.replace(self.path + ".tmp", self.path)
+                self.records = self.used
+                self.rewrite = False
+            else:
+                with open(self.path, "ab") as state_file:
+                    state_file.write(self.pending)
+                self.records += len(self.pending) // RECORD.size
+                self.rewrite = self.records > 2 * self.used
+            self.pending = bytearray()
+
+
+class UrlStateView(object):
+    ''' Set-like view of the urls with one flag, so VISITED and
+    DO_NOT_ENTER keep their set interface. '''
+    def __init__(self, store, flag):
+        self.store = store
+        self.flag = flag
+
+    def add(self, url, reason=None):
+        self.store.mark(url, self.flag, reason)
+
+    def update(self, urls):
+        for url in urls:
+            self.store.mark(url, self.flag)
+
+    def __contains__(self, url):
+        return bool(self.store.state(url) & self.flag)
+
+    def __len__(self):
+        return self.store.count(self.flag)
+
+    def clear(self):
+        self.store.clear(self.flag)
+
+
+def url_state_file(save_file):
+    ''' Where the url state of the crawl saved at save_file is kept. '''
+    return save_file + ".urlstate"
@@ -0,0 +1,109 @@
+from array import array
+from collections import Counter
+from heapq import heappush, heapreplace, heappop, nlargest
+from threading import Lock
+
+
+def make_word_counter(mode, stop_words, counts=None, sketch_width=1 << 20,
+                      sketch_depth=4, top_k=1000):
+    ''' WordCounter for mode "exact", SketchWordCounter for mode "sketch". '''
+    if mode == "sketch":
+        return SketchWordCounter(stop_words, sketch_width, sketch_depth, top_k)
+    return WordCounter(stop_words, counts)
+
+
+class WordCounter(object):
+    ''' Exact word frequencies over all pages, stop words and non alphabetic
+    tokens left out. Pages are merged with one Counter.update each. '''
+    def __init__(self, stop_words, counts=None):
+        self.stop_words = frozenset(stop_words)
+        self.counts = counts if counts is not None else Counter()
+        self.lock = Lock()
+        self.updates = 0    # pages merged so far, tells readers when counts changed
+
+    def _words(self, tokens):
+        ''' {word: count} of the countable words in a token list or mapping. '''
+        stop_words = self.stop_words
+        if not isinstance(tokens, dict):
+            tokens = Counter(tokens)
+        return {
+            token: count for token, count in tokens.items()
+            if token not in stop_words and token.isalpha()}
+
+    def update(self, tokens):
+        words = self._words(tokens)
+        with self.lock:
+            self.counts.update(words)
+            self.updates += 1
+
+    def most_common(self, n):
+        ''' The n most frequent words, without sorting the whole vocabulary. '''
+        with self.lock:
+            return nlargest(n, self.counts.items(), key=lambda item: item[1])
+
+
+class SketchWordCounter(WordCounter):
+    ''' Approximate word frequencies in fixed memory.
+
+    Counts live in a count-min sketch of sketch_depth rows of sketch_width
+    counters, so they can only be overestimated. The top_k words by estimate
+    are tracked in a dict plus a lazy min-heap: heap entries may hold an
+    outdated (lower) count and are refreshed when they reach the top. Memory
+    stays at width * depth counters plus top_k entries however many distinct
+    words the crawl sees.
+    '''
+    def __init__(self, stop_words, sketch_width=1 << 20, sketch_depth=4, top_k=1000):
+        super().__init__(stop_words, counts=dict())
+        self.width = sketch_width
+        self.rows = [array('Q', bytes(8 * sketch_width)) for _ in range(sketch_depth)]
+        self.top_k = top_k
+        self.heap = list()      # (count when pushed, word), smallest first
+
+    def _add(self, word, count):
+        ''' Add count to word in the sketch and return its new estimate. '''
+        h = hash(word) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        width = self.width
+        estimate = None
+        for row_number, row in enumerate(self.rows):
+            index = (h1 + row_number * h2) % width
+            row[index] += count
+            if estimate is None or row[index] < estimate:
+                estimate = row[index]
+        return estimate
+
+    def _min_top(self):
+        ''' Smallest tracked (count, word), fixing up outdated heap entries. '''
+        heap, top = self.heap, self.counts
+        while True:
+            count, word = heap[0]
+            if word not in top:
+                heappop(heap)
+            elif top[word] != count:
+                heapreplace(heap, (top[word], word))
+            else:
+                return count, word
+
+    def update(self, tokens):
+        words = self._words(tokens)
+        top = self.counts
+        with self.lock:
+            for word, count in words.items():
+                estimate = self._add(word, count)
+                if word in top:
+                    top[word] = estimate
+                elif len(top) < self.top_k:
+                    top[word] = estimate
+                    heappush(self.heap, (estimate, word))
+                else:
+                    smallest, smallest_word = self._min_top()
+                    if estimate > smallest:
+                        del top[smallest_word]
+                        heapreplace(self.heap, (estimate, word))
+                        top[word] = estimate
+            self.updates += 1
+
+    def most_common(self, n):
+        ''' The n most frequent tracked words, O(top_k log top_k). '''
+        with self.lock:
+            return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]